@@ -34,11 +34,13 @@ firmware which makes the mapping 1:1 in most cases.
 """
 import datetime
 import logging
-import time
 from collections import namedtuple
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError
+from threading import Event
 from threading import Lock
+from threading import RLock
 from threading import Thread
-from threading import Timer
 
 import cflib.crtp
 from .commander import Commander
@@ -49,6 +51,9 @@ from .log import Log
 from .mem import Memory
 from .param import Param
 from .platformservice import PlatformService
+from .retransmission import _clock
+from .retransmission import get_scheduler
+from .retransmission import RttEstimator
 from .toccache import TocCache
 from cflib.crazyflie.high_level_commander import HighLevelCommander
 from cflib.utils.callbacks import Caller
@@ -58,6 +63,14 @@ __all__ = ['Crazyflie']
 logger = logging.getLogger(__name__)
 
 
+# Stages of the connection setup
+SETUP_STAGE_PLATFORM = 'platform'
+SETUP_STAGE_LOG_TOC = 'log_toc'
+SETUP_STAGE_MEMORIES = 'memories'
+SETUP_STAGE_PARAM_TOC = 'param_toc'
+SETUP_TOTAL = 'total'
+
+
 class State:
     """Stat of the connection procedure"""
     DISCONNECTED = 0
@@ -69,12 +82,15 @@ class State:
 class Crazyflie():
     """The Crazyflie class"""
 
-    def __init__(self, link=None, ro_cache=None, rw_cache=None):
+    def __init__(self, link=None, ro_cache=None, rw_cache=None,
+                 lazy_params=False):
         """
         Create the objects from this module and register callbacks.
 
         ro_cache -- Path to read-only cache (string)
         rw_cache -- Path to read-write cache (string)
+        lazy_params -- Fetch param values when they are first accessed
+                       instead of all of them after connecting (bool)
         """
 
         # Called on disconnect, no matter the reason
@@ -103,9 +119,11 @@ class Crazyflie():
         self._toc_cache = TocCache(ro_cache=ro_cache,
                                    rw_cache=rw_cache)
 
+        # The thread is started when the first link is opened
         self.incoming = _IncomingPacketHandler(self)
         self.incoming.setDaemon(True)
-        self.incoming.start()
+        if link is not None and not link.pushes_packets:
+            self.incoming.link_opened()
 
         self.commander = Commander(self)
         self.high_level_commander = HighLevelCommander(self)
@@ -113,22 +131,31 @@ class Crazyflie():
         self.extpos = Extpos(self)
         self.log = Log(self)
         self.console = Console(self)
-        self.param = Param(self)
+        self.param = Param(self, lazy=lazy_params)
         self.mem = Memory(self)
         self.platform = PlatformService(self)
 
         self.link_uri = ''
 
-        # Used for retry when no reply was sent back
-        self.packet_received.add_callback(self._check_for_initial_packet_cb)
+        # Used for retry when no reply was sent back. Added before the
+        # initial packet callback, which removes itself when called.
         self.packet_received.add_callback(self._check_for_answers)
+        self.packet_received.add_callback(self._check_for_initial_packet_cb)
 
-        self._answer_patterns = {}
+        self._answer_patterns = _AnswerPatterns()
+        self._rtt_estimator = RttEstimator()
 
         self._send_lock = Lock()
 
         self.connected_ts = None
 
+        # Time from the start of the connection setup to the end of each
+        # stage, in seconds, see the SETUP_STAGE constants
+        self.connection_setup_times = {}
+        self._setup_start_time = None
+        self._setup_stages = set()
+        self._setup_lock = Lock()
+
         # Connect callbacks to logger
         self.disconnected.add_callback(
             lambda uri: logger.info('Callback->Disconnected from [%s]', uri))
@@ -153,31 +180,64 @@ class Crazyflie():
         self.connected_ts = None
 
     def _start_connection_setup(self):
-        """Start the connection setup by refreshing the TOCs"""
+        """Start the connection setup by fetching the platform information,
+        the other stages need the protocol version"""
         logger.info('We are connected[%s], request connection setup',
                     self.link_uri)
+        with self._setup_lock:
+            self.connection_setup_times = {}
+            self._setup_start_time = _clock()
+            self._setup_stages = set([SETUP_STAGE_PLATFORM])
         self.platform.fetch_platform_informations(self._platform_info_fetched)
 
     def _platform_info_fetched(self):
+        """Refresh the TOCs and the memories, they use different ports and
+        are fetched at the same time"""
+        self._setup_stage_finished(SETUP_STAGE_PLATFORM, [
+            SETUP_STAGE_LOG_TOC, SETUP_STAGE_MEMORIES, SETUP_STAGE_PARAM_TOC])
         self.log.refresh_toc(self._log_toc_updated_cb, self._toc_cache)
+        self.mem.refresh(self._mems_updated_cb)
+        self.param.refresh_toc(self._param_toc_updated_cb, self._toc_cache)
 
     def _param_toc_updated_cb(self):
         """Called when the param TOC has been fully updated"""
         logger.info('Param TOC finished updating')
-        self.connected_ts = datetime.datetime.now()
-        self.connected.call(self.link_uri)
-        # Trigger the update for all the parameters
-        self.param.request_update_of_all_params()
+        self._setup_stage_finished(SETUP_STAGE_PARAM_TOC)
 
     def _mems_updated_cb(self):
         """Called when the memories have been identified"""
         logger.info('Memories finished updating')
-        self.param.refresh_toc(self._param_toc_updated_cb, self._toc_cache)
+        self._setup_stage_finished(SETUP_STAGE_MEMORIES)
 
     def _log_toc_updated_cb(self):
         """Called when the log TOC has been fully updated"""
         logger.info('Log TOC finished updating')
-        self.mem.refresh(self._mems_updated_cb)
+        self._setup_stage_finished(SETUP_STAGE_LOG_TOC)
+
+    def _setup_stage_finished(self, stage, next_stages=()):
+        """Record the time of a finished connection setup stage and start
+        waiting for next_stages. The Crazyflie is connected once all the
+        stages are finished."""
+        with self._setup_lock:
+            if stage not in self._setup_stages:
+                return
+            self._setup_stages.remove(stage)
+            now = _clock()
+            self.connection_setup_times[stage] = now - self._setup_start_time
+            self._setup_stages.update(next_stages)
+            if self._setup_stages:
+                return
+            self.connection_setup_times[SETUP_TOTAL] = \
+                now - self._setup_start_time
+        logger.info('Connection setup finished in %.3f s: %s',
+                    self.connection_setup_times[SETUP_TOTAL],
+                    self.connection_setup_times)
+
+        self.connected_ts = datetime.datetime.now()
+        self.connected.call(self.link_uri)
+        # Trigger the update for all the parameters
+        if not self.param.lazy:
+            self.param.request_update_of_all_params()
 
     def _link_error_cb(self, errmsg):
         """Called from the link driver when there's an error"""
@@ -186,6 +246,7 @@ class Crazyflie():
         if (self.link is not None):
             self.link.close()
         self.link = None
+        self._fail_pending_answers(errmsg)
         if (self.state == State.INITIALIZED):
             self.connection_failed.call(self.link_uri, errmsg)
         if (self.state == State.CONNECTED or
@@ -209,17 +270,28 @@ class Crazyflie():
         self.link_established.call(self.link_uri)
         self.packet_received.remove_callback(self._check_for_initial_packet_cb)
 
-    def open_link(self, link_uri):
+    def open_link(self, link_uri, link=None):
         """
         Open the communication link to a copter at the given URI and setup the
         connection (download log/parameter TOC).
+
+        link -- Link driver to connect instead of the one found for the URI
+                (optional). It is read like the other links unless its
+                pushes_packets is True, the driver must then pass the
+                packets it receives to incoming.dispatch().
         """
         self.connection_requested.call(link_uri)
         self.state = State.INITIALIZED
         self.link_uri = link_uri
+        self._rtt_estimator = RttEstimator()
         try:
-            self.link = cflib.crtp.get_link_driver(
-                link_uri, self._link_quality_cb, self._link_error_cb)
+            if link is None:
+                self.link = cflib.crtp.get_link_driver(
+                    link_uri, self._link_quality_cb, self._link_error_cb)
+            else:
+                link.connect(link_uri, self._link_quality_cb,
+                             self._link_error_cb)
+                self.link = link
 
             if not self.link:
                 message = 'No driver found or malformed URI: {}' \
@@ -231,6 +303,8 @@ class Crazyflie():
                 # back from the copter
                 self.packet_received.add_callback(
                     self._check_for_initial_packet_cb)
+                if not self.link.pushes_packets:
+                    self.incoming.link_opened()
 
                 self._start_connection_setup()
         except Exception as ex:  # pylint: disable=W0703
@@ -255,7 +329,7 @@ class Crazyflie():
         if (self.link is not None):
             self.link.close()
             self.link = None
-        self._answer_patterns = {}
+        self._fail_pending_answers('Link closed')
         self.disconnected.call(self.link_uri)
 
     """Check if the communication link is open or not."""
@@ -273,40 +347,104 @@ class Crazyflie():
 
     def _no_answer_do_retry(self, pk, pattern):
         """Resend packets that we have not gotten answers to"""
+        pending = self._answer_patterns.get(pattern)
+        if pending is None:
+            return False
+        self._rtt_estimator.backoff(pending.sent_time)
         logger.info('Resending for pattern %s', pattern)
-        # Set the timer to None before trying to send again
         self.send_packet(pk, expected_reply=pattern, resend=True)
+        return True
+
+    @property
+    def rto(self):
+        """
+        The time in seconds after which an unanswered packet is resent,
+        estimated from the round trip times of the link
+        """
+        return self._rtt_estimator.rto
 
     def _check_for_answers(self, pk):
         """
         Callback called for every packet received to check if we are
         waiting for an answer on this port. If so, then cancel the retry
-        timer.
+        timer and update the round trip time of the link.
+        """
+        pending = self._answer_patterns.pop_match(pk)
+        if pending is not None:
+            pending.cancel()
+            if not pending.resent:
+                self._rtt_estimator.add_sample(_clock() - pending.sent_time)
+            for future, _ in pending.requests:
+                if not future.done():
+                    future.set_result(pk)
+
+    def _fail_pending_answers(self, message):
+        """Stop waiting for answers and fail the pending requests"""
+        for pending in self._answer_patterns.clear():
+            pending.cancel()
+            for future, _ in pending.requests:
+                if not future.done():
+                    future.set_exception(IOError(message))
+
+    def _request_timed_out(self, pattern, future):
+        """Fail a request that has not been answered in time"""
+        with self._answer_patterns.lock:
+            pending = self._answer_patterns.get(pattern)
+            if pending is not None:
+                pending.requests = [r for r in pending.requests
+                                    if r[0] is not future]
+                if not pending.requests:
+                    self._answer_patterns.pop(pattern)
+                    pending.cancel()
+        if not future.done():
+            future.set_exception(
+                TimeoutError('No answer matching {}'.format(pattern)))
+        return False
+
+    def send_request(self, pk, expected_reply=(), timeout=None):
         """
-        longest_match = ()
-        if len(self._answer_patterns) > 0:
-            data = (pk.header,) + tuple(pk.data)
-            for p in list(self._answer_patterns.keys()):
-                logger.debug('Looking for pattern match on %s vs %s', p, data)
-                if len(p) <= len(data):
-                    if p == data[0:len(p)]:
-                        match = data[0:len(p)]
-                        if len(match) >= len(longest_match):
-                            logger.debug('Found new longest match %s', match)
-                            longest_match = match
-        if len(longest_match) > 0:
-            self._answer_patterns[longest_match].cancel()
-            del self._answer_patterns[longest_match]
-
-    def send_packet(self, pk, expected_reply=(), resend=False, timeout=0.2):
+        Send a packet and return a Future resolved with the answer, the
+        first packet on the same port and channel whose data starts with
+        expected_reply. The packet is resent if the link needs it.
+
+        The future fails with IOError if the link is closed or lost, and
+        with TimeoutError if timeout is given and no answer has been
+        received after that many seconds.
+        """
+        future = Future()
+        pattern = (pk.header,) + tuple(expected_reply)
+        with self._answer_patterns.lock:
+            pending = self._answer_patterns.get(pattern)
+            if pending is None:
+                pending = _PendingAnswer()
+                self._answer_patterns[pattern] = pending
+            entry = None
+            if timeout is not None:
+                entry = get_scheduler().schedule(
+                    timeout, self._request_timed_out, pattern, future)
+            pending.requests.append((future, entry))
+
+        if self.link is None:
+            self._answer_patterns.pop(pattern)
+            pending.cancel()
+            future.set_exception(IOError('Link closed'))
+        else:
+            self.send_packet(pk, expected_reply=tuple(expected_reply))
+        return future
+
+    def send_packet(self, pk, expected_reply=(), resend=False, timeout=None):
         """
         Send a packet through the link interface.
 
         pk -- Packet to send
         expect_answer -- True if a packet from the Crazyflie is expected to
                          be sent back, otherwise false
+        timeout -- Time to wait for the answer before resending the packet,
+                   estimated from the round trip time of the link if None
 
         """
+        if timeout is None:
+            timeout = self._rtt_estimator.rto
         self._send_lock.acquire()
         if self.link is not None:
             if len(expected_reply) > 0 and not resend and \
@@ -315,24 +453,31 @@ class Crazyflie():
                 logger.debug(
                     'Sending packet and expecting the %s pattern back',
                     pattern)
-                new_timer = Timer(timeout,
-                                  lambda: self._no_answer_do_retry(pk,
-                                                                   pattern))
-                self._answer_patterns[pattern] = new_timer
-                new_timer.start()
+                with self._answer_patterns.lock:
+                    pending = self._answer_patterns.get(pattern)
+                    if pending is None:
+                        pending = _PendingAnswer()
+                        self._answer_patterns[pattern] = pending
+                    elif pending.retransmission is not None:
+                        # Sent again before the first one was answered
+                        pending.retransmission.cancel()
+                        pending.resent = True
+                    pending.sent_time = _clock()
+                    pending.retransmission = get_scheduler().schedule(
+                        timeout, self._no_answer_do_retry, pk, pattern)
             elif resend:
                 # Check if we have gotten an answer, if not try again
                 pattern = expected_reply
-                if pattern in self._answer_patterns:
-                    logger.debug('We want to resend and the pattern is there')
-                    if self._answer_patterns[pattern]:
-                        new_timer = Timer(timeout,
-                                          lambda:
-                                          self._no_answer_do_retry(
-                                              pk, pattern))
-                        self._answer_patterns[pattern] = new_timer
-                        new_timer.start()
-                else:
+                with self._answer_patterns.lock:
+                    pending = self._answer_patterns.get(pattern)
+                    if pending is not None:
+                        logger.debug(
+                            'We want to resend and the pattern is there')
+                        pending.sent_time = _clock()
+                        pending.resent = True
+                        pending.retransmission = get_scheduler().schedule(
+                            timeout, self._no_answer_do_retry, pk, pattern)
+                if pending is None:
                     logger.debug('Resend requested, but no pattern found: %s',
                                  self._answer_patterns)
             self.link.send_packet(pk)
@@ -340,9 +485,135 @@ class Crazyflie():
         self._send_lock.release()
 
 
+class _PendingAnswer():
+    """A sent packet waiting for its answer"""
+
+    __slots__ = ('retransmission', 'sent_time', 'resent', 'requests')
+
+    def __init__(self):
+        self.retransmission = None
+        self.sent_time = _clock()
+        self.resent = False
+        # The futures waiting for the answer and their scheduled timeouts
+        self.requests = []
+
+    def cancel(self):
+        """Cancel the scheduled retransmission and timeouts"""
+        if self.retransmission is not None:
+            self.retransmission.cancel()
+        for _, timeout in self.requests:
+            if timeout is not None:
+                timeout.cancel()
+
+
+class _AnswerPatterns():
+    """
+    The patterns of the answers we are waiting for, with a value each. A
+    pattern is a tuple of the header and the first data bytes of the answer.
+    The patterns are indexed by header and then by a trie of the data bytes
+    so that the longest pattern matching a packet is found in a few lookups.
+    """
+
+    # Key of the pattern ending at a node of the trie
+    _END = None
+
+    def __init__(self):
+        self._values = {}
+        # Header -> trie, a node is a dict of the next bytes
+        self._tries = {}
+        # Held when looking up and changing a pattern as one operation
+        self.lock = RLock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, pattern):
+        return pattern in self._values
+
+    def __getitem__(self, pattern):
+        return self._values[pattern]
+
+    def get(self, pattern, default=None):
+        return self._values.get(pattern, default)
+
+    def __setitem__(self, pattern, value):
+        with self.lock:
+            if pattern not in self._values:
+                node = self._tries.setdefault(pattern[0], {})
+                for byte in pattern[1:]:
+                    node = node.setdefault(byte, {})
+                node[self._END] = pattern
+            self._values[pattern] = value
+
+    def __repr__(self):
+        return repr(self._values)
+
+    def pop(self, pattern, default=None):
+        """Remove a pattern and return its value"""
+        with self.lock:
+            if pattern not in self._values:
+                return default
+            self._remove(pattern)
+            return self._values.pop(pattern)
+
+    def clear(self):
+        """Remove all patterns and return their values"""
+        with self.lock:
+            values = list(self._values.values())
+            self._values = {}
+            self._tries = {}
+        return values
+
+    def pop_match(self, pk):
+        """Remove the longest pattern matching the packet and return its
+        value, None if no pattern matches"""
+        if not self._values:
+            return None
+
+        with self.lock:
+            node = self._tries.get(pk.header)
+            if node is None:
+                return None
+            longest_match = node.get(self._END)
+            for byte in pk.data:
+                node = node.get(byte)
+                if node is None:
+                    break
+                longest_match = node.get(self._END, longest_match)
+
+            if longest_match is None:
+                return None
+            logger.debug('Found answer matching %s', longest_match)
+            self._remove(longest_match)
+            return self._values.pop(longest_match)
+
+    def _remove(self, pattern):
+        """Remove a pattern from its trie, and the nodes left empty"""
+        path = [self._tries[pattern[0]]]
+        for byte in pattern[1:]:
+            path.append(path[-1][byte])
+        del path[-1][self._END]
+
+        for byte, node in zip(reversed(pattern[1:]), reversed(path[:-1])):
+            if node[byte]:
+                return
+            del node[byte]
+        if not self._tries[pattern[0]]:
+            del self._tries[pattern[0]]
+
+
 _CallbackContainer = namedtuple('CallbackConstainer',
                                 'port port_mask channel channel_mask callback')
 
+# 16 ports of 4 channels
+_NR_OF_HEADERS = 64
+
+
+def _index(header):
+    """Index of the port and channel of a packet header in the dispatch
+    table"""
+    return (header & 0xF0) >> 2 | (header & 0x03)
+
 
 class _IncomingPacketHandler(Thread):
     """Handles incoming packets and sends the data to the correct receivers"""
@@ -351,6 +622,21 @@ class _IncomingPacketHandler(Thread):
         Thread.__init__(self)
         self.cf = cf
         self.cb = []
+        # Callbacks by port and channel, see _index(). The table is never
+        # modified, a new one is built when the callbacks change.
+        self._dispatch_table = ((),) * _NR_OF_HEADERS
+        self._callbacks_lock = Lock()
+        self._link_opened = Event()
+        self._is_reading = False
+        self._start_lock = Lock()
+
+    def link_opened(self):
+        """Start reading from the link without waiting for the next poll"""
+        with self._start_lock:
+            if not self._is_reading:
+                self._is_reading = True
+                self.start()
+        self._link_opened.set()
 
     def add_port_callback(self, port, cb):
         """Add a callback for data that comes on a specific port"""
@@ -360,9 +646,9 @@ class _IncomingPacketHandler(Thread):
     def remove_port_callback(self, port, cb):
         """Remove a callback for data that comes on a specific port"""
         logger.debug('Removing callback on port [%d] to [%s]', port, cb)
-        for port_callback in self.cb:
-            if port_callback.port == port and port_callback.callback == cb:
-                self.cb.remove(port_callback)
+        with self._callbacks_lock:
+            self._set_callbacks([c for c in self.cb
+                                 if c.port != port or c.callback != cb])
 
     def add_header_callback(self, cb, port, channel, port_mask=0xFF,
                             channel_mask=0xFF):
@@ -371,39 +657,59 @@ class _IncomingPacketHandler(Thread):
         possibility to add a mask for channel and port for multiple
         hits for same callback.
         """
-        self.cb.append(_CallbackContainer(port, port_mask,
-                                          channel, channel_mask, cb))
+        with self._callbacks_lock:
+            self._set_callbacks(self.cb + [_CallbackContainer(
+                port, port_mask, channel, channel_mask, cb)])
+
+    def remove_header_callback(self, cb, port, channel, port_mask=0xFF,
+                               channel_mask=0xFF):
+        """Remove a callback added with add_header_callback()"""
+        removed = _CallbackContainer(port, port_mask, channel, channel_mask,
+                                     cb)
+        with self._callbacks_lock:
+            self._set_callbacks([c for c in self.cb if c != removed])
+
+    def _set_callbacks(self, callbacks):
+        """Replace the callbacks and their dispatch table"""
+        table = []
+        for port in range(16):
+            for channel in range(4):
+                table.append(tuple(
+                    c.callback for c in callbacks
+                    if c.port == (port & c.port_mask) and
+                    c.channel == (channel & c.channel_mask)))
+        self.cb = callbacks
+        self._dispatch_table = tuple(table)
 
     def run(self):
         while True:
-            if self.cf.link is None:
-                time.sleep(1)
+            # The link can be closed from another thread at any time
+            link = self.cf.link
+            if link is None or link.pushes_packets:
+                self._link_opened.wait(1)
+                self._link_opened.clear()
                 continue
-            pk = self.cf.link.receive_packet(1)
+            pk = link.receive_packet(1)
 
             if pk is None:
                 continue
 
-            # All-packet callbacks
-            self.cf.packet_received.call(pk)
-
-            found = False
-            for cb in (cb for cb in self.cb
-                       if cb.port == (pk.port & cb.port_mask) and
-                       cb.channel == (pk.channel & cb.channel_mask)):
-                try:
-                    cb.callback(pk)
-                except Exception:  # pylint: disable=W0703
-                    # Disregard pylint warning since we want to catch all
-                    # exceptions and we can't know what will happen in
-                    # the callbacks.
-                    import traceback
-
-                    logger.error('Exception while doing callback on port'
-                                 ' [%d]\n\n%s', pk.port,
-                                 traceback.format_exc())
-                if cb.port != 0xFF:
-                    found = True
-
-            if not found:
-                pass
+            self.dispatch(pk)
+
+    def dispatch(self, pk):
+        """Pass a received packet to the callbacks"""
+        # All-packet callbacks
+        self.cf.packet_received.call(pk)
+
+        for callback in self._dispatch_table[_index(pk.header)]:
+            try:
+                callback(pk)
+            except Exception:  # pylint: disable=W0703
+                # Disregard pylint warning since we want to catch all
+                # exceptions and we can't know what will happen in
+                # the callbacks.
+                import traceback
+
+                logger.error('Exception while doing callback on port'
+                             ' [%d]\n\n%s', pk.port,
+                             traceback.format_exc())
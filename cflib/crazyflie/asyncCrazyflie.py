@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+The asyncio Crazyflie class is a wrapper around the "normal" Crazyflie class
+for applications running on an asyncio event loop. The link is an
+AioUdpDriver and the packets are handled on the event loop, so many
+Crazyflies can share one loop and one socket without a reading thread each.
+Requires Python 3.5 or later.
+"""
+import asyncio
+
+from cflib.crazyflie import Crazyflie
+from cflib.crtp.aioudpdriver import AioUdpDriver
+from cflib.crtp.aioudpdriver import open_endpoint
+
+__author__ = 'Bitcraze AB'
+__all__ = ['AsyncCrazyflie']
+
+
+class AsyncCrazyflie:
+
+    def __init__(self, link_uri, endpoint=None, cf=None, loop=None):
+        """
+        Create an asyncio Crazyflie instance with the specified link_uri.
+
+        endpoint -- CrtpDatagramProtocol shared with other links, see
+                    cflib.crtp.aioudpdriver.open_endpoint(). A private one
+                    is opened if None.
+        """
+        if cf:
+            self.cf = cf
+        else:
+            self.cf = Crazyflie()
+
+        if loop is None:
+            loop = asyncio.get_event_loop()
+        self._loop = loop
+        self._link_uri = link_uri
+        self._endpoint = endpoint
+        self._owns_endpoint = endpoint is None
+        self._is_link_open = False
+
+    async def open_link(self):
+        """ Connect and wait until the TOCs have been downloaded """
+        if self.is_link_open():
+            raise Exception('Link already open')
+
+        if self._endpoint is None:
+            self._endpoint = await open_endpoint(loop=self._loop)
+
+        connected = self._loop.create_future()
+
+        def _connected(link_uri):
+            self._resolve(connected, None)
+
+        def _connection_failed(link_uri, msg):
+            self._fail(connected, Exception(msg))
+
+        self.cf.connected.add_callback(_connected)
+        self.cf.connection_failed.add_callback(_connection_failed)
+        try:
+            link = AioUdpDriver(self._endpoint, self.cf.incoming.dispatch)
+            self.cf.open_link(self._link_uri, link)
+            await connected
+        finally:
+            _remove_callback(self.cf.connected, _connected)
+            _remove_callback(self.cf.connection_failed, _connection_failed)
+
+        self._is_link_open = True
+        self.cf.disconnected.add_callback(self._disconnected)
+
+    async def close_link(self):
+        if self._is_link_open:
+            self.cf.close_link()
+            self._is_link_open = False
+        _remove_callback(self.cf.disconnected, self._disconnected)
+        if self._owns_endpoint and self._endpoint is not None:
+            self._endpoint.close()
+            self._endpoint = None
+
+    async def __aenter__(self):
+        await self.open_link()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close_link()
+
+    def is_link_open(self):
+        return self._is_link_open
+
+    async def get_param(self, complete_name):
+        """ Read the value of a parameter from the Crazyflie """
+        return await self._param_update(
+            complete_name,
+            lambda: self.cf.param.request_param_update(complete_name))
+
+    async def set_param(self, complete_name, value):
+        """ Set the value of a parameter and wait until the Crazyflie has
+        acknowledged it, return the new value """
+        return await self._param_update(
+            complete_name,
+            lambda: self.cf.param.set_value(complete_name, str(value)))
+
+    async def _param_update(self, complete_name, request):
+        group, name = complete_name.split('.', 1)
+        updated = self._loop.create_future()
+
+        def _updated(complete_name, value):
+            self._resolve(updated, value)
+
+        self.cf.param.add_update_callback(group=group, name=name,
+                                          cb=_updated)
+        try:
+            request()
+            return await updated
+        finally:
+            self.cf.param.remove_update_callback(group=group, name=name,
+                                                 cb=_updated)
+
+    def log_stream(self, log_config):
+        """
+        Return an async iterator over the log data of log_config, as
+        (timestamp, data, log_config) tuples. The log configuration is
+        started on the first iteration and stopped when the iterator is
+        closed or used as an async context manager:
+
+        async with cf.log_stream(log_config) as stream:
+            async for timestamp, data, log_config in stream:
+                ...
+        """
+        return _LogStream(self, log_config)
+
+    async def send_packet(self, pk, expected_reply=()):
+        """
+        Send a packet. If expected_reply is not empty the packet is resent
+        until a packet on the same port and channel starting with
+        expected_reply is received, and that packet is returned.
+        """
+        if not expected_reply:
+            self.cf.send_packet(pk)
+            return None
+
+        return await asyncio.wrap_future(
+            self.cf.send_request(pk, tuple(expected_reply)), loop=self._loop)
+
+    def _resolve(self, future, result):
+        """ Set the result of a future from any thread """
+        self._loop.call_soon_threadsafe(_set_result, future, result)
+
+    def _fail(self, future, exception):
+        self._loop.call_soon_threadsafe(_set_exception, future, exception)
+
+    def _disconnected(self, link_uri):
+        self._is_link_open = False
+
+
+def _remove_callback(container, callback):
+    try:
+        container.remove_callback(callback)
+    except ValueError:
+        pass
+
+
+def _set_result(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future, exception):
+    if not future.done():
+        future.set_exception(exception)
+
+
+class _LogStream:
+    DISCONNECT_EVENT = 'DISCONNECT_EVENT'
+
+    def __init__(self, acf, log_config):
+        self._acf = acf
+        self._cf = acf.cf
+        self._log_config = log_config
+        self._queue = asyncio.Queue()
+        self._is_started = False
+        self._is_closed = False
+
+    def _start(self):
+        self._cf.log.add_config(self._log_config)
+        self._cf.disconnected.add_callback(self._disconnected)
+        self._log_config.data_received_cb.add_callback(self._log_callback)
+        self._log_config.start()
+        self._is_started = True
+
+    async def close(self):
+        if self._is_started:
+            self._log_config.stop()
+            self._log_config.delete()
+            self._log_config.data_received_cb.remove_callback(
+                self._log_callback)
+            self._cf.disconnected.remove_callback(self._disconnected)
+            self._is_started = False
+        self._is_closed = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._is_closed:
+            raise StopAsyncIteration
+        if not self._is_started:
+            self._start()
+
+        data = await self._queue.get()
+
+        if data == self.DISCONNECT_EVENT:
+            await self.close()
+            raise StopAsyncIteration
+
+        return data
+
+    async def __aenter__(self):
+        self._start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _log_callback(self, ts, data, logblock):
+        self._acf._loop.call_soon_threadsafe(
+            self._queue.put_nowait, (ts, data, logblock))
+
+    def _disconnected(self, link_uri):
+        self._acf._loop.call_soon_threadsafe(
+            self._queue.put_nowait, self.DISCONNECT_EVENT)
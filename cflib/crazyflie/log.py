@@ -63,6 +63,7 @@ States of a configuration:
 import errno
 import logging
 import struct
+from collections import namedtuple
 
 from .toc import Toc
 from .toc import TocFetcher
@@ -145,8 +146,18 @@ class LogConfig(object):
     """Representation of one log configuration that enables logging
     from the Crazyflie"""
 
-    def __init__(self, name, period_in_ms):
-        """Initialize the entry"""
+    # Formats of the data passed to data_received_cb
+    DICT = 'dict'
+    TUPLE = 'tuple'
+    NAMEDTUPLE = 'namedtuple'
+
+    def __init__(self, name, period_in_ms, data_format=DICT):
+        """
+        Initialize the entry. The data passed to data_received_cb is a dict
+        of values by variable name, or with data_format a tuple or a
+        namedtuple of the values in the order the variables were added (the
+        dots in the names are replaced by underscores in the namedtuple).
+        """
         self.data_received_cb = Caller()
         self.error_cb = Caller()
         self.started_cb = Caller()
@@ -167,6 +178,16 @@ class LogConfig(object):
         self.default_fetch_as = []
         self.name = name
 
+        if data_format not in (LogConfig.DICT, LogConfig.TUPLE,
+                               LogConfig.NAMEDTUPLE):
+            raise ValueError('Unknown data format {}'.format(data_format))
+        self.data_format = data_format
+        # The struct unpacking all the variables, compiled when the block is
+        # added
+        self._codec = None
+        self._names = ()
+        self._tuple_class = None
+
     def add_variable(self, name, fetch_as=None):
         """Add a new variable to the configuration.
 
@@ -179,6 +200,7 @@ class LogConfig(object):
         Crazyflie)."""
         if fetch_as:
             self.variables.append(LogVariable(name, fetch_as))
+            self._codec = None
         else:
             # We cannot determine the default type until we have connected. So
             # save the name and we will add these once we are connected.
@@ -196,6 +218,18 @@ class LogConfig(object):
         """
         self.variables.append(LogVariable(name, fetch_as, LogVariable.MEM_TYPE,
                                           stored_as, address))
+        self._codec = None
+
+    def _compile(self):
+        """Create the struct unpacking the data of all the variables"""
+        self._names = tuple(var.name for var in self.variables)
+        self._codec = struct.Struct('<' + ''.join(
+            LogTocElement.get_unpack_string_from_id(var.fetch_as).lstrip('<')
+            for var in self.variables))
+        if self.data_format == LogConfig.NAMEDTUPLE:
+            self._tuple_class = namedtuple(
+                'LogData', [name.replace('.', '_') for name in self._names],
+                rename=True)
 
     def _set_added(self, added):
         if added != self._added:
@@ -295,22 +329,22 @@ class LogConfig(object):
     def unpack_log_data(self, log_data, timestamp):
         """Unpack received logging data so it repreloggingsent real values according
         to the configuration in the entry"""
-        ret_data = {}
-        data_index = 0
-        for var in self.variables:
-            size = LogTocElement.get_size_from_id(var.fetch_as)
-            name = var.name
-            unpackstring = LogTocElement.get_unpack_string_from_id(
-                var.fetch_as)
-            value = struct.unpack(
-                unpackstring, log_data[data_index:data_index + size])[0]
-            data_index += size
-            ret_data[name] = value
+        if self._codec is None:
+            self._compile()
+        values = self._codec.unpack_from(log_data)
+        if self.data_format == LogConfig.DICT:
+            ret_data = dict(zip(self._names, values))
+        elif self.data_format == LogConfig.NAMEDTUPLE:
+            ret_data = self._tuple_class._make(values)
+        else:
+            ret_data = values
         self.data_received_cb.call(timestamp, ret_data, self)
 
 
-class LogTocElement:
+class LogTocElement(object):
     """An element in the Log TOC."""
+    __slots__ = ('ident', 'group', 'name', 'ctype', 'pytype', 'access')
+
     types = {0x01: ('uint8_t', '<B', 1),
              0x02: ('uint16_t', '<H', 2),
              0x03: ('uint32_t', '<L', 4),
@@ -320,6 +354,16 @@ class LogTocElement:
              0x08: ('FP16', '<h', 2),
              0x07: ('float', '<f', 4)}
 
+    # NumPy types of the variable types, FP16 is read as its raw int16
+    dtypes = {0x01: '<u1',
+              0x02: '<u2',
+              0x03: '<u4',
+              0x04: '<i1',
+              0x05: '<i2',
+              0x06: '<i4',
+              0x08: '<i2',
+              0x07: '<f4'}
+
     @staticmethod
     def get_id_from_cstring(name):
         """Return variable type id given the C-storage name"""
@@ -355,6 +399,15 @@ class LogTocElement:
             raise KeyError(
                 'Type [%d] not found in LogTocElement.types!' % ident)
 
+    @staticmethod
+    def get_dtype_from_id(ident):
+        """Return the NumPy type string given the variable type id"""
+        try:
+            return LogTocElement.dtypes[ident]
+        except KeyError:
+            raise KeyError(
+                'Type [%d] not found in LogTocElement.dtypes!' % ident)
+
     def __init__(self, ident=0, data=None):
         """TocElement creator. Data is the binary payload of the element."""
 
@@ -457,6 +510,7 @@ class Log():
             logconf.cf = self.cf
             logconf.id = self._config_id_counter
             logconf.useV2 = self._useV2
+            logconf._compile()
             self._config_id_counter = (self._config_id_counter + 1) % 255
             self.log_blocks.append(logconf)
             self.block_added_cb.call(logconf)
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Captures the raw log data packets from the Crazyflie to a file for
+analysis after the flight.
+
+The file starts with a header followed by records of RECORD_SIZE bytes. A
+data record holds the host time when the packet was received and the raw
+packet (block id, 24 bit timestamp and the values). A layout record holds the
+name, period and variables of a log configuration as JSON, spread over as
+many records as needed, and applies to the data records of its block id that
+follow it.
+
+The fixed size records let the reader memory-map the file and decode all the
+packets of a block with NumPy at once. Reading requires NumPy, capturing
+does not.
+"""
+import json
+import logging
+import os
+import struct
+import time
+from threading import Lock
+
+from .log import CHAN_LOGDATA
+from .log import LogTocElement
+from cflib.crtp.crtpstack import CRTPPort
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__author__ = 'Bitcraze AB'
+__all__ = ['LogCaptureWriter', 'LogCaptureReader']
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'CFLC'
+_VERSION = 1
+_HEADER = struct.Struct('<4sB11x')
+
+# Record kinds
+_DATA = 1
+_LAYOUT = 2
+_LAYOUT_CONTINUATION = 3
+
+# Kind, length of the payload (the whole layout in the first layout record),
+# host time and payload
+_RECORD = struct.Struct('<BxH4xd32s')
+RECORD_SIZE = _RECORD.size
+_PAYLOAD_SIZE = 32
+
+
+class LogCaptureWriter:
+    """
+    Writes the raw log data packets received by a Crazyflie, and the layouts
+    of its log configurations, to a capture file.
+    """
+
+    def __init__(self, crazyflie, filename):
+        """
+        Create a writer for the log data of crazyflie (a Crazyflie). The file
+        is created when the capture is started.
+        """
+        self._cf = crazyflie
+        self._filename = filename
+        self._file = None
+        self._lock = Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        """
+        Create the file and start capturing. The layouts of the log
+        configurations already added are written first, the ones added later
+        when they are added.
+        """
+        if self._file:
+            raise Exception('Capture already started')
+        self._file = open(self._filename, 'wb')
+        self._file.write(_HEADER.pack(_MAGIC, _VERSION))
+        for log_config in list(self._cf.log.log_blocks):
+            self._write_layout(log_config)
+        self._cf.log.block_added_cb.add_callback(self._write_layout)
+        self._cf.incoming.add_header_callback(
+            self._packet_received, CRTPPort.LOGGING, CHAN_LOGDATA)
+
+    def stop(self):
+        """Stop capturing and close the file"""
+        if not self._file:
+            return
+        self._cf.incoming.remove_header_callback(
+            self._packet_received, CRTPPort.LOGGING, CHAN_LOGDATA)
+        self._cf.log.block_added_cb.remove_callback(self._write_layout)
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _write_layout(self, log_config):
+        layout = json.dumps({
+            'id': log_config.id,
+            'name': log_config.name,
+            'period_in_ms': log_config.period_in_ms,
+            'variables': [[var.name, var.fetch_as_string]
+                          for var in log_config.variables],
+        }).encode('utf-8')
+        records = [_RECORD.pack(_LAYOUT, len(layout), time.time(),
+                                layout[:_PAYLOAD_SIZE])]
+        for start in range(_PAYLOAD_SIZE, len(layout), _PAYLOAD_SIZE):
+            records.append(_RECORD.pack(
+                _LAYOUT_CONTINUATION, 0, 0,
+                layout[start:start + _PAYLOAD_SIZE]))
+        self._write(b''.join(records))
+
+    def _packet_received(self, packet):
+        data = bytes(packet.data)
+        self._write(_RECORD.pack(_DATA, len(data), time.time(), data))
+
+    def _write(self, records):
+        with self._lock:
+            if self._file:
+                self._file.write(records)
+
+
+class LogCaptureReader:
+    """
+    Reads a capture file written by LogCaptureWriter. The file is memory
+    mapped and the data of a block is decoded into a structured array, with
+    the fields timestamp (from the Crazyflie, in ms), host_time (in seconds)
+    and one field per variable.
+    """
+
+    def __init__(self, filename):
+        """Open and map a capture file"""
+        if np is None:
+            raise ImportError('LogCaptureReader requires NumPy')
+
+        with open(filename, 'rb') as f:
+            magic, version = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError('{} is not a log capture file'.format(filename))
+
+        dtype = np.dtype([('kind', 'u1'), ('pad1', 'u1'), ('length', '<u2'),
+                          ('pad2', 'u4'), ('host_time', '<f8'),
+                          ('payload', 'u1', (_PAYLOAD_SIZE,))])
+        size = (os.path.getsize(filename) - _HEADER.size) // RECORD_SIZE
+        if size > 0:
+            # A record being written when the capture stopped is ignored
+            self._records = np.memmap(filename, dtype=dtype, mode='r',
+                                      offset=_HEADER.size, shape=(size,))
+        else:
+            self._records = np.zeros(0, dtype=dtype)
+
+        # The layouts with the index of their first record
+        self.layouts = []
+        for index in np.nonzero(self._records['kind'] == _LAYOUT)[0]:
+            length = int(self._records['length'][index])
+            count = (length + _PAYLOAD_SIZE - 1) // _PAYLOAD_SIZE
+            data = self._records['payload'][index:index + count].tobytes()
+            layout = json.loads(data[:length].decode('utf-8'))
+            self.layouts.append((int(index), layout))
+
+    @property
+    def names(self):
+        """The names of the captured log configurations"""
+        names = []
+        for index, layout in self.layouts:
+            if layout['name'] not in names:
+                names.append(layout['name'])
+        return names
+
+    def read(self, name):
+        """
+        Decode all the data of the log configuration with the supplied name.
+        The data of several configurations with the same name is
+        concatenated if they have the same variables.
+        """
+        parts = []
+        variables = None
+        for i, (start, layout) in enumerate(self.layouts):
+            if layout['name'] != name:
+                continue
+            if variables is None:
+                variables = layout['variables']
+            elif variables != layout['variables']:
+                raise ValueError('The variables of {} changed during the '
+                                 'capture'.format(name))
+            # Until the next layout of the same block id
+            end = len(self._records)
+            for next_start, next_layout in self.layouts[i + 1:]:
+                if next_layout['id'] == layout['id']:
+                    end = next_start
+                    break
+            parts.append(self._decode(start, end, layout))
+
+        if variables is None:
+            raise KeyError('No log configuration {} in the capture'.format(
+                name))
+        return np.concatenate(parts)
+
+    def _decode(self, start, end, layout):
+        records = self._records[start:end]
+        payload = records['payload']
+        selected = np.nonzero((records['kind'] == _DATA) &
+                              (payload[:, 0] == layout['id']))[0]
+        payload = payload[selected]
+        ts = payload[:, 1:4].astype('<u4')
+
+        names = [name for name, fetch_as in layout['variables']]
+        formats = [LogTocElement.get_dtype_from_id(
+            LogTocElement.get_id_from_cstring(fetch_as))
+            for name, fetch_as in layout['variables']]
+        offsets = []
+        offset = 4
+        for fmt in formats:
+            offsets.append(offset)
+            offset += np.dtype(fmt).itemsize
+        values = np.ascontiguousarray(payload).view(np.dtype({
+            'names': names, 'formats': formats, 'offsets': offsets,
+            'itemsize': _PAYLOAD_SIZE}))[:, 0]
+
+        data = np.empty(len(selected), dtype=np.dtype(
+            [('timestamp', '<u4'), ('host_time', '<f8')] +
+            list(zip(names, formats))))
+        data['timestamp'] = ts[:, 0] | ts[:, 1] << 8 | ts[:, 2] << 16
+        data['host_time'] = records['host_time'][selected]
+        for name in names:
+            data[name] = values[name]
+        return data
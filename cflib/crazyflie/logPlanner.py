@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Plans the log blocks of a set of variables logged at different rates.
+
+A log block is limited to the size of one log data packet and to the number
+of variables that fit in the packet creating it. A LogStream takes any number
+of variables with the period each should be logged at, packs them into as few
+log blocks as possible and merges the data of the blocks back into one
+stream.
+"""
+import logging
+from threading import Lock
+
+from .log import LogConfig
+from .log import LogTocElement
+from .log import MAX_LOG_DATA_PACKET_SIZE
+from cflib.utils.callbacks import Caller
+
+__author__ = 'Bitcraze AB'
+__all__ = ['LogStream', 'plan_blocks']
+
+logger = logging.getLogger(__name__)
+
+# The size of the values in a log data packet, after the block id and the
+# timestamp
+MAX_BLOCK_SIZE = MAX_LOG_DATA_PACKET_SIZE - 4
+# The number of variables that fit in the packet creating a block, each takes
+# 3 bytes after the command and block id (2 bytes before protocol version 4)
+MAX_BLOCK_VARIABLES = (MAX_LOG_DATA_PACKET_SIZE - 2) // 3
+MAX_BLOCK_VARIABLES_V1 = (MAX_LOG_DATA_PACKET_SIZE - 2) // 2
+
+
+def plan_blocks(sizes, block_size=MAX_BLOCK_SIZE,
+                max_variables=MAX_BLOCK_VARIABLES, blocks=None):
+    """
+    Pack variables into blocks using first fit decreasing. sizes is a dict
+    of the size in bytes of each variable by name. The variables that are
+    not already in blocks, a list of lists of names, are added to them and
+    to new blocks when they don't fit. Returns the blocks.
+    """
+    blocks = [list(block) for block in blocks or []]
+    free = [block_size - sum(sizes[name] for name in block)
+            for block in blocks]
+    placed = set(name for block in blocks for name in block)
+    for name in sorted(set(sizes) - placed,
+                       key=lambda name: (-sizes[name], name)):
+        size = sizes[name]
+        if size > block_size:
+            raise ValueError('{} does not fit in a block'.format(name))
+        for i, block in enumerate(blocks):
+            if free[i] >= size and len(block) < max_variables:
+                block.append(name)
+                free[i] -= size
+                break
+        else:
+            blocks.append([name])
+            free.append(block_size - size)
+    return blocks
+
+
+def fp16_to_float(raw):
+    """Convert a half precision float, as a signed 16 bit int, to a float"""
+    raw &= 0xffff
+    sign = -1.0 if raw & 0x8000 else 1.0
+    exponent = (raw >> 10) & 0x1f
+    fraction = raw & 0x3ff
+    if exponent == 0:
+        return sign * fraction * 2.0 ** -24
+    if exponent == 0x1f:
+        return sign * float('inf') if fraction == 0 else float('nan')
+    return sign * (1024 + fraction) * 2.0 ** (exponent - 25)
+
+
+class LogStream:
+    """
+    Logs any number of variables, each at its own period, in as few log
+    blocks as possible. The blocks of variables with the same period are
+    filled first, and slower variables are moved to faster blocks if that
+    saves a block. Floats that are allowed to be narrowed are fetched as
+    FP16 if that saves a block.
+
+    data_received_cb is called with the timestamp, a dict of values by
+    variable name and the stream each time all the blocks with the same
+    period have been received. The dict has the variables of the blocks
+    with that period, which can include variables added with a longer
+    period.
+    """
+
+    def __init__(self, name):
+        """Initialize the stream, name is used for the log configurations"""
+        self.name = name
+        self.data_received_cb = Caller()
+        self.error_cb = Caller()
+        # Period, type and if FP16 is allowed of the variables, by name
+        self._variables = {}
+        self.configs = []
+        self._lock = Lock()
+        self._frames = {}
+        self._fp16 = set()
+
+    def add_variable(self, name, period_in_ms, fetch_as=None,
+                     allow_fp16=False):
+        """
+        Add a variable to log at least every period_in_ms. fetch_as is the
+        type to fetch it as, the type it's stored as if None. With
+        allow_fp16 a float may be fetched as FP16, it's converted back to a
+        float with less precision.
+        """
+        if period_in_ms < 10 or period_in_ms >= 2550:
+            raise ValueError('The period must be between 10 and 2540 ms')
+        self._variables[name] = (int(period_in_ms / 10) * 10, fetch_as,
+                                 allow_fp16)
+
+    def plan(self, toc, use_v2=True):
+        """
+        Create the log configurations for the variables, the types that are
+        not supplied are looked up in toc (a Toc). use_v2 is False for
+        Crazyflies with a protocol version below 4, which fit more variables
+        in a block. Returns the configurations.
+        """
+        if use_v2:
+            max_variables = MAX_BLOCK_VARIABLES
+        else:
+            max_variables = MAX_BLOCK_VARIABLES_V1
+        types = {}
+        for name, (period, fetch_as, allow_fp16) in self._variables.items():
+            if fetch_as is None:
+                element = toc.get_element_by_complete_name(name)
+                if element is None:
+                    raise KeyError('Variable {} not in TOC'.format(name))
+                fetch_as = element.ctype
+            types[name] = fetch_as
+
+        # Planned from the fastest period, (period, names) for each block
+        planned = []
+        planned_sizes = {}
+        fp16 = set()
+        for period in sorted(set(p for p, t, a in self._variables.values())):
+            names = [name for name, (p, t, a) in self._variables.items()
+                     if p == period]
+            narrowable = set(name for name in names
+                             if self._variables[name][2] and
+                             types[name] == 'float')
+            best = None
+            for narrow in (False, True) if narrowable else (False,):
+                sizes = dict((name, _size(
+                    'FP16' if narrow and name in narrowable else types[name]))
+                    for name in names)
+                faster = [block for p, block in planned]
+                for promote in (False, True) if faster else (False,):
+                    if promote:
+                        all_sizes = dict(planned_sizes)
+                        all_sizes.update(sizes)
+                        blocks = plan_blocks(all_sizes,
+                                             max_variables=max_variables,
+                                             blocks=faster)
+                        new = len(blocks) - len(faster)
+                    else:
+                        blocks = plan_blocks(sizes,
+                                             max_variables=max_variables)
+                        new = len(blocks)
+                    # Narrowing and promotion only if they save a block
+                    if best is None or new < best[0]:
+                        best = (new, narrow, promote, blocks)
+            new, narrow, promote, blocks = best
+            if narrow:
+                fp16.update(narrowable)
+            planned_sizes.update((name, _size(
+                'FP16' if name in fp16 else types[name])) for name in names)
+            if promote:
+                planned = [(p, block) for (p, old), block in
+                           zip(planned, blocks)]
+                blocks = blocks[len(planned):]
+            planned += [(period, block) for block in blocks]
+
+        self._fp16 = fp16
+        self.configs = []
+        self._frames = {}
+        for i, (period, block) in enumerate(planned):
+            config = LogConfig('{}-{}'.format(self.name, i), period)
+            for name in block:
+                config.add_variable(
+                    name, 'FP16' if name in fp16 else types[name])
+            config.data_received_cb.add_callback(self._data_received)
+            config.error_cb.add_callback(self._error)
+            self.configs.append(config)
+            frame = self._frames.setdefault(period, _Frame())
+            frame.configs.add(config)
+        logger.debug('Planned %d variables in %d blocks', len(types),
+                     len(self.configs))
+        return self.configs
+
+    def add(self, log):
+        """Plan the blocks with the TOC of log (a Log) and add them to it"""
+        use_v2 = log.cf.platform.get_protocol_version() >= 4
+        for config in self.plan(log.toc, use_v2):
+            log.add_config(config)
+
+    def start(self):
+        """Start logging all the blocks"""
+        for config in self.configs:
+            config.start()
+
+    def stop(self):
+        """Stop logging all the blocks"""
+        for config in self.configs:
+            config.stop()
+
+    def delete(self):
+        """Delete all the blocks in the Crazyflie"""
+        for config in self.configs:
+            config.delete()
+
+    def _data_received(self, timestamp, data, config):
+        frame = self._frames[config.period_in_ms]
+        with self._lock:
+            frame.values.update(data)
+            frame.received.add(config)
+            if len(frame.received) < len(frame.configs):
+                return
+            frame.received.clear()
+            values = dict(frame.values)
+        for name in self._fp16.intersection(values):
+            values[name] = fp16_to_float(values[name])
+        self.data_received_cb.call(timestamp, values, self)
+
+    def _error(self, config, msg):
+        self.error_cb.call(self, msg)
+
+
+class _Frame:
+    """The latest values of the blocks with the same period"""
+
+    def __init__(self):
+        self.configs = set()
+        self.received = set()
+        self.values = {}
+
+
+def _size(ctype):
+    return LogTocElement.get_size_from_id(
+        LogTocElement.get_id_from_cstring(ctype))
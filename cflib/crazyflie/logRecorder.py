@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Records log data from the Crazyflie in NumPy arrays.
+
+The samples of a log configuration are written to a preallocated ring
+buffer, a structured array with a timestamp field and one field per variable
+in the order of the configuration. The memory used is fixed by the capacity,
+when it's full the oldest samples are overwritten.
+
+Requires NumPy.
+"""
+import logging
+from threading import Lock
+
+from .log import LogTocElement
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__author__ = 'Bitcraze AB'
+__all__ = ['LogRecorder']
+
+logger = logging.getLogger(__name__)
+
+
+class LogRecorder:
+    """
+    Records the data of a log configuration in a ring buffer of capacity
+    samples. Every sample is written twice, capacity samples apart, so the
+    last samples are always contiguous and windows of them are views of the
+    buffer instead of copies.
+    """
+
+    def __init__(self, log_config, capacity):
+        """
+        Create a recorder for the variables of log_config. Add the variables
+        before creating the recorder, and start and stop the recording with
+        start() and stop(), or use it as a context manager.
+        """
+        if np is None:
+            raise ImportError('LogRecorder requires NumPy')
+        if capacity < 1:
+            raise ValueError('The capacity must be at least 1')
+
+        self._log_config = log_config
+        self._names = [var.name for var in log_config.variables]
+        if not self._names:
+            raise ValueError('The log configuration has no variables')
+        self.dtype = np.dtype(
+            [('timestamp', '<u4')] +
+            [(var.name, LogTocElement.get_dtype_from_id(var.fetch_as))
+             for var in log_config.variables])
+        self.capacity = capacity
+        self._buffer = np.zeros(2 * capacity, dtype=self.dtype)
+        self._lock = Lock()
+        # The total number of samples received
+        self.nr_of_samples = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        """Start recording the data received for the log configuration"""
+        self._log_config.data_received_cb.add_callback(self._data_received)
+
+    def stop(self):
+        """Stop recording, the recorded samples are kept"""
+        self._log_config.data_received_cb.remove_callback(self._data_received)
+
+    def clear(self):
+        """Remove all the recorded samples"""
+        with self._lock:
+            self.nr_of_samples = 0
+
+    @property
+    def nbytes(self):
+        """The number of bytes used by the buffer, it doesn't grow"""
+        return self._buffer.nbytes
+
+    @property
+    def dropped(self):
+        """The number of samples that have been overwritten"""
+        return max(0, self.nr_of_samples - self.capacity)
+
+    def __len__(self):
+        return min(self.nr_of_samples, self.capacity)
+
+    def _data_received(self, timestamp, data, log_config):
+        if isinstance(data, dict):
+            data = [data[name] for name in self._names]
+        sample = (timestamp,) + tuple(data)
+        with self._lock:
+            index = self.nr_of_samples % self.capacity
+            self._buffer[index] = sample
+            self._buffer[index + self.capacity] = sample
+            self.nr_of_samples += 1
+
+    def window(self, n=None):
+        """
+        Get the last n samples (all recorded if n is None) as a structured
+        array in the order they were received. The array is a view of the
+        buffer, the samples in it are overwritten as new samples are
+        recorded after another capacity - n samples, copy it to keep it.
+        """
+        with self._lock:
+            length = min(self.nr_of_samples, self.capacity)
+            if n is not None:
+                length = min(n, length)
+            if self.nr_of_samples <= self.capacity:
+                end = self.nr_of_samples
+            else:
+                # The end of the second copy of the newest sample
+                end = (self.nr_of_samples - 1) % self.capacity + 1 + \
+                    self.capacity
+            return self._buffer[end - length:end]
+
+    def column(self, name, n=None):
+        """Get the last n values of one variable, or timestamps, as a view"""
+        return self.window(n)[name]
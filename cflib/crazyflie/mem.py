@@ -906,13 +906,13 @@ class _ReadRequest:
     """
     MAX_DATA_LENGTH = 20
 
-    def __init__(self, mem, addr, length, cf):
+    def __init__(self, mem, addr, length, send_request):
         """Initialize the object with good defaults"""
         self.mem = mem
         self.addr = addr
         self._bytes_left = length
         self.data = bytearray()
-        self.cf = cf
+        self._send_request = send_request
 
         self._current_addr = addr
 
@@ -941,7 +941,7 @@ class _ReadRequest:
         pk.set_header(CRTPPort.MEM, CHAN_READ)
         pk.data = struct.pack('<BIB', self.mem.id, self._current_addr, new_len)
         reply = struct.unpack('<BBBBB', pk.data[:-1])
-        self.cf.send_packet(pk, expected_reply=reply, timeout=1)
+        self._send_request(pk, reply)
 
     def add_data(self, addr, data):
         """Callback when data is received from the Crazyflie"""
@@ -970,14 +970,14 @@ class _WriteRequest:
     """
     MAX_DATA_LENGTH = 25
 
-    def __init__(self, mem, addr, data, cf):
+    def __init__(self, mem, addr, data, send_request):
         """Initialize the object with good defaults"""
         self.mem = mem
         self.addr = addr
         self._bytes_left = len(data)
         self._data = data
         self.data = bytearray()
-        self.cf = cf
+        self._send_request = send_request
 
         self._current_addr = addr
 
@@ -992,8 +992,7 @@ class _WriteRequest:
 
     def resend(self):
         logger.debug('Sending write again...')
-        self.cf.send_packet(
-            self._sent_packet, expected_reply=self._sent_reply, timeout=1)
+        self._send_request(self._sent_packet, self._sent_reply)
 
     def _write_new_chunk(self):
         """
@@ -1019,7 +1018,7 @@ class _WriteRequest:
         # Add the data
         pk.data += struct.pack('B' * len(data), *data)
         self._sent_packet = pk
-        self.cf.send_packet(pk, expected_reply=reply, timeout=1)
+        self._send_request(pk, reply)
 
         self._addr_add = len(data)
 
@@ -1063,7 +1062,6 @@ class Memory():
         self.mem_write_cb = Caller()
 
         self.cf = crazyflie
-        self.cf.add_port_callback(CRTPPort.MEM, self._new_packet_cb)
         self.cf.disconnected.add_callback(self._disconnected)
         self._write_requests_lock = Lock()
 
@@ -1123,7 +1121,7 @@ class Memory():
 
     def write(self, memory, addr, data, flush_queue=False):
         """Write the specified data to the given memory at the given address"""
-        wreq = _WriteRequest(memory, addr, data, self.cf)
+        wreq = _WriteRequest(memory, addr, data, self._send_request)
         if memory.id not in self._write_requests:
             self._write_requests[memory.id] = []
 
@@ -1150,7 +1148,7 @@ class Memory():
                            'memory id {}'.format(memory.id))
             return False
 
-        rreq = _ReadRequest(memory, addr, length, self.cf)
+        rreq = _ReadRequest(memory, addr, length, self._send_request)
         self._read_requests[memory.id] = rreq
 
         rreq.start()
@@ -1177,14 +1175,27 @@ class Memory():
         pk = CRTPPacket()
         pk.set_header(CRTPPort.MEM, CHAN_INFO)
         pk.data = (CMD_INFO_NBR,)
-        self.cf.send_packet(pk, expected_reply=(CMD_INFO_NBR,))
+        self._send_request(pk, (CMD_INFO_NBR,))
 
     def _disconnected(self, uri):
         """The link to the Crazyflie has been broken. Reset state"""
         self._clear_state()
 
+    def _send_request(self, pk, expected_reply):
+        """Send a request, the answer is handled by _new_packet_cb"""
+        self.cf.send_request(pk, expected_reply).add_done_callback(
+            self._answer_received)
+
+    def _answer_received(self, future):
+        if future.cancelled() or future.exception() is not None:
+            logger.debug('Memory request failed: %s',
+                         'cancelled' if future.cancelled()
+                         else future.exception())
+            return
+        self._new_packet_cb(future.result())
+
     def _new_packet_cb(self, packet):
-        """Callback for newly arrived packets for the memory port"""
+        """Callback for answers to the memory requests"""
         chan = packet.channel
         cmd = packet.data[0]
         payload = packet.data[1:]
@@ -1203,8 +1214,7 @@ class Memory():
                         pk = CRTPPacket()
                         pk.set_header(CRTPPort.MEM, CHAN_INFO)
                         pk.data = (CMD_INFO_DETAILS, 0)
-                        self.cf.send_packet(pk, expected_reply=(
-                            CMD_INFO_DETAILS, 0))
+                        self._send_request(pk, (CMD_INFO_DETAILS, 0))
                 else:
                     self._refresh_callback()
 
@@ -1300,8 +1310,7 @@ class Memory():
                     pk = CRTPPacket()
                     pk.set_header(CRTPPort.MEM, CHAN_INFO)
                     pk.data = (CMD_INFO_DETAILS, self._fetch_id)
-                    self.cf.send_packet(pk, expected_reply=(
-                        CMD_INFO_DETAILS, self._fetch_id))
+                    self._send_request(pk, (CMD_INFO_DETAILS, self._fetch_id))
                 else:
                     logger.debug(
                         'Done getting all the memories, start reading the OWs')
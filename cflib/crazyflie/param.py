@@ -34,25 +34,37 @@ the parameters that can be written/read.
 import logging
 import struct
 import sys
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError
+from concurrent.futures import wait
+from threading import current_thread
 from threading import Lock
-from threading import Thread
 
+from .toc import get_fetch_window
+from .toc import request_timeout
+from .toc import set_fetch_window
 from .toc import Toc
 from .toc import TocFetcher
 from cflib.crtp.crtpstack import CRTPPacket
 from cflib.crtp.crtpstack import CRTPPort
 from cflib.utils.callbacks import Caller
-if sys.version_info < (3,):
-    from Queue import Queue
-else:
-    from queue import Queue
-
 
 __author__ = 'Bitcraze AB'
-__all__ = ['Param', 'ParamTocElement']
+__all__ = ['Param', 'ParamTocElement', 'set_fetch_window']
 
 logger = logging.getLogger(__name__)
 
+if sys.version_info < (3,):
+    _string_types = basestring  # noqa: F821
+else:
+    _string_types = str
+
+# Strings written as booleans, like the values accepted when the strings were
+# evaluated
+_booleans = {'True': 1, 'False': 0}
+
 # Possible states
 IDLE = 0
 WAIT_TOC = 1
@@ -66,8 +78,9 @@ WRITE_CHANNEL = 2
 # One element entry in the TOC
 
 
-class ParamTocElement:
+class ParamTocElement(object):
     """An element in the Log TOC."""
+    __slots__ = ('ident', 'group', 'name', 'ctype', 'pytype', 'access')
 
     RW_ACCESS = 0
     RO_ACCESS = 1
@@ -84,6 +97,10 @@ class ParamTocElement:
              0x06: ('float', '<f'),
              0x07: ('double', '<d')}
 
+    # The precompiled codecs of the types, by struct format
+    _codecs = dict((pytype, struct.Struct(pytype))
+                   for ctype, pytype in types.values())
+
     def __init__(self, ident=0, data=None):
         """TocElement creator. Data is the binary payload of the element."""
         self.ident = ident
@@ -115,13 +132,41 @@ class ParamTocElement:
             return 'RO'
         return 'RW'
 
+    @property
+    def codec(self):
+        """The struct.Struct used to pack and unpack the value"""
+        return self._codecs[self.pytype]
+
+    def is_float(self):
+        """True if the value is a floating point number"""
+        return self.ctype in ('FP16', 'float', 'double')
+
+    def parse_value(self, value):
+        """
+        Convert a value to the native type of the parameter, strings are
+        parsed as a float, an integer (with base prefix, ie 0x10) or as
+        True/False.
+        """
+        if not isinstance(value, _string_types):
+            return value
+        if self.is_float():
+            return float(_booleans.get(value, value))
+        if value in _booleans:
+            return _booleans[value]
+        return int(value, 0)
+
 
 class Param():
     """
     Used to read and write parameter values in the Crazyflie.
     """
 
-    def __init__(self, crazyflie):
+    def __init__(self, crazyflie, lazy=False):
+        """
+        Create the param handler. With lazy set the param values are not all
+        fetched after connecting, each value is fetched the first time it's
+        accessed with get_value() instead.
+        """
         self.toc = Toc()
 
         self.cf = crazyflie
@@ -133,33 +178,57 @@ class Param():
 
         self.param_updater = _ParamUpdater(
             self.cf, self._useV2, self._param_updated)
-        self.param_updater.start()
 
         self.cf.disconnected.add_callback(self._disconnected)
 
         self.all_updated = Caller()
         self.is_updated = False
+        # Time in seconds it took to update all the params after connecting
+        self.all_updated_time = None
+        self._update_start_time = None
 
+        # The values as strings, by group and name
         self.values = {}
+        # The native values indexed by param id, None until fetched
+        self._values = []
+        self._nr_of_values = 0
+
+        self.lazy = lazy
+        # Futures waiting for the value of a param, by complete name
+        self._value_futures = {}
+        # Futures waiting for write acknowledgements in the order the writes
+        # were sent, by complete name
+        self._write_futures = {}
+        self._value_lock = Lock()
 
     def request_update_of_all_params(self):
-        """Request an update of all the parameters in the TOC"""
-        for group in self.toc.toc:
-            for name in self.toc.toc[group]:
-                complete_name = '%s.%s' % (group, name)
-                self.request_param_update(complete_name)
+        """
+        Request an update of all the parameters in the TOC, all_updated is
+        called once they have all been fetched. This is done after connecting
+        unless lazy is set.
+        """
+        self._update_start_time = time.time()
+        for element in self.toc:
+            self.param_updater.request_param_update(element.ident)
 
     def _check_if_all_updated(self):
         """Check if all parameters from the TOC has at least been fetched
         once"""
-        for g in self.toc.toc:
-            if g not in self.values:
-                return False
-            for n in self.toc.toc[g]:
-                if n not in self.values[g]:
-                    return False
-
-        return True
+        return self._nr_of_values >= len(self.toc)
+
+    def _store_value(self, ident, value):
+        """Save a native value in the id-indexed array"""
+        if ident >= len(self._values):
+            self._values.extend([None] * (ident + 1 - len(self._values)))
+        if self._values[ident] is None:
+            self._nr_of_values += 1
+        self._values[ident] = value
+
+    def _cached_value(self, ident):
+        """The native value of a param, None if it's not fetched"""
+        if ident < len(self._values):
+            return self._values[ident]
+        return None
 
     def _param_updated(self, pk):
         """Callback with data for an updated parameter"""
@@ -169,17 +238,26 @@ class Param():
             var_id = pk.data[0]
         element = self.toc.get_element_by_id(var_id)
         if element:
-            if self._useV2:
-                s = struct.unpack(element.pytype, pk.data[2:])[0]
-            else:
-                s = struct.unpack(element.pytype, pk.data[1:])[0]
-            s = s.__str__()
+            value = element.codec.unpack_from(
+                pk.data, 2 if self._useV2 else 1)[0]
+            s = str(value)
             complete_name = '%s.%s' % (element.group, element.name)
 
             # Save the value for synchronous access
-            if element.group not in self.values:
-                self.values[element.group] = {}
-            self.values[element.group][element.name] = s
+            with self._value_lock:
+                self._store_value(var_id, value)
+                if element.group not in self.values:
+                    self.values[element.group] = {}
+                self.values[element.group][element.name] = s
+                futures = self._value_futures.pop(complete_name, [])
+                writes = self._write_futures.get(complete_name)
+                if pk.channel == WRITE_CHANNEL and writes:
+                    futures.append(writes.popleft())
+                    if not writes:
+                        del self._write_futures[complete_name]
+            for future in futures:
+                if not future.done():
+                    future.set_result(value)
 
             logger.debug('Updated parameter [%s]' % complete_name)
             if complete_name in self.param_update_callbacks:
@@ -195,6 +273,11 @@ class Param():
             # updated callbacks)
             if self._check_if_all_updated() and not self.is_updated:
                 self.is_updated = True
+                if self._update_start_time is not None:
+                    self.all_updated_time = \
+                        time.time() - self._update_start_time
+                    logger.info('All params updated in %.3f s',
+                                self.all_updated_time)
                 self.all_updated.call()
         else:
             logger.debug('Variable id [%d] not found in TOC', var_id)
@@ -243,9 +326,23 @@ class Param():
         """Disconnected callback from Crazyflie API"""
         self.param_updater.close()
         self.is_updated = False
+        self.all_updated_time = None
+        self._update_start_time = None
         # Clear all values from the previous Crazyflie
         self.toc = Toc()
-        self.values = {}
+        with self._value_lock:
+            self.values = {}
+            self._values = []
+            self._nr_of_values = 0
+            futures = [future for waiting in
+                       list(self._value_futures.values()) +
+                       list(self._write_futures.values())
+                       for future in waiting]
+            self._value_futures = {}
+            self._write_futures = {}
+        for future in futures:
+            if not future.done():
+                future.set_exception(IOError('Disconnected from ' + uri))
 
     def request_param_update(self, complete_name):
         """
@@ -254,10 +351,134 @@ class Param():
         self.param_updater.request_param_update(
             self.toc.get_element_id(complete_name))
 
+    def get_value_async(self, complete_name):
+        """
+        Get the native value (int or float) of the supplied parameter as a
+        Future. The cached value is used if the parameter has been read or
+        written before, otherwise the value is fetched from the Crazyflie.
+        The Future fails with an IOError if the Crazyflie is disconnected
+        before the value arrives.
+        """
+        element = self.toc.get_element_by_complete_name(complete_name)
+        if not element:
+            raise KeyError('{} not in param TOC'.format(complete_name))
+
+        future = Future()
+        with self._value_lock:
+            value = self._cached_value(element.ident)
+            if value is not None:
+                future.set_result(value)
+                return future
+            if not self.cf.link:
+                future.set_exception(IOError('Not connected'))
+                return future
+            waiting = self._value_futures.setdefault(complete_name, [])
+            waiting.append(future)
+            request = len(waiting) == 1
+        if request:
+            self.param_updater.request_param_update(element.ident)
+        return future
+
+    def get_value(self, complete_name, timeout=None):
+        """
+        Get the native value (int or float) of the supplied parameter,
+        fetching it from the Crazyflie if it's not cached. Blocks until the
+        value is available or timeout seconds have passed.
+
+        Can't wait for a value that is not cached from a callback of the
+        Crazyflie, use get_value_async() there.
+        """
+        future = self.get_value_async(complete_name)
+        if not future.done():
+            self._check_can_wait('get_value_async()')
+        return future.result(timeout)
+
     def set_value(self, complete_name, value):
         """
-        Set the value for the supplied parameter.
+        Set the value for the supplied parameter. The value is either of the
+        native type of the parameter or a string that is parsed to it.
+        """
+        self.set_value_async(complete_name, value)
+
+    def set_value_async(self, complete_name, value):
+        """
+        Set the value for the supplied parameter and return a Future of the
+        native value the Crazyflie acknowledged the write with.
+        """
+        element = self._writable_element(complete_name)
+        pk = self._write_packet(element, element.parse_value(value))
+        future = Future()
+        if not self.cf.link:
+            future.set_exception(IOError('Not connected'))
+            return future
+        with self._value_lock:
+            self._write_futures.setdefault(complete_name, deque()).append(
+                future)
+        self.param_updater.request_param_setvalue(pk)
+        return future
+
+    def set_values(self, values, timeout=None, skip_unchanged=True):
+        """
+        Set the values of several parameters, supplied as a dict of values by
+        complete name, and wait until timeout seconds for the Crazyflie to
+        acknowledge them. The writes are sent together, up to the fetch
+        window at a time. With skip_unchanged the parameters whose cached
+        value already equals the new value are not written, don't use it for
+        parameters the Crazyflie changes itself.
+
+        Returns the complete names of the parameters that were not
+        acknowledged with the new value, an empty list if all succeeded.
+
+        Can't be called from a callback of the Crazyflie, use
+        set_value_async() there.
         """
+        writes = []
+        for complete_name, value in values.items():
+            element = self._writable_element(complete_name)
+            # The value as it will be stored in the Crazyflie
+            value = element.codec.unpack(
+                element.codec.pack(element.parse_value(value)))[0]
+            with self._value_lock:
+                cached = self._cached_value(element.ident)
+            if skip_unchanged and cached == value:
+                logger.debug('[%s] already has the value %s, not writing it',
+                             complete_name, value)
+                continue
+            writes.append((complete_name, value))
+
+        if writes:
+            self._check_can_wait('set_value_async()')
+        futures = [self.set_value_async(complete_name, value)
+                   for complete_name, value in writes]
+        wait(futures, timeout)
+
+        failed = []
+        for (complete_name, value), future in zip(writes, futures):
+            if not future.done():
+                logger.warning('No acknowledgement for [%s]', complete_name)
+            elif future.exception() is not None:
+                logger.warning('Could not set [%s]: %s', complete_name,
+                               future.exception())
+            elif future.result() != value:
+                logger.warning('[%s] was set to %s instead of %s',
+                               complete_name, future.result(), value)
+            else:
+                continue
+            failed.append(complete_name)
+        return failed
+
+    def _check_can_wait(self, alternative):
+        """
+        The answers are dispatched by the thread calling the callbacks of the
+        Crazyflie, waiting for them on that thread would never end
+        """
+        if current_thread() is self.cf.incoming:
+            raise RuntimeError('Can not wait for answers from the Crazyflie '
+                               'in one of its callbacks, use {} '
+                               'instead'.format(alternative))
+
+    def _writable_element(self, complete_name):
+        """Get the TOC element of a parameter that can be written"""
         element = self.toc.get_element_by_complete_name(complete_name)
 
         if not element:
@@ -268,74 +489,44 @@ class Param():
             logger.debug('[%s] is read only, no trying to set value',
                          complete_name)
             raise AttributeError('{} is read-only!'.format(complete_name))
-        else:
-            varid = element.ident
-            pk = CRTPPacket()
-            pk.set_header(CRTPPort.PARAM, WRITE_CHANNEL)
-            if self._useV2:
-                pk.data = struct.pack('<H', varid)
-            else:
-                pk.data = struct.pack('<B', varid)
+        return element
 
-            try:
-                value_nr = eval(value)
-            except TypeError:
-                value_nr = value
-
-            pk.data += struct.pack(element.pytype, value_nr)
-            self.param_updater.request_param_setvalue(pk)
+    def _write_packet(self, element, value):
+        """Create the packet writing a native value to a parameter"""
+        pk = CRTPPacket()
+        pk.set_header(CRTPPort.PARAM, WRITE_CHANNEL)
+        if self._useV2:
+            pk.data = struct.pack('<H', element.ident)
+        else:
+            pk.data = struct.pack('<B', element.ident)
+        pk.data += element.codec.pack(value)
+        return pk
 
 
-class _ParamUpdater(Thread):
-    """This thread will update params through a queue to make sure that we
-    get back values"""
+class _ParamUpdater():
+    """Sends the param read and write requests, up to window of them at a
+    time, to make sure that we get back values"""
 
     def __init__(self, cf, useV2, updated_callback):
-        """Initialize the thread"""
-        Thread.__init__(self)
-        self.setDaemon(True)
-        self.wait_lock = Lock()
+        """Initialize the updater"""
         self.cf = cf
         self._useV2 = useV2
         self.updated_callback = updated_callback
-        self.request_queue = Queue()
-        self.cf.add_port_callback(CRTPPort.PARAM, self._new_packet_cb)
-        self._should_close = False
-        self._req_param = -1
+        self._lock = Lock()
+        self._request_queue = deque()
+        # The expected replies of the requests waiting for an answer
+        self._outstanding = set()
 
     def close(self):
-        # First empty the queue from all packets
-        while not self.request_queue.empty():
-            self.request_queue.get()
-        # Then force an unlock of the mutex if we are waiting for a packet
-        # we didn't get back due to a disconnect for example.
-        try:
-            self.wait_lock.release()
-        except Exception:
-            pass
+        """Drop the requests that have not been sent"""
+        with self._lock:
+            self._request_queue.clear()
+            self._outstanding.clear()
 
     def request_param_setvalue(self, pk):
         """Place a param set value request on the queue. When this is sent to
         the Crazyflie it will answer with the update param value. """
-        self.request_queue.put(pk)
-
-    def _new_packet_cb(self, pk):
-        """Callback for newly arrived packets"""
-        if pk.channel == READ_CHANNEL or pk.channel == WRITE_CHANNEL:
-            if self._useV2:
-                var_id = struct.unpack('<H', pk.data[:2])[0]
-                if pk.channel == READ_CHANNEL:
-                    pk.data = pk.data[:2] + pk.data[3:]
-            else:
-                var_id = pk.data[0]
-            if (pk.channel != TOC_CHANNEL and self._req_param == var_id and
-                    pk is not None):
-                self.updated_callback(pk)
-                self._req_param = -1
-                try:
-                    self.wait_lock.release()
-                except Exception:
-                    pass
+        self._queue_request(pk)
 
     def request_param_update(self, var_id):
         """Place a param update request on the queue"""
@@ -347,20 +538,68 @@ class _ParamUpdater(Thread):
         else:
             pk.data = struct.pack('<B', var_id)
         logger.debug('Requesting request to update param [%d]', var_id)
-        self.request_queue.put(pk)
-
-    def run(self):
-        while not self._should_close:
-            pk = self.request_queue.get()  # Wait for request update
-            self.wait_lock.acquire()
-            if self.cf.link:
-                if self._useV2:
-                    self._req_param = struct.unpack('<H', pk.data[:2])[0]
-                    self.cf.send_packet(
-                        pk, expected_reply=(tuple(pk.data[:2])))
-                else:
-                    self._req_param = pk.data[0]
-                    self.cf.send_packet(
-                        pk, expected_reply=(tuple(pk.data[:1])))
-            else:
-                self.wait_lock.release()
+        self._queue_request(pk)
+
+    def _queue_request(self, pk):
+        with self._lock:
+            self._request_queue.append(pk)
+        self._send_requests()
+
+    def _expected_reply(self, pk):
+        if self._useV2:
+            return (pk.header,) + tuple(pk.data[:2])
+        return (pk.header,) + tuple(pk.data[:1])
+
+    def _send_requests(self):
+        """Send the queued requests that fit in the window. A request is not
+        sent while another one expecting the same reply is outstanding, since
+        the reply could not be told apart."""
+        to_send = []
+        with self._lock:
+            if not self.cf.link:
+                self._request_queue.clear()
+                return
+            while self._request_queue and \
+                    len(self._outstanding) < get_fetch_window():
+                expected_reply = self._expected_reply(self._request_queue[0])
+                if expected_reply in self._outstanding:
+                    break
+                self._outstanding.add(expected_reply)
+                to_send.append(self._request_queue.popleft())
+
+        for pk in to_send:
+            self._send_request(pk)
+
+    def _send_request(self, pk):
+        future = self.cf.send_request(pk, self._expected_reply(pk)[1:],
+                                      request_timeout(self.cf))
+        future.add_done_callback(
+            lambda future: self._answer_received(future, pk))
+
+    def _answer_received(self, future, pk):
+        """Callback for the answer to a request"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if isinstance(error, TimeoutError):
+            with self._lock:
+                retry = self._expected_reply(pk) in self._outstanding
+            if retry:
+                logger.debug('No answer to param request %s, sending it '
+                             'again', self._expected_reply(pk))
+                self._send_request(pk)
+            return
+        if error is not None:
+            # The link is gone, drop the other requests as well
+            self.close()
+            return
+
+        with self._lock:
+            self._outstanding.discard(self._expected_reply(pk))
+        answer = future.result()
+        if self._useV2 and answer.channel == READ_CHANNEL:
+            # Remove the status byte
+            answer = CRTPPacket(answer.header,
+                                answer.data[:2] + answer.data[3:])
+        self.updated_callback(answer)
+        self._send_requests()
@@ -59,11 +59,6 @@ class PlatformService():
         """
         self._cf = crazyflie
 
-        self._cf.add_port_callback(CRTPPort.PLATFORM,
-                                   self._platform_callback)
-        self._cf.add_port_callback(CRTPPort.LINKCTRL,
-                                   self._crt_service_callback)
-
         # Request protocol version.
         # The semaphore makes sure that other module will wait for the version
         # to be received before using it.
@@ -104,7 +99,20 @@ class PlatformService():
         pk = CRTPPacket()
         pk.set_header(CRTPPort.LINKCTRL, LINKSERVICE_SOURCE)
         pk.data = (0,)
-        self._cf.send_packet(pk)
+        self._send_request(pk, (), self._crt_service_callback)
+
+    def _send_request(self, pk, expected_reply, callback):
+        """Send a request and pass the answer to callback"""
+        def _answer_received(future):
+            if future.cancelled() or future.exception() is not None:
+                logger.info('Fetching platform information failed: %s',
+                            'cancelled' if future.cancelled()
+                            else future.exception())
+                return
+            callback(future.result())
+
+        self._cf.send_request(pk, expected_reply).add_done_callback(
+            _answer_received)
 
     def _crt_service_callback(self, pk):
         if pk.channel == LINKSERVICE_SOURCE:
@@ -114,7 +122,8 @@ class PlatformService():
                 pk = CRTPPacket()
                 pk.set_header(CRTPPort.PLATFORM, VERSION_COMMAND)
                 pk.data = (VERSION_GET_PROTOCOL, )
-                self._cf.send_packet(pk)
+                self._send_request(pk, (VERSION_GET_PROTOCOL,),
+                                   self._platform_callback)
             else:
                 self._protocolVersion = -1
                 logger.info('Procotol version: {}'.format(
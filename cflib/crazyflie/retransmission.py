@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Scheduler used for resending packets that have not been answered.
+
+All the Crazyflie instances in a process share one scheduler, which keeps the
+pending retransmissions in a heap served by a single thread, instead of using
+one thread per packet waiting for an answer. The time to wait before resending
+is estimated per link from the measured round trip times.
+
+The scheduler also runs the periodic work of the links, like sending link
+probes, so that a link does not need a thread of its own for it.
+"""
+import heapq
+import logging
+import time
+from threading import Condition
+from threading import Lock
+from threading import Thread
+
+__author__ = 'Bitcraze AB'
+__all__ = ['RetransmissionScheduler', 'RttEstimator', 'get_scheduler']
+
+logger = logging.getLogger(__name__)
+
+_clock = getattr(time, 'monotonic', time.time)
+
+# The heap is rebuilt without the cancelled entries when they are more than
+# this part of it
+_COMPACT_RATIO = 0.5
+_COMPACT_MIN_SIZE = 64
+
+# Bounds and clock granularity of the retransmission timeout, in seconds
+INITIAL_RTO = 0.2
+MIN_RTO = 0.02
+MAX_RTO = 2.0
+_GRANULARITY = 0.005
+
+_scheduler = None
+_scheduler_lock = Lock()
+
+
+class _Entry():
+    """A scheduled retransmission, cancelled by calling cancel()"""
+
+    __slots__ = ('deadline', 'callback', 'args', 'period', '_scheduler')
+
+    def __init__(self, scheduler, deadline, callback, args, period=None):
+        self._scheduler = scheduler
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.period = period
+
+    def __lt__(self, other):
+        return self.deadline < other.deadline
+
+    @property
+    def cancelled(self):
+        return self.callback is None
+
+    def cancel(self):
+        """Cancel the retransmission, does nothing if it has already run"""
+        # The entry is marked as run under the same lock when it expires
+        with self._scheduler._condition:
+            if self.callback is not None:
+                self.callback = None
+                self.args = None
+                self._scheduler._cancelled()
+
+
+class RetransmissionScheduler(Thread):
+    """
+    Calls the scheduled callbacks when their timeout has passed. A callback
+    should return True if it resent its packet.
+
+    The callbacks are called from the thread of the scheduler and should
+    return quickly since they delay all other retransmissions.
+    """
+
+    def __init__(self):
+        Thread.__init__(self)
+        self.name = 'RetransmissionScheduler'
+        self.daemon = True
+        self._heap = []
+        self._nr_of_cancelled = 0
+        self._condition = Condition()
+        self.nr_of_timeouts = 0
+        self.nr_of_resends = 0
+
+    def schedule(self, timeout, callback, *args):
+        """
+        Call callback with args after timeout seconds unless the returned
+        entry is cancelled before that
+        """
+        with self._condition:
+            entry = _Entry(self, _clock() + timeout, callback, args)
+            self._push(entry)
+        return entry
+
+    def schedule_periodic(self, period, callback, *args):
+        """
+        Call callback with args every period seconds until the returned entry
+        is cancelled or the callback returns False. The calls are not counted
+        as timeouts.
+        """
+        with self._condition:
+            entry = _Entry(self, _clock() + period, callback, args, period)
+            self._push(entry)
+        return entry
+
+    def __len__(self):
+        """The number of retransmissions waiting to be run"""
+        with self._condition:
+            return len(self._heap) - self._nr_of_cancelled
+
+    def reset_counters(self):
+        """Reset the number of timeouts and resends to 0"""
+        self.nr_of_timeouts = 0
+        self.nr_of_resends = 0
+
+    def _push(self, entry):
+        """Add an entry to the heap, called with the condition held"""
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._condition.notify()
+
+    def _cancelled(self):
+        """An entry of the heap has been cancelled, called with the condition
+        held"""
+        self._nr_of_cancelled += 1
+        if self._nr_of_cancelled > _COMPACT_MIN_SIZE and \
+                self._nr_of_cancelled > len(self._heap) * _COMPACT_RATIO:
+            self._heap = [e for e in self._heap if not e.cancelled]
+            heapq.heapify(self._heap)
+            self._nr_of_cancelled = 0
+
+    def _pop_expired(self):
+        """Wait for the first entry to expire and remove it from the heap"""
+        with self._condition:
+            while True:
+                while self._heap and self._heap[0].cancelled:
+                    heapq.heappop(self._heap)
+                    self._nr_of_cancelled -= 1
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                delay = self._heap[0].deadline - _clock()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                entry = heapq.heappop(self._heap)
+                callback, args = entry.callback, entry.args
+                if entry.period is None:
+                    # Mark the entry as run so cancelling it does nothing
+                    entry.callback = None
+                    entry.args = None
+                else:
+                    # Periodic entries are back in the heap while they run,
+                    # a late run does not cause a burst of runs
+                    entry.deadline = max(entry.deadline + entry.period,
+                                         _clock())
+                    self._push(entry)
+                return entry, callback, args
+
+    def run(self):
+        while True:
+            entry, callback, args = self._pop_expired()
+            if entry.period is not None:
+                self._run_periodic(entry, callback, args)
+                continue
+
+            self.nr_of_timeouts += 1
+            try:
+                if callback(*args):
+                    self.nr_of_resends += 1
+            except Exception:
+                logger.exception('Exception while resending a packet')
+
+    def _run_periodic(self, entry, callback, args):
+        try:
+            if callback(*args) is False:
+                entry.cancel()
+        except Exception:
+            logger.exception('Exception in a periodic callback')
+
+
+class RttEstimator():
+    """
+    Estimates the retransmission timeout (RTO) of a link from the round trip
+    times of its packets, the way TCP does (RFC 6298). Only packets that have
+    not been resent should be sampled since the answer of a resent packet can
+    not be told apart from the answer of the first one.
+    """
+
+    def __init__(self, initial_rto=INITIAL_RTO, min_rto=MIN_RTO,
+                 max_rto=MAX_RTO):
+        self._min_rto = min_rto
+        self._max_rto = max_rto
+        self._lock = Lock()
+        self.srtt = None
+        self.rttvar = None
+        self.rto = initial_rto
+        self._backoff_time = None
+
+    def add_sample(self, rtt):
+        """Update the estimate with a measured round trip time"""
+        with self._lock:
+            if self.srtt is None:
+                self.srtt = rtt
+                self.rttvar = rtt / 2.0
+            else:
+                self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+                self.srtt = 0.875 * self.srtt + 0.125 * rtt
+            rto = self.srtt + max(_GRANULARITY, 4 * self.rttvar)
+            self.rto = min(max(rto, self._min_rto), self._max_rto)
+            self._backoff_time = None
+
+    def backoff(self, sent_time, now=None):
+        """
+        Double the timeout after a packet sent at sent_time was not answered.
+        Packets sent before the last backoff do not double it again, so losing
+        many packets in a burst only backs off once. now is the current time
+        of the clock of sent_time, the scheduler clock if not given.
+        """
+        with self._lock:
+            if self._backoff_time is None or sent_time >= self._backoff_time:
+                self.rto = min(2 * self.rto, self._max_rto)
+                self._backoff_time = _clock() if now is None else now
+
+
+def get_scheduler():
+    """Get the retransmission scheduler shared by the process"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RetransmissionScheduler()
+            _scheduler.start()
+        return _scheduler
@@ -29,12 +29,18 @@ A generic TableOfContents module that is used to fetch, store and minipulate
 a TOC for logging or parameters.
 """
 import logging
+import re
 import struct
+from bisect import bisect_left
+from concurrent.futures import TimeoutError
+from fnmatch import fnmatchcase
+from threading import Lock
 
 from cflib.crtp.crtpstack import CRTPPacket
 
 __author__ = 'Bitcraze AB'
-__all__ = ['Toc', 'TocFetcher']
+__all__ = ['Toc', 'TocFetcher', 'get_fetch_window', 'request_timeout',
+           'set_fetch_window']
 
 logger = logging.getLogger(__name__)
 
@@ -51,17 +57,76 @@ IDLE = 'IDLE'
 GET_TOC_INFO = 'GET_TOC_INFO'
 GET_TOC_ELEMENT = 'GET_TOC_ELEMENT'
 
+# Number of requests waiting for an answer at a time when fetching the TOCs
+# and the param values
+_window = 8
+# An unanswered request is sent again after this many retransmission timeouts
+# of the link, the answers to a window of requests queue up
+_timeout_factor = 4
 
-class Toc:
-    """Container for TocElements."""
+
+def set_fetch_window(window):
+    """
+    Set the number of requests waiting for an answer at a time when fetching
+    the TOC elements and the param values, 1 waits for each answer before
+    sending the next request. The window should not be larger than the
+    number of packets the link and the Crazyflie can buffer, 16 for
+    ESP-drones in the reliable UDP mode.
+    """
+    global _window
+    if window < 1:
+        raise ValueError('The window must be at least 1')
+    _window = window
+
+
+def get_fetch_window():
+    """Get the number of requests waiting for an answer at a time"""
+    return _window
+
+
+def request_timeout(crazyflie):
+    """
+    Get the time in seconds after which an unanswered request of a window is
+    sent again, from the retransmission timeout of the link of crazyflie
+    """
+    return _timeout_factor * crazyflie.rto
+
+
+class Toc(object):
+    """
+    Container for TocElements. Besides the elements by group and name the
+    elements are indexed by ident and by complete name when they are added.
+    """
 
     def __init__(self):
         self.toc = {}
 
+    @property
+    def toc(self):
+        """The elements as a dict of groups with dicts of names"""
+        return self._toc
+
+    @toc.setter
+    def toc(self, toc):
+        self._toc = toc
+        self._by_id = []
+        self._by_name = {}
+        self._sorted_names = None
+        for group in toc.values():
+            for element in group.values():
+                self._index(element)
+
     def clear(self):
         """Clear the TOC"""
         self.toc = {}
 
+    def __len__(self):
+        return len(self._by_name)
+
+    def __iter__(self):
+        """Iterate over the elements in ident order"""
+        return (element for element in self._by_id if element is not None)
+
     def add_element(self, element):
         """Add a new TocElement to the TOC container."""
         try:
@@ -69,21 +134,24 @@ class Toc:
         except KeyError:
             self.toc[element.group] = {}
             self.toc[element.group][element.name] = element
+        self._index(element)
+
+    def _index(self, element):
+        if element.ident >= len(self._by_id):
+            self._by_id.extend([None] * (element.ident + 1 - len(self._by_id)))
+        self._by_id[element.ident] = element
+        self._by_name['%s.%s' % (element.group, element.name)] = element
+        self._sorted_names = None
 
     def get_element_by_complete_name(self, complete_name):
         """Get a TocElement element identified by complete name from the
         container."""
-        try:
-            return self.get_element_by_id(self.get_element_id(complete_name))
-        except ValueError:
-            # Item not found
-            return None
+        return self._by_name.get(complete_name)
 
     def get_element_id(self, complete_name):
         """Get the TocElement element id-number of the element with the
         supplied name."""
-        [group, name] = complete_name.split('.')
-        element = self.get_element(group, name)
+        element = self._by_name.get(complete_name)
         if element:
             return element.ident
         else:
@@ -101,18 +169,41 @@ class Toc:
     def get_element_by_id(self, ident):
         """Get a TocElement element identified by index number from the
         container."""
-        for group in list(self.toc.keys()):
-            for name in list(self.toc[group].keys()):
-                if self.toc[group][name].ident == ident:
-                    return self.toc[group][name]
+        if 0 <= ident < len(self._by_id):
+            return self._by_id[ident]
         return None
 
+    def get_elements_by_prefix(self, prefix):
+        """Get the TocElements whose complete names start with prefix, sorted
+        by complete name."""
+        if self._sorted_names is None:
+            self._sorted_names = sorted(self._by_name)
+        names = self._sorted_names
+        start = bisect_left(names, prefix)
+        end = start
+        while end < len(names) and names[end].startswith(prefix):
+            end += 1
+        return [self._by_name[name] for name in names[start:end]]
+
+    def find_elements(self, pattern):
+        """Get the TocElements whose complete names match a glob pattern,
+        ie 'stabilizer.*' or '*.kp', sorted by complete name."""
+        # Only the names starting with the part before the first wildcard
+        # can match
+        prefix = re.split(r'[*?\[]', pattern, 1)[0]
+        return [element for element in self.get_elements_by_prefix(prefix)
+                if fnmatchcase('%s.%s' % (element.group, element.name),
+                               pattern)]
+
 
 class TocFetcher:
-    """Fetches TOC entries from the Crazyflie"""
+    """
+    Fetches TOC entries from the Crazyflie. Up to window elements are
+    requested at a time, the answers are added to the TOC in ident order.
+    """
 
     def __init__(self, crazyflie, element_class, port, toc_holder,
-                 finished_callback, toc_cache):
+                 finished_callback, toc_cache, window=None):
         self.cf = crazyflie
         self.port = port
         self._crc = 0
@@ -124,6 +215,15 @@ class TocFetcher:
         self.finished_callback = finished_callback
         self.element_class = element_class
         self._useV2 = False
+        self.window = window if window is not None else _window
+        self._lock = Lock()
+        # Index of the next element to add to the TOC
+        self._next_index = 0
+        # Elements received before the ones preceding them
+        self._received = {}
+        # Index -> order in which the unanswered requests were sent
+        self._outstanding = {}
+        self._nr_of_requests = 0
 
     def start(self):
         """Initiate fetching of the TOC."""
@@ -132,8 +232,6 @@ class TocFetcher:
         logger.debug('[%d]: Using V2 protocol: %d', self.port, self._useV2)
 
         logger.debug('[%d]: Start fetching...', self.port)
-        # Register callback in this class for the port
-        self.cf.add_port_callback(self.port, self._new_packet_cb)
 
         # Request the TOC CRC
         self.state = GET_TOC_INFO
@@ -141,17 +239,42 @@ class TocFetcher:
         pk.set_header(self.port, TOC_CHANNEL)
         if self._useV2:
             pk.data = (CMD_TOC_INFO_V2,)
-            self.cf.send_packet(pk, expected_reply=(CMD_TOC_INFO_V2,))
         else:
             pk.data = (CMD_TOC_INFO,)
-            self.cf.send_packet(pk, expected_reply=(CMD_TOC_INFO,))
+        self._send_request(pk, pk.data)
 
     def _toc_fetch_finished(self):
         """Callback for when the TOC fetching is finished"""
-        self.cf.remove_port_callback(self.port, self._new_packet_cb)
         logger.debug('[%d]: Done!', self.port)
         self.finished_callback()
 
+    def _send_request(self, pk, expected_reply, timeout=None, index=None,
+                      order=None):
+        future = self.cf.send_request(pk, tuple(expected_reply), timeout)
+        future.add_done_callback(
+            lambda future: self._answer_received(future, index, order))
+
+    def _answer_received(self, future, index, order):
+        """Handle the answer to a request, or the failure to get it"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if isinstance(error, TimeoutError) and index is not None:
+            with self._lock:
+                # Only the last request of an element is sent again, the
+                # element may already have been requested again
+                if self._outstanding.get(index) != order:
+                    return
+                logger.debug('[%d]: No answer for index %d, requesting '
+                             'it again', self.port, index)
+                self._request_toc_element(index)
+            return
+        if error is not None:
+            logger.info('[%d]: Fetching TOC failed: %s', self.port, error)
+            self.state = IDLE
+            return
+        self._new_packet_cb(future.result())
+
     def _new_packet_cb(self, packet):
         """Handle a newly arrived packet"""
         chan = packet.channel
@@ -174,45 +297,70 @@ class TocFetcher:
                 self.toc.toc = cache_data
                 logger.info('TOC for port [%s] found in cache' % self.port)
                 self._toc_fetch_finished()
+            elif self.nbr_of_items == 0:
+                self._toc_cache.insert(self._crc, self.toc.toc)
+                self._toc_fetch_finished()
             else:
                 self.state = GET_TOC_ELEMENT
-                self.requested_index = 0
-                self._request_toc_element(self.requested_index)
+                self.requested_index = -1
+                with self._lock:
+                    self._fill_window()
 
         elif (self.state == GET_TOC_ELEMENT):
-            # Always add new element, but only request new if it's not the
-            # last one.
             if self._useV2:
                 ident = struct.unpack('<H', payload[:2])[0]
+                data = payload[2:]
             else:
                 ident = payload[0]
+                data = payload[1:]
 
-            if ident != self.requested_index:
-                return
-            if self._useV2:
-                self.toc.add_element(self.element_class(ident, payload[2:]))
-            else:
-                self.toc.add_element(self.element_class(ident, payload[1:]))
-            logger.debug('Added element [%s]', ident)
-            if (self.requested_index < (self.nbr_of_items - 1)):
-                logger.debug('[%d]: More variables, requesting index %d',
-                             self.port, self.requested_index + 1)
-                self.requested_index = self.requested_index + 1
-                self._request_toc_element(self.requested_index)
-            else:  # No more variables in TOC
+            with self._lock:
+                if ident not in self._outstanding:
+                    # Answer to a request sent again
+                    return
+                order = self._outstanding.pop(ident)
+                self._received[ident] = data
+                # Answers come in the order of the requests, the ones sent
+                # before this one have been lost
+                for index, sent in list(self._outstanding.items()):
+                    if sent < order:
+                        logger.debug('[%d]: Answer for index %d lost, '
+                                     'requesting it again', self.port, index)
+                        self._request_toc_element(index)
+
+                while self._next_index in self._received:
+                    self.toc.add_element(self.element_class(
+                        self._next_index,
+                        self._received.pop(self._next_index)))
+                    logger.debug('Added element [%s]', self._next_index)
+                    self._next_index += 1
+                done = self._next_index == self.nbr_of_items
+                if not done:
+                    self._fill_window()
+
+            if done:
+                self.state = IDLE
                 self._toc_cache.insert(self._crc, self.toc.toc)
                 self._toc_fetch_finished()
 
+    def _fill_window(self):
+        """Request new elements until window requests are outstanding"""
+        while len(self._outstanding) < self.window and \
+                self.requested_index < self.nbr_of_items - 1:
+            self.requested_index += 1
+            self._request_toc_element(self.requested_index)
+
     def _request_toc_element(self, index):
         """Request information about a specific item in the TOC"""
         logger.debug('Requesting index %d on port %d', index, self.port)
+        order = self._nr_of_requests
+        self._outstanding[index] = order
+        self._nr_of_requests += 1
         pk = CRTPPacket()
+        pk.set_header(self.port, TOC_CHANNEL)
         if self._useV2:
-            pk.set_header(self.port, TOC_CHANNEL)
             pk.data = (CMD_TOC_ITEM_V2, index & 0x0ff, (index >> 8) & 0x0ff)
-            self.cf.send_packet(pk, expected_reply=(
-                CMD_TOC_ITEM_V2, index & 0x0ff, (index >> 8) & 0x0ff))
         else:
-            pk.set_header(self.port, TOC_CHANNEL)
             pk.data = (CMD_TOC_ELEMENT, index)
-            self.cf.send_packet(pk, expected_reply=(CMD_TOC_ELEMENT, index))
+        self._send_request(pk, pk.data, request_timeout(self.cf), index,
+                           order)
@@ -27,20 +27,40 @@
 """
 Access the TOC cache for reading/writing. It supports both user
 cache and dist cache.
+
+The TOCs are saved in a compact binary format, one file named by the CRC
+of the TOC per TOC. Caches saved as JSON by earlier versions are still
+read.
 """
 import json
 import logging
 import os
+import struct
+import tempfile
 from glob import glob
 
-from .log import LogTocElement  # noqa
-from .param import ParamTocElement  # noqa
+from .log import LogTocElement
+from .param import ParamTocElement
 
 __author__ = 'Bitcraze AB'
 __all__ = ['TocCache']
 
 logger = logging.getLogger(__name__)
 
+_MAGIC = b'CFTC'
+_VERSION = 1
+# Magic, version, element class and number of elements. It's followed by
+# the ident and access of each element and then the group, name, ctype and
+# pytype strings of each element separated by null characters.
+_HEADER = struct.Struct('<4sBBH')
+_ELEMENT_FORMAT = 'HB'
+
+# The element classes that can be cached, the index is saved in the file
+_ELEMENT_CLASSES = [LogTocElement, ParamTocElement]
+_ELEMENT_CLASS_NAMES = dict((cls.__name__, cls) for cls in _ELEMENT_CLASSES)
+
+_replace = getattr(os, 'replace', os.rename)
+
 
 class TocCache():
     """
@@ -49,11 +69,19 @@ class TocCache():
     """
 
     def __init__(self, ro_cache=None, rw_cache=None):
-        self._cache_files = []
-        if (ro_cache):
-            self._cache_files += glob(ro_cache + '/*.json')
+        # The cache file of each CRC, rw_cache files take precedence
+        self._files = {}
+        for cache in (ro_cache, rw_cache):
+            if cache:
+                # Binary files take precedence over JSON files
+                for name in glob(cache + '/*.json') + glob(cache + '/*.toc'):
+                    try:
+                        crc = int(os.path.splitext(os.path.basename(name))[0],
+                                  16)
+                    except ValueError:
+                        continue
+                    self._files[crc] = name
         if (rw_cache):
-            self._cache_files += glob(rw_cache + '/*.json')
             if not os.path.exists(rw_cache):
                 os.makedirs(rw_cache)
 
@@ -62,19 +90,22 @@ class TocCache():
     def fetch(self, crc):
         """ Try to get a hit in the cache, return None otherwise """
         cache_data = None
-        pattern = '%08X.json' % crc
-        hit = None
-
-        for name in self._cache_files:
-            if (name.endswith(pattern)):
-                hit = name
+        hit = self._files.get(crc)
+        if not hit and self._rw_cache:
+            # Could have been saved by another process
+            name = self._filename(crc)
+            if os.path.exists(name):
+                hit = self._files[crc] = name
 
         if (hit):
             try:
-                cache = open(hit)
-                cache_data = json.load(cache,
-                                       object_hook=self._decoder)
-                cache.close()
+                if hit.endswith('.toc'):
+                    with open(hit, 'rb') as cache:
+                        cache_data = self._decode(cache.read())
+                else:
+                    with open(hit) as cache:
+                        cache_data = json.load(cache,
+                                               object_hook=self._decoder)
             except Exception as exp:
                 logger.warning('Error while parsing cache file [%s]:%s',
                                hit, str(exp))
@@ -84,35 +115,79 @@ class TocCache():
     def insert(self, crc, toc):
         """ Save a new cache to file """
         if self._rw_cache:
+            filename = self._filename(crc)
             try:
-                filename = '%s/%08X.json' % (self._rw_cache, crc)
-                cache = open(filename, 'w')
-                cache.write(json.dumps(toc, indent=2,
-                                       default=self._encoder))
-                cache.close()
+                data = self._encode(toc)
+                # Written to a temporary file that replaces the cache file,
+                # other processes never see a partly written file
+                fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self._rw_cache)
+                try:
+                    with os.fdopen(fd, 'wb') as cache:
+                        cache.write(data)
+                    os.chmod(tmp, 0o644)
+                    _replace(tmp, filename)
+                except Exception:
+                    os.remove(tmp)
+                    raise
                 logger.info('Saved cache to [%s]', filename)
-                self._cache_files += [filename]
+                self._files[crc] = filename
             except Exception as exp:
                 logger.warning('Could not save cache to file [%s]: %s',
                                filename, str(exp))
         else:
             logger.warning('Could not save cache, no writable directory')
 
-    def _encoder(self, obj):
-        """ Encode a toc element leaf-node """
-        return {'__class__': obj.__class__.__name__,
-                'ident': obj.ident,
-                'group': obj.group,
-                'name': obj.name,
-                'ctype': obj.ctype,
-                'pytype': obj.pytype,
-                'access': obj.access}
-        raise TypeError(repr(obj) + ' is not JSON serializable')
+    def _filename(self, crc):
+        return os.path.join(self._rw_cache, '%08X.toc' % crc)
+
+    def _encode(self, toc):
+        """ Pack the elements of a TOC, a dict of groups of elements """
+        elements = [element for group in toc.values()
+                    for element in group.values()]
+        element_class = type(elements[0]) if elements else LogTocElement
+        numbers = []
+        strings = []
+        for element in elements:
+            numbers += [element.ident, element.access]
+            strings += [element.group, element.name, element.ctype,
+                        element.pytype]
+        return (_HEADER.pack(_MAGIC, _VERSION,
+                             _ELEMENT_CLASSES.index(element_class),
+                             len(elements)) +
+                struct.pack('<' + _ELEMENT_FORMAT * len(elements), *numbers) +
+                '\0'.join(strings).encode('ISO-8859-1'))
+
+    def _decode(self, data):
+        """ Unpack a TOC into a dict of groups of elements """
+        magic, version, class_index, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError('Not a TOC cache file')
+        element_class = _ELEMENT_CLASSES[class_index]
+
+        elements = struct.Struct('<' + _ELEMENT_FORMAT * count)
+        numbers = elements.unpack_from(data, _HEADER.size)
+        strings = data[_HEADER.size + elements.size:].decode('ISO-8859-1')
+        strings = [str(s) for s in strings.split('\0')] if count else []
+        if len(strings) != 4 * count:
+            raise ValueError('Wrong number of strings in TOC cache file')
+
+        toc = {}
+        for i in range(count):
+            element = element_class()
+            element.ident = numbers[2 * i]
+            element.access = numbers[2 * i + 1]
+            (element.group, element.name, element.ctype,
+             element.pytype) = strings[4 * i:4 * i + 4]
+            try:
+                toc[element.group][element.name] = element
+            except KeyError:
+                toc[element.group] = {element.name: element}
+        return toc
 
     def _decoder(self, obj):
         """ Decode a toc element leaf-node """
         if '__class__' in obj:
-            elem = eval(obj['__class__'])()
+            elem = _ELEMENT_CLASS_NAMES[obj['__class__']]()
             elem.ident = obj['ident']
             elem.group = str(obj['group'])
             elem.name = str(obj['name'])
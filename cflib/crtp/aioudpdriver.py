@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+CRTP UDP driver running on an asyncio event loop.
+
+Many links share one socket, the CrtpDatagramProtocol endpoint, and the
+received packets are passed to a callback on the event loop: no thread is
+used to read from the links. Requires Python 3.5 or later.
+"""
+import asyncio
+import logging
+import socket
+import threading
+import time
+
+from .crtpdriver import CRTPDriver
+from .crtpstack import CRTPPacket
+from .udpdriver import _checksum
+from .udpdriver import _HELLO
+from .udpdriver import UdpDriver
+
+__author__ = 'Bitcraze AB'
+__all__ = ['AioUdpDriver', 'CrtpDatagramProtocol', 'open_endpoint']
+
+logger = logging.getLogger(__name__)
+
+
+class CrtpDatagramProtocol(asyncio.DatagramProtocol):
+    """ A socket shared by links, the datagrams are routed to the links by
+    source address """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.transport = None
+        self._routes = {}
+        self._loop_thread = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self._loop_thread = threading.current_thread()
+
+    def datagram_received(self, data, addr):
+        link = self._routes.get(addr)
+        if link is not None:
+            link._datagram_received(data)
+        else:
+            logger.debug('Dropped datagram from unknown source %s', addr)
+
+    def error_received(self, exc):
+        logger.debug('Socket error: %s', exc)
+
+    def connection_lost(self, exc):
+        for link in list(self._routes.values()):
+            link._connection_lost(exc)
+        self._routes = {}
+
+    def add_route(self, addr, link):
+        if addr in self._routes:
+            raise Exception('Link already open!')
+        self._routes[addr] = link
+
+    def remove_route(self, addr):
+        self._routes.pop(addr, None)
+
+    def sendto(self, data, addr):
+        """ Send a datagram, can be called from any thread """
+        if self.transport is None:
+            return
+        if threading.current_thread() is self._loop_thread:
+            self.transport.sendto(data, addr)
+        else:
+            self.loop.call_soon_threadsafe(self.transport.sendto, data, addr)
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+
+async def open_endpoint(local_port=0, loop=None):
+    """ Open a socket that can be shared by links, bound to local_port """
+    if loop is None:
+        loop = asyncio.get_event_loop()
+    _, protocol = await loop.create_datagram_endpoint(
+        lambda: CrtpDatagramProtocol(loop),
+        local_addr=('0.0.0.0', local_port))
+    return protocol
+
+
+class AioUdpDriver(CRTPDriver):
+    """ UDP link on a shared asyncio endpoint. The received packets are
+    passed to packet_callback on the event loop, receive_packet() never
+    returns one. """
+
+    def __init__(self, endpoint, packet_callback):
+        CRTPDriver.__init__(self)
+        self.uri = ''
+        self.addr = None
+        self.link_error_callback = None
+        self.link_quality_callback = None
+        self.needs_resending = True
+        self.pushes_packets = True
+        self._endpoint = endpoint
+        self._packet_callback = packet_callback
+
+    def connect(self, uri, link_quality_callback, link_error_callback):
+        host, port, _ = UdpDriver.parse_uri(uri)
+        self.addr = (socket.gethostbyname(host), port)
+        self._endpoint.add_route(self.addr, self)
+
+        self.uri = uri
+        self.link_error_callback = link_error_callback
+        self.link_quality_callback = link_quality_callback
+
+        self._endpoint.sendto(_HELLO, self.addr)
+
+    def _datagram_received(self, data):
+        if len(data) < 2:
+            return
+        # The final byte is the checksum of the rest of the datagram
+        if _checksum(data[:-1]) != data[-1]:
+            logger.debug('Checksum error from %s', self.addr)
+            return
+        self._packet_callback(CRTPPacket(data[0], bytearray(data[1:-1])))
+
+    def _connection_lost(self, exc):
+        if self.link_error_callback is not None:
+            self.link_error_callback(
+                'AioUdpDriver: Socket closed ({})'.format(exc))
+
+    def send_packet(self, pk):
+        if self.addr is None:
+            return
+        raw = bytearray((pk.header,)) + pk.data
+        raw.append(_checksum(raw))
+        self._endpoint.sendto(bytes(raw), self.addr)
+
+    def receive_packet(self, wait=0):
+        """ The packets are passed to the packet callback, wait and return
+        None """
+        if wait > 0:
+            time.sleep(wait)
+        return None
+
+    def close(self):
+        if self.addr is None:
+            return
+        self._endpoint.sendto(_HELLO, self.addr)
+        self._endpoint.remove_route(self.addr)
+        self.addr = None
+        self.link_error_callback = None
+        self.link_quality_callback = None
+
+    def get_status(self):
+        return 'No information available'
+
+    def get_name(self):
+        return 'udp'
@@ -38,6 +38,10 @@ class CRTPDriver:
     This class in inherited by all the CRTP link drivers.
     """
 
+    # True for the drivers passing the received packets to a callback, the
+    # Crazyflie does not call receive_packet() on them
+    pushes_packets = False
+
     def __init__(self):
         """Driver constructor. Throw an exception if the driver is unable to
         open the URI
@@ -129,9 +129,11 @@ class CRTPPacket(object):
             self._data = bytearray(data)
         elif sys.version_info >= (3,) and type(data) == bytes:
             self._data = bytearray(data)
+        elif isinstance(data, memoryview):
+            self._data = bytearray(data)
         else:
-            raise Exception('Data must be bytearray, string, list or tuple,'
-                            ' not {}'.format(type(data)))
+            raise Exception('Data must be bytearray, memoryview, string, list'
+                            ' or tuple, not {}'.format(type(data)))
 
     def _get_data_l(self):
         """Get the data in the packet as a list"""
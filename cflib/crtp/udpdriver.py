@@ -24,104 +24,777 @@
 #  along with this program; if not, write to the Free Software
 #  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
 #  MA  02110-1301, USA.
-""" CRTP UDP Driver. Work either with the UDP server or with an UDP device
-See udpserver.py for the protocol"""
-import re
+"""
+CRTP UDP Driver. Work either with the UDP server or with an UDP device
+(i.e. an ESP-drone acting as access point).
+
+Each datagram carries one CRTP packet, the header and data followed by an
+8-bit checksum (the sum of all the previous bytes).
+
+Several links can share one local socket, in that case the incoming
+datagrams are routed to the right link using their source address.
+"""
 import binascii
+import collections
+import logging
+import re
+import select
+import socket
+import struct
+import sys
+import threading
 import time
-from socket import *
 
 from .crtpdriver import CRTPDriver
 from .crtpstack import CRTPPacket
+from .crtpstack import CRTPPort
 from .exceptions import WrongUriType
+from . import udpreliable
+from cflib.crazyflie.retransmission import get_scheduler
+
+if sys.version_info < (3,):
+    import Queue as queue
+else:
+    import queue
 
 __author__ = 'Bitcraze AB'
 __all__ = ['UdpDriver']
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '192.168.43.42'
+DEFAULT_PORT = 2390
+
+# Sent when connecting to add the host to the server clients list, and when
+# closing to remove it again
+_HELLO = b'\xFF\x01\x01\x01'
+
+_MAX_DATAGRAM_SIZE = 1024
+
+# LINKCTRL echo probes used to measure the link, the tag tells them apart
+# from the echo requests of the application
+_ECHO_CHANNEL = 0
+_PROBE_TAG = b'\xA7\x5C'
+_PROBE_FORMAT = '<2sH'
+
+_probe_period = 0.1
+_probe_timeout = 1.0
+# Number of probes the statistics are computed on
+_probe_window = 100
+# Probes answered later than this are counted as bad for the link quality
+_good_rtt = 0.1
+
+# The reliable mode needs support in the firmware, it is only negotiated
+# when enabled with set_reliable_mode()
+_reliable_mode = False
+_nr_of_negotiation_attempts = 3
+_negotiation_timeout = 0.05
+# Period of the retransmission and ack handling of the reliable mode
+_reliable_tick = 0.01
+# Max time to wait for room in the send window of the reliable mode
+_send_timeout = 2
+
+# Hosts, networks (CIDR notation) or broadcast addresses probed by
+# scan_interface()
+_scan_targets = [DEFAULT_HOST]
+_scan_port = DEFAULT_PORT
+_scan_timeout = 0.3
+
+
+if sys.version_info < (3,):
+    def _byte_view(data):
+        """ Indexing a memoryview gives 1-char strings in Python 2, use a
+        bytearray copy instead """
+        return bytearray(data)
+else:
+    _byte_view = memoryview
+
+
+def _checksum(data):
+    """ 8-bit checksum of a datagram: the sum of all its bytes """
+    return sum(_byte_view(data)) & 0xFF
+
+
+class _Wakeup():
+    """ Socket pair used to wake up a thread waiting in select() """
+
+    def __init__(self):
+        self._r, self._w = socket.socketpair()
+
+    def fileno(self):
+        return self._r.fileno()
+
+    def set(self):
+        try:
+            self._w.send(b'\x00')
+        except socket.error:
+            pass
+
+    def close(self):
+        self._r.close()
+        self._w.close()
+
+
+def _wait_readable(sock, wakeup, timeout):
+    """ Wait until sock is readable following the CRTPDriver.receive_packet
+    time convention (0 = poll, <0 = forever, >0 = seconds). Return False on
+    timeout or if woken up. """
+    if timeout < 0:
+        timeout = None
+    try:
+        readable, _, _ = select.select([sock, wakeup], [], [], timeout)
+    except (ValueError, select.error, socket.error):
+        # One of the sockets has been closed
+        return False
+    return sock in readable and wakeup not in readable
+
+
+def _expand_scan_target(target):
+    """ Return the addresses to probe for a host, a broadcast address or a
+    network in CIDR notation, like 192.168.43.0/24 """
+    if '/' not in target:
+        return [socket.gethostbyname(target)]
+
+    network, prefix = target.split('/', 1)
+    try:
+        prefix = int(prefix)
+        base = struct.unpack('>I', socket.inet_aton(network))[0]
+    except (ValueError, socket.error):
+        raise ValueError('Invalid network {}'.format(target))
+    if not 0 <= prefix <= 32:
+        raise ValueError('Invalid network {}'.format(target))
+
+    mask = (0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF
+    first = base & mask
+    last = first | (~mask & 0xFFFFFFFF)
+    if prefix < 31:
+        # Skip the network and broadcast addresses
+        first += 1
+        last -= 1
+    return [socket.inet_ntoa(struct.pack('>I', a))
+            for a in range(first, last + 1)]
+
+
+def _uri(host, port):
+    if port == DEFAULT_PORT:
+        return 'udp://{}'.format(host)
+    return 'udp://{}:{}'.format(host, port)
+
+
+def scan(targets, port=DEFAULT_PORT, timeout=0.3):
+    """
+    Probe all the targets at the same time and return the URIs of the
+    Crazyflies answering within timeout seconds. A target is a host, a
+    broadcast address or a network in CIDR notation.
+    """
+    addresses = []
+    for target in targets:
+        addresses += _expand_scan_target(target)
+
+    # The hello makes the Crazyflie talk to us, the echo makes it answer
+    echo = bytearray(((CRTPPort.LINKCTRL << 4) | 0x0C | _ECHO_CHANNEL,))
+    echo += _PROBE_TAG
+    echo.append(_checksum(echo))
+
+    found = set()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.bind(('', 0))
+        for address in addresses:
+            try:
+                sock.sendto(_HELLO, (address, port))
+                sock.sendto(echo, (address, port))
+            except socket.error as e:
+                logger.debug('Could not probe %s: %s', address, e)
+
+        deadline = time.time() + timeout
+        remaining = timeout
+        while remaining > 0:
+            readable, _, _ = select.select([sock], [], [], remaining)
+            if readable:
+                try:
+                    _, (host, source_port) = sock.recvfrom(
+                        _MAX_DATAGRAM_SIZE)
+                except socket.error:
+                    # An ICMP error from a host that is not there
+                    pass
+                else:
+                    if source_port == port:
+                        found.add(host)
+            remaining = deadline - time.time()
+    finally:
+        sock.close()
+
+    hosts = sorted(found, key=lambda h: socket.inet_aton(h))
+    return [[_uri(host, port), ''] for host in hosts]
+
+
+class _LinkMonitor():
+    """ Sends LINKCTRL echo probes at a fixed period and keeps round trip
+    time and loss statistics over a sliding window of probes. The link
+    quality is reported as the percentage of probes in the window that got
+    an answer within _good_rtt.
+
+    The probes are sent from the shared retransmission scheduler thread. """
+
+    def __init__(self, send_packet, link_quality_callback):
+        self._send_packet = send_packet
+        self._link_quality_callback = link_quality_callback
+
+        self._period = _probe_period
+        self._timeout = _probe_timeout
+        self._entry = None
+
+        self._lock = threading.Lock()
+        self._seq = 0
+        # Sequence number -> send time of the probes waiting for an answer
+        self._pending = {}
+        # Round trip time of the resolved probes, None for a lost probe
+        self._window = collections.deque(maxlen=_probe_window)
+
+    def start(self):
+        if self._probe():
+            self._entry = get_scheduler().schedule_periodic(self._period,
+                                                            self._probe)
+
+    def stop(self):
+        if self._entry is not None:
+            self._entry.cancel()
+
+    def is_probe_reply(self, pk):
+        """ Return True if pk is the answer to one of our probes, the answer
+        is then accounted for and should not be passed on """
+        if pk.port != CRTPPort.LINKCTRL or pk.channel != _ECHO_CHANNEL or \
+                len(pk.data) != struct.calcsize(_PROBE_FORMAT) or \
+                pk.data[:len(_PROBE_TAG)] != _PROBE_TAG:
+            return False
+
+        _, seq = struct.unpack(_PROBE_FORMAT, pk.data)
+        with self._lock:
+            sent = self._pending.pop(seq, None)
+            if sent is not None:
+                self._window.append(time.time() - sent)
+        return True
+
+    def get_statistics(self):
+        """ Return the round trip time percentiles (in seconds, None before
+        any answer) and the loss ratio over the window """
+        with self._lock:
+            rtts = sorted(r for r in self._window if r is not None)
+            nr_of_probes = len(self._window)
+
+        stats = {'probes': nr_of_probes,
+                 'loss': 0.0,
+                 'rtt_p50': None,
+                 'rtt_p90': None,
+                 'rtt_p99': None}
+        if nr_of_probes > 0:
+            stats['loss'] = 1.0 - float(len(rtts)) / nr_of_probes
+        if rtts:
+            for percentile in (50, 90, 99):
+                # Nearest rank
+                rank = max(0, (percentile * len(rtts) + 99) // 100 - 1)
+                stats['rtt_p{}'.format(percentile)] = rtts[rank]
+        return stats
+
+    def _expire_probes(self, now):
+        with self._lock:
+            for seq, sent in list(self._pending.items()):
+                if now - sent > self._timeout:
+                    del self._pending[seq]
+                    self._window.append(None)
+
+    def _link_quality(self):
+        with self._lock:
+            if len(self._window) == 0:
+                return None
+            good = sum(1 for r in self._window
+                       if r is not None and r <= _good_rtt)
+            return 100.0 * good / len(self._window)
+
+    def _probe(self):
+        """ Send the next probe and report the link quality, return False
+        if the link is closed """
+        now = time.time()
+        self._expire_probes(now)
+
+        pk = CRTPPacket()
+        pk.set_header(CRTPPort.LINKCTRL, _ECHO_CHANNEL)
+        pk.data = struct.pack(_PROBE_FORMAT, _PROBE_TAG, self._seq)
+        with self._lock:
+            self._pending[self._seq] = now
+        self._seq = (self._seq + 1) & 0xFFFF
+        try:
+            self._send_packet(pk)
+        except socket.error:
+            return False
+
+        link_quality = self._link_quality()
+        if link_quality is not None:
+            self._link_quality_callback(link_quality)
+        return True
+
+
+class _SharedSocket():
+    """ One local UDP socket shared by several links
+
+    A reader thread receives all the datagrams and puts them in the queue of
+    the link registered for their source address. Datagrams from unknown
+    addresses are dropped.
+    """
+
+    def __init__(self, local_port):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(('', local_port))
+        self.usage_counter = 0
+        self._wakeup = _Wakeup()
+
+        # Datagrams are received in place, only the ones that are routed to
+        # a link are copied
+        self._buffer = bytearray(_MAX_DATAGRAM_SIZE)
+        self._view = memoryview(self._buffer)
+
+        self._routes = {}
+        self._routes_lock = threading.Lock()
+
+        self._thread = threading.Thread(target=self._run)
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+    def add_route(self, addr):
+        """ Register a link for the datagrams coming from addr and return
+        the queue they will be put in """
+        with self._routes_lock:
+            if addr in self._routes:
+                raise Exception('Link already open!')
+            in_queue = queue.Queue()
+            self._routes[addr] = in_queue
+        return in_queue
+
+    def remove_route(self, addr):
+        with self._routes_lock:
+            self._routes.pop(addr, None)
+
+    def close(self):
+        self._wakeup.set()
+        self._thread.join()
+        self.socket.close()
+        self._wakeup.close()
+
+    def _run(self):
+        while True:
+            if not _wait_readable(self.socket, self._wakeup, -1):
+                break
+            try:
+                size, addr = self.socket.recvfrom_into(self._buffer)
+            except socket.error:
+                break
+
+            in_queue = self._routes.get(addr)
+            if in_queue is not None:
+                in_queue.put(self._view[:size].tobytes())
+            else:
+                logger.debug('Dropping datagram from unknown address %s',
+                             addr)
+
+
+class _SocketManager():
+    """ Keeps track of the shared sockets, one per local port. The socket is
+    closed when the last link using it is closed.
+    """
+    # Configuration lock. Protects opening and closing sockets
+    _config_lock = threading.Lock()
+
+    _sockets = {}
+
+    @staticmethod
+    def acquire(local_port):
+        with _SocketManager._config_lock:
+            shared = _SocketManager._sockets.get(local_port)
+            if shared is None:
+                shared = _SharedSocket(local_port)
+                _SocketManager._sockets[local_port] = shared
+            shared.usage_counter += 1
+            return shared
+
+    @staticmethod
+    def release(local_port):
+        with _SocketManager._config_lock:
+            shared = _SocketManager._sockets[local_port]
+            shared.usage_counter -= 1
+            if shared.usage_counter == 0:
+                shared.close()
+                del _SocketManager._sockets[local_port]
+
 
 class UdpDriver(CRTPDriver):
+    """ UDP link driver """
 
     def __init__(self):
+        """ Create the link driver """
+        CRTPDriver.__init__(self)
         self.debug = False
+        self.uri = ''
+        self.addr = None
         self.link_error_callback = None
         self.link_quality_callback = None
         self.needs_resending = True
-        None
 
-    def connect(self, uri, linkQualityCallback, linkErrorCallback):
-        # check if the URI is a radio URI
-        if not re.search('^udp://', uri):
-            raise WrongUriType('Not an UDP URI')
+        self._socket = None
+        # Set when the link uses a shared socket
+        self._local_port = None
+        self._in_queue = None
+        # Wakes up a receive_packet() waiting on a dedicated socket
+        self._wakeup = None
+        self._closed = False
+
+        # Receive buffer of the dedicated socket, reused for every datagram
+        self._buffer = bytearray(_MAX_DATAGRAM_SIZE)
+        self._view = memoryview(self._buffer)
+
+        self._link_monitor = None
+
+        # Set when the peer supports the reliable mode
+        self._reliable = None
+        # Scheduler entry driving the retransmissions and acks
+        self._reliable_entry = None
+        # Packets received but not returned yet
+        self._ready = collections.deque()
+        # (time, packet) of the packets waiting for room in the window of
+        # the reliable mode
+        self._backlog = collections.deque()
+        self._backlog_lock = threading.Lock()
+
+    def connect(self, uri, link_quality_callback, link_error_callback):
+        """
+        Connect the link driver to a specified URI of the format:
+        udp://<host>[:<port>][/<local port>]
+
+        All the links connected with the same local port share one socket.
+        Without a local port the link gets a socket of its own, bound to
+        any free port.
+        """
+        host, port, local_port = self.parse_uri(uri)
+        self.uri = uri
+        # The datagrams are routed on the numeric address they come from
+        self.addr = (socket.gethostbyname(host), port)
+
+        if local_port is None:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._socket.bind(('', 0))
+            self._socket.connect(self.addr)
+            self._wakeup = _Wakeup()
+        else:
+            shared = _SocketManager.acquire(local_port)
+            try:
+                self._in_queue = shared.add_route(self.addr)
+            except Exception:
+                _SocketManager.release(local_port)
+                raise
+            self._socket = shared.socket
+            self._local_port = local_port
+
+        self.link_error_callback = link_error_callback
+        self.link_quality_callback = link_quality_callback
 
-        self.socket = socket(AF_INET, SOCK_DGRAM)
-        self.addr = ('192.168.43.42', 2390) #The destination IP and port
-        self.socket.bind(('', 2399))
-        self.socket.connect(self.addr)
-        str1=b'\xFF\x01\x01\x01'
         # Add this to the server clients list
-        self.socket.sendto(str1, self.addr)
+        self._socket.sendto(_HELLO, self.addr)
         if self.debug:
-            print("Connected to UDP server")
-            print("send: {}".format(binascii.hexlify(bytearray(str1)))) 
+            print('Connected to UDP server')
+            print('send: {}'.format(binascii.hexlify(_HELLO)))
+
+        if _reliable_mode and self._enable_reliable_mode():
+            logger.info('Reliable mode enabled on %s', uri)
+            # Packets are never lost or duplicated, the Crazyflie does not
+            # have to watch for answers and resend
+            self.needs_resending = False
+            self._reliable_entry = get_scheduler().schedule_periodic(
+                _reliable_tick, self._tick_reliable)
+
+        if link_quality_callback is not None:
+            self._link_monitor = _LinkMonitor(self.send_packet,
+                                              link_quality_callback)
+            self._link_monitor.start()
+
+    @staticmethod
+    def parse_uri(uri):
+        """ Return the host, port and local port (None if not set) of an UDP
+        URI """
+        # check if the URI is an UDP URI
+        if not re.search('^udp://', uri):
+            raise WrongUriType('Not an UDP URI')
+
+        uri_data = re.search('^udp://([^:/]+)(:([0-9]+))?(/([0-9]+))?$', uri)
+        if not uri_data:
+            raise WrongUriType('Wrong UDP URI format!')
+
+        host = uri_data.group(1)
+
+        port = DEFAULT_PORT
+        if uri_data.group(3):
+            port = int(uri_data.group(3))
+
+        local_port = None
+        if uri_data.group(5):
+            local_port = int(uri_data.group(5))
+
+        return host, port, local_port
 
     def receive_packet(self, time=0):
-        try:
-            data, addr = self.socket.recvfrom(1024)
-        except OSError:
-            if self.debug:
-                print("Socket error: socket might be closed.")
-            return None
+        """
+        Receive a packet though the link. This call is blocking but will
+        timeout and return None if a timeout is supplied. A call waiting
+        forever returns None when the link is closed.
+        """
+        return self._receive_packet(time)
 
-        if data:
-            # take the final byte as the checksum
-            cksum_recv = data[len(data)-1]
-            # remove the checksum from the data
-            data = data[0:(len(data)-1)]
-            # calculate checksum and check it with the last byte
-            cksum = 0
-            for i in data[0:]:
-                cksum += i
-            cksum %= 256
-            if cksum != cksum_recv:
-                if self.debug:
-                    print("Checksum error {} != {}".format(cksum, cksum_recv))
+    def _receive_packet(self, timeout):
+        """ Receive a packet, skipping the answers to the link probes and
+        the frames that do not release any packet """
+        # The link can be closed from another thread
+        link_monitor = self._link_monitor
+        if timeout > 0:
+            deadline = time.time() + timeout
+
+        while True:
+            while self._ready:
+                pk = self._ready.popleft()
+                if link_monitor is None or \
+                        not link_monitor.is_probe_reply(pk):
+                    return pk
+
+            data = self._receive_datagram(timeout)
+            if data is None:
                 return None
+            self._ready.extend(self._unpack(data))
 
-            pk = CRTPPacket(data[0], list(data[1:]))
-            # print the raw date
-            if self.debug:
-                print("recv: {}".format(binascii.hexlify(bytearray(data))))
-            return pk
+            if timeout > 0:
+                timeout = deadline - time.time()
+                if timeout <= 0 and not self._ready:
+                    return None
+                # Only poll for datagrams once the deadline has passed
+                timeout = max(timeout, 0.0)
+
+    def _receive_datagram(self, time):
+        """ Return the next datagram or None on timeout """
+        if self._closed:
+            return None
+        elif self._in_queue is not None:
+            return self._get_queued_datagram(time)
+        elif _wait_readable(self._socket, self._wakeup, time):
+            try:
+                size = self._socket.recv_into(self._buffer)
+            except socket.error:
+                if self.debug:
+                    print('Socket error: socket might be closed.')
+                return None
+            return self._view[:size]
         else:
             return None
 
-    def send_packet(self, pk):
-        raw = (pk.header,) + pk.datat
-        cksum = 0
-        for i in raw:
-            cksum += i
-        cksum %= 256
-        raw = raw + (cksum,)
-        # change the tuple to bytes
-        raw = bytearray(raw)
-        self.socket.sendto(raw, self.addr)
+    def _get_queued_datagram(self, time):
+        if time == 0:
+            try:
+                return self._in_queue.get(False)
+            except queue.Empty:
+                return None
+        elif time < 0:
+            try:
+                return self._in_queue.get(True)
+            except queue.Empty:
+                return None
+        else:
+            try:
+                return self._in_queue.get(True, time)
+            except queue.Empty:
+                return None
+
+    def _unpack(self, data):
+        """ Return the packets carried by a datagram (any bytes-like
+        object), none if the checksum does not match """
+        data = _byte_view(data)
+        if len(data) < 2:
+            return []
+
+        # The final byte is the checksum of the rest of the datagram
+        cksum_recv = data[-1]
+        cksum = _checksum(data[:-1])
+        if cksum != cksum_recv:
+            if self.debug:
+                print('Checksum error {} != {}'.format(cksum, cksum_recv))
+            return []
+
         # print the raw date
         if self.debug:
-            print("send: {}".format(binascii.hexlify(raw)))
+            print('recv: {}'.format(binascii.hexlify(bytearray(data))))
+
+        data = data[:-1]
+        if self._reliable is not None and udpreliable.is_frame(data):
+            packets = [CRTPPacket(payload[0], payload[1:])
+                       for payload in self._reliable.receive(data)]
+            # The frame can have acked packets, making room for the backlog
+            if self._backlog:
+                self._flush_backlog()
+            return packets
+
+        # The data is only copied once, into the packet
+        return [CRTPPacket(data[0], bytearray(data[1:]))]
+
+    def _send_datagram(self, data):
+        raw = bytearray(data)
+        raw.append(_checksum(raw))
+        self._socket.sendto(raw, self.addr)
+        # print the raw date
+        if self.debug:
+            print('send: {}'.format(binascii.hexlify(raw)))
+
+    def _enable_reliable_mode(self):
+        """ Try to enable the reliable mode, the peer answers with the same
+        request if it supports it. The packets received in the meantime are
+        kept. """
+        for _ in range(_nr_of_negotiation_attempts):
+            self._send_datagram(udpreliable.ENABLE_REQUEST)
+            deadline = time.time() + _negotiation_timeout
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                data = self._receive_datagram(remaining)
+                if data is None:
+                    break
+                if memoryview(data)[:-1].tobytes() == \
+                        udpreliable.ENABLE_REQUEST:
+                    self._reliable = udpreliable.ReliableEndpoint(
+                        self._send_datagram)
+                    return True
+                self._ready.extend(self._unpack(data))
+        return False
+
+    def _tick_reliable(self):
+        """ Retransmit the lost frames and send the acks of the reliable
+        mode, return False once the link has failed """
+        link_error_callback = self.link_error_callback
+        try:
+            alive = self._reliable.tick(time.time())
+        except socket.error:
+            return False
+        if not alive:
+            if link_error_callback is not None:
+                link_error_callback('Too many packets lost')
+            return False
+        if not self._flush_backlog():
+            if link_error_callback is not None:
+                link_error_callback('UdpDriver: Could not send packet to '
+                                    'copter')
+            return False
+        return True
+
+    def send_packet(self, pk):
+        """ Send the packet pk though the link """
+        raw = bytearray((pk.header,)) + pk.data
+        if self._reliable is None:
+            self._send_datagram(raw)
+        else:
+            # Never wait for room in the window here, the acks making room
+            # are handled by the thread receiving packets, which may be the
+            # one sending
+            with self._backlog_lock:
+                self._backlog.append((time.time(), raw))
+            self._flush_backlog()
+
+    def _flush_backlog(self):
+        """ Send the packets of the backlog that fit in the window of the
+        reliable mode. Return False if a packet has waited for more than
+        _send_timeout. """
+        with self._backlog_lock:
+            while self._backlog and \
+                    self._reliable.send(self._backlog[0][1], 0):
+                self._backlog.popleft()
+            return not self._backlog or \
+                time.time() - self._backlog[0][0] < _send_timeout
 
     def close(self):
-        str1=b'\xFF\x01\x01\x01'
         # Remove this from the server clients list
-        self.socket.sendto(str1, self.addr)
+        self._socket.sendto(_HELLO, self.addr)
         if self.debug:
-            print("Disconnected from UDP server")
-            print("send: {}".format(binascii.hexlify(bytearray(str1))))
-        time.sleep(1)
-        self.socket.close()
+            print('Disconnected from UDP server')
+            print('send: {}'.format(binascii.hexlify(_HELLO)))
+
+        self._closed = True
+        if self._link_monitor is not None:
+            self._link_monitor.stop()
+            self._link_monitor = None
+        if self._reliable_entry is not None:
+            self._reliable_entry.cancel()
+            self._reliable_entry = None
+        if self._local_port is not None:
+            _SocketManager._sockets[self._local_port].remove_route(self.addr)
+            _SocketManager.release(self._local_port)
+            self._local_port = None
+            # Wake up a receiver waiting forever on the queue
+            self._in_queue.put(None)
+        else:
+            self._wakeup.set()
+            self._socket.close()
+            self._wakeup.close()
+
+        # Clear callbacks
+        self.link_error_callback = None
+        self.link_quality_callback = None
+
+    def get_link_statistics(self):
+        """
+        Return the round trip time percentiles ('rtt_p50', 'rtt_p90' and
+        'rtt_p99' in seconds) and the 'loss' ratio measured by the link
+        probes, or None if the link quality is not monitored.
+        """
+        if self._link_monitor is None:
+            return None
+        return self._link_monitor.get_statistics()
 
     def get_name(self):
         return 'udp'
 
     def scan_interface(self, address):
-        address1 = 'udp://192.168.43.42'
-        return [[address1,""]]
+        """ Probe the scan targets, see set_scan_targets() """
+        try:
+            return scan(_scan_targets, _scan_port, _scan_timeout)
+        except (ValueError, socket.error) as e:
+            logger.warning('UDP scan failed: %s', e)
+            return []
+
+
+def set_probe_period(period):
+    """ Set the time in seconds between two link probes """
+    global _probe_period
+    _probe_period = period
+
+
+def set_probe_timeout(timeout):
+    """ Set the time in seconds after which a probe is counted as lost """
+    global _probe_timeout
+    _probe_timeout = timeout
+
+
+def set_reliable_mode(enabled):
+    """ Enable or disable the negotiation of the reliable mode when
+    connecting, disabled by default. The mode needs support in the firmware
+    of the Crazyflie, links to a Crazyflie without it fall back to resending
+    unanswered packets after the negotiation has timed out. """
+    global _reliable_mode
+    _reliable_mode = enabled
+
+
+def set_scan_targets(targets, port=DEFAULT_PORT):
+    """ Set the hosts, networks in CIDR notation (192.168.43.0/24) or
+    broadcast addresses probed when scanning """
+    global _scan_targets, _scan_port
+    _scan_targets = list(targets)
+    _scan_port = port
+
+
+def set_scan_timeout(timeout):
+    """ Set the time in seconds to wait for answers when scanning """
+    global _scan_timeout
+    _scan_timeout = timeout
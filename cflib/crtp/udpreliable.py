@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Reliable delivery for UDP links.
+
+This is the UDP equivalent of the safelink mode of the radio: the datagrams
+are numbered and acknowledged so that the packets are delivered in order,
+without duplicates and are retransmitted when lost. The mode is negotiated
+when the link is opened by sending ENABLE_REQUEST, a peer supporting it
+answers with the same bytes.
+
+Frames (the datagram checksum is handled by the driver):
+  DATA: FRAME_MARKER, FRAME_DATA, seq, ack, CRTP header, CRTP data
+  ACK:  FRAME_MARKER, FRAME_ACK, ack, seq of the last DATA frame received
+
+seq numbers the DATA frames modulo 256 and ack is the seq of the next frame
+expected from the peer, acknowledging all the frames before it. Any byte can
+be a CRTP header, so the frames start with the header of the link control
+port used by ENABLE_REQUEST followed by a frame type that no link control
+request uses.
+
+The retransmission timeout is estimated from the round trip times of the
+frames that were not retransmitted, measured when an ACK tells which frame it
+answers. A frame received out of order is acked at once, when the acks of the
+peer stop advancing the oldest frame is retransmitted without waiting for the
+timeout.
+
+Both ends of the link use the same ReliableEndpoint.
+"""
+import collections
+import threading
+import time
+
+from cflib.crazyflie.retransmission import RttEstimator
+
+__author__ = 'Bitcraze AB'
+__all__ = ['ReliableEndpoint', 'is_frame', 'ENABLE_REQUEST']
+
+FRAME_MARKER = 0xFF
+FRAME_DATA = 0xD0
+FRAME_ACK = 0xD1
+
+# Same request as the one enabling safelink on the radio
+ENABLE_REQUEST = b'\xFF\x05\x01'
+
+DEFAULT_WINDOW = 16
+DEFAULT_RTO = 0.1
+DEFAULT_MAX_RETRIES = 50
+
+# Number of acks not advancing while frames are waiting for one before the
+# oldest frame is retransmitted
+DUPLICATE_ACKS = 2
+
+
+def is_frame(data):
+    """Return True if data is a reliable frame and not a plain CRTP packet"""
+    return len(data) >= 4 and data[0] == FRAME_MARKER and \
+        data[1] in (FRAME_DATA, FRAME_ACK)
+
+
+class ReliableEndpoint():
+    """
+    One end of a reliable link. Frames are sent through the send_frame
+    function, the frames from the peer are passed to receive(). tick() must
+    be called periodically to retransmit lost frames and send pending acks.
+    """
+
+    def __init__(self, send_frame, window=DEFAULT_WINDOW, rto=DEFAULT_RTO,
+                 max_retries=DEFAULT_MAX_RETRIES):
+        """rto is the retransmission timeout used until it is measured"""
+        self._send_frame = send_frame
+        self._window = window
+        self._rtt_estimator = RttEstimator(initial_rto=rto)
+        self._max_retries = max_retries
+
+        self._lock = threading.Lock()
+        self._window_free = threading.Condition(self._lock)
+
+        self._tx_seq = 0
+        # seq -> [frame, time sent, nr of retransmissions], oldest first
+        self._unacked = collections.OrderedDict()
+        self._last_ack = 0
+        self._duplicate_acks = 0
+        self._rx_expected = 0
+        self._rx_last = 0
+        # Frames received ahead of the expected one
+        self._rx_buffer = {}
+        self._ack_pending = False
+
+        self.retransmissions = 0
+        self.duplicates = 0
+
+    @property
+    def rto(self):
+        """The current retransmission timeout in seconds"""
+        return self._rtt_estimator.rto
+
+    def send(self, payload, timeout=None):
+        """
+        Send a payload (CRTP header and data), blocking while the window is
+        full. Return False if the window is still full after timeout seconds.
+        """
+        with self._window_free:
+            if timeout is not None:
+                deadline = time.time() + timeout
+            while len(self._unacked) >= self._window:
+                if timeout is None:
+                    self._window_free.wait()
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return False
+                    self._window_free.wait(remaining)
+
+            seq = self._tx_seq
+            self._tx_seq = (seq + 1) & 0xFF
+            frame = bytearray(
+                (FRAME_MARKER, FRAME_DATA, seq, self._rx_expected))
+            frame += payload
+            self._unacked[seq] = [frame, time.time(), 0]
+            # The ack is carried by the frame
+            self._ack_pending = False
+            self._send_frame(frame)
+        return True
+
+    def receive(self, frame):
+        """
+        Handle a frame from the peer. Return the list of payloads it
+        releases, in order.
+        """
+        delivered = []
+        with self._lock:
+            if frame[1] == FRAME_DATA:
+                seq = frame[2]
+                self._rx_last = seq
+                self._handle_ack(frame[3])
+
+                offset = (seq - self._rx_expected) & 0xFF
+                if offset < self._window and seq not in self._rx_buffer:
+                    self._rx_buffer[seq] = bytearray(frame[4:])
+                    while self._rx_expected in self._rx_buffer:
+                        delivered.append(
+                            self._rx_buffer.pop(self._rx_expected))
+                        self._rx_expected = (self._rx_expected + 1) & 0xFF
+                else:
+                    # Already received, our ack was probably lost
+                    self.duplicates += 1
+
+                if offset == 0:
+                    self._ack_pending = True
+                else:
+                    # Tell the peer at once that a frame is missing
+                    self._send_ack()
+            elif frame[1] == FRAME_ACK:
+                self._handle_ack(frame[2], frame[3])
+        return delivered
+
+    def tick(self, now):
+        """
+        Retransmit the frames that have not been acknowledged in time and
+        send a pending ack. Return False if a frame has been retransmitted
+        max_retries times without being acknowledged.
+        """
+        with self._lock:
+            # Only the oldest frame is retransmitted, the frames after it
+            # are probably waiting in the buffer of the peer and can still
+            # be used for measuring the round trip time
+            for entry in self._unacked.values():
+                sent, retries = entry[1], entry[2]
+                if now - sent >= self._rtt_estimator.rto:
+                    if retries >= self._max_retries:
+                        return False
+                    self._retransmit(entry, now)
+                    self._rtt_estimator.backoff(sent, now)
+                break
+
+            if self._ack_pending:
+                self._send_ack()
+        return True
+
+    def _retransmit(self, entry, now):
+        frame = entry[0]
+        frame[3] = self._rx_expected
+        entry[1] = now
+        entry[2] += 1
+        self.retransmissions += 1
+        self._ack_pending = False
+        self._send_frame(frame)
+
+    def _send_ack(self):
+        self._ack_pending = False
+        self._send_frame(bytearray(
+            (FRAME_MARKER, FRAME_ACK, self._rx_expected, self._rx_last)))
+
+    def _handle_ack(self, ack, answered=None):
+        """
+        All the frames sent before ack have been received by the peer.
+        answered is the seq of the frame an ACK frame answers, None for the
+        ack carried by a DATA frame.
+        """
+        now = time.time()
+        ack_only = answered is not None
+        if ack_only:
+            # The answer to a retransmitted frame can not be told apart from
+            # the answer to the first transmission
+            entry = self._unacked.get(answered)
+            if entry is not None and entry[2] == 0:
+                self._rtt_estimator.add_sample(now - entry[1])
+
+        released = False
+        for seq in list(self._unacked):
+            if 0 < ((ack - seq) & 0xFF) <= self._window:
+                del self._unacked[seq]
+                released = True
+
+        if released:
+            self._last_ack = ack
+            self._duplicate_acks = 0
+            self._window_free.notify_all()
+        elif ack_only and ack == self._last_ack and self._unacked:
+            # The peer received a frame but is still waiting for an older
+            # one, retransmit it once without waiting for the timeout
+            self._duplicate_acks += 1
+            entry = self._unacked.get(ack)
+            if self._duplicate_acks == DUPLICATE_ACKS and \
+                    entry is not None and entry[2] == 0:
+                self._retransmit(entry, now)
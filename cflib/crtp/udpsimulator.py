@@ -0,0 +1,685 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Local simulator of ESP-drones, the firmware side of the UDP link.
+
+Each simulated Crazyflie listens on its own UDP port and speaks the same
+framing and checksum as the UdpDriver, including the reliable mode. The
+firmware answers LINKCTRL echo and source requests, the platform version,
+the log and param TOCs, param reads and writes, log blocks and memory
+reads and writes. It is meant for benchmarks and tests without hardware:
+
+    python -m cflib.crtp.udpsimulator --count 10 --port 2390
+
+All the instances are served by one thread.
+"""
+import argparse
+import errno
+import logging
+import math
+import random
+import select
+import socket
+import struct
+import threading
+import time
+from binascii import crc32
+from collections import deque
+
+from . import udpreliable
+from .crtpstack import CRTPPacket
+from .crtpstack import CRTPPort
+from .udpdriver import _checksum
+from .udpdriver import _HELLO
+from .udpdriver import _Wakeup
+from .udpdriver import DEFAULT_PORT
+from cflib.crazyflie.log import LogTocElement
+from cflib.crazyflie.param import ParamTocElement
+
+__author__ = 'Bitcraze AB'
+__all__ = ['SimulatedCrazyflie', 'UdpSimulator']
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 4
+
+# Ports and channels, see the matching modules in cflib.crazyflie
+LINKCTRL_ECHO = 0
+LINKCTRL_SOURCE = 1
+PLATFORM_VERSION = 1
+VERSION_GET_PROTOCOL = 0
+VERSION_GET_FIRMWARE = 1
+TOC_CHANNEL = 0
+LOG_SETTINGS = 1
+LOG_DATA = 2
+PARAM_READ = 1
+PARAM_WRITE = 2
+MEM_INFO = 0
+MEM_READ = 1
+MEM_WRITE = 2
+
+CMD_TOC_ELEMENT = 0
+CMD_TOC_INFO = 1
+CMD_TOC_ITEM_V2 = 2
+CMD_TOC_INFO_V2 = 3
+
+CMD_CREATE_BLOCK = 0
+CMD_APPEND_BLOCK = 1
+CMD_DELETE_BLOCK = 2
+CMD_START_LOGGING = 3
+CMD_STOP_LOGGING = 4
+CMD_RESET_LOGGING = 5
+CMD_CREATE_BLOCK_V2 = 6
+CMD_APPEND_BLOCK_V2 = 7
+
+CMD_INFO_NBR = 1
+CMD_INFO_DETAILS = 2
+
+MEMORY_TYPE_TESTER = 0x15
+
+# Limits of the firmware
+MAX_LOG_BLOCKS = 16
+# A log data packet also carries the block id and a 3 bytes timestamp
+MAX_LOG_BLOCK_SIZE = 26
+MAX_MEM_READ_SIZE = 24
+
+# Period of the retransmission and ack handling of the reliable mode
+_reliable_tick = 0.01
+
+DEFAULT_LOG_TOC = [
+    ('acc', 'x', 'float'), ('acc', 'y', 'float'), ('acc', 'z', 'float'),
+    ('gyro', 'x', 'float'), ('gyro', 'y', 'float'), ('gyro', 'z', 'float'),
+    ('stabilizer', 'roll', 'float'), ('stabilizer', 'pitch', 'float'),
+    ('stabilizer', 'yaw', 'float'), ('stabilizer', 'thrust', 'uint16_t'),
+    ('stateEstimate', 'x', 'float'), ('stateEstimate', 'y', 'float'),
+    ('stateEstimate', 'z', 'float'), ('stateEstimate', 'vx', 'float'),
+    ('stateEstimate', 'vy', 'float'), ('stateEstimate', 'vz', 'float'),
+    ('kalman', 'varPX', 'float'), ('kalman', 'varPY', 'float'),
+    ('kalman', 'varPZ', 'float'),
+    ('motor', 'm1', 'int32_t'), ('motor', 'm2', 'int32_t'),
+    ('motor', 'm3', 'int32_t'), ('motor', 'm4', 'int32_t'),
+    ('pm', 'vbat', 'float'), ('pm', 'state', 'int8_t'),
+    ('radio', 'rssi', 'uint8_t'), ('sys', 'canfly', 'uint8_t'),
+]
+
+# (group, name, type, read only, initial value)
+DEFAULT_PARAM_TOC = [
+    ('stabilizer', 'estimator', 'uint8_t', False, 2),
+    ('stabilizer', 'controller', 'uint8_t', False, 1),
+    ('commander', 'enHighLevel', 'uint8_t', False, 0),
+    ('kalman', 'resetEstimation', 'uint8_t', False, 0),
+    ('flightmode', 'posSet', 'uint8_t', False, 0),
+    ('pid_rate', 'roll_kp', 'float', False, 250.0),
+    ('pid_rate', 'pitch_kp', 'float', False, 250.0),
+    ('pid_rate', 'yaw_kp', 'float', False, 120.0),
+    ('ring', 'effect', 'uint8_t', False, 6),
+    ('ring', 'headlightEnable', 'uint8_t', False, 0),
+    ('system', 'selftestPassed', 'uint8_t', True, 1),
+    ('firmware', 'revision0', 'uint32_t', True, 0x12345678),
+    ('firmware', 'modified', 'uint8_t', True, 0),
+]
+
+_LOG_TYPES = dict((v[0], k) for k, v in LogTocElement.types.items())
+_PARAM_TYPES = dict((v[0], k) for k, v in ParamTocElement.types.items())
+_FORMATS = {'uint8_t': '<B', 'uint16_t': '<H', 'uint32_t': '<L',
+            'uint64_t': '<Q', 'int8_t': '<b', 'int16_t': '<h',
+            'int32_t': '<i', 'int64_t': '<q', 'FP16': '<e', 'float': '<f',
+            'double': '<d'}
+
+
+def _toc_element(group, name, type_id):
+    """ The payload of a TOC element, without the command and ident """
+    return (bytearray((type_id,)) + group.encode('ISO-8859-1') + b'\x00' +
+            name.encode('ISO-8859-1') + b'\x00')
+
+
+def _toc_crc(elements):
+    crc = 0
+    for element in elements:
+        crc = crc32(bytes(element), crc)
+    return crc & 0xFFFFFFFF
+
+
+def _packet(port, channel, data):
+    pk = CRTPPacket()
+    pk.set_header(port, channel)
+    pk.data = data
+    return pk
+
+
+class _LogBlock:
+
+    def __init__(self, variables):
+        # (ident, fetch type) pairs
+        self.variables = variables
+        self.period = 0
+        self.next_time = None
+
+    def size(self):
+        return sum(LogTocElement.get_size_from_id(fetch_as)
+                   for _, fetch_as in self.variables)
+
+
+class SimulatedCrazyflie:
+    """
+    The firmware side of the CRTP protocol, independent of the link.
+    handle_packet() returns the answers to a packet and poll_log_blocks()
+    the log data packets that are due.
+    """
+
+    def __init__(self, protocol_version=PROTOCOL_VERSION, log_toc=None,
+                 param_toc=None, extra_log_variables=0,
+                 extra_params=0, memory_size=0x1000):
+        """
+        extra_log_variables -- Number of float variables added to the
+                               default log TOC, in the 'sim' group
+        extra_params -- Number of float params added to the default param
+                        TOC, in the 'sim' group
+        """
+        self.protocol_version = protocol_version
+        self._boot_time = time.time()
+
+        if log_toc is None:
+            log_toc = list(DEFAULT_LOG_TOC)
+        log_toc += [('sim', 'v{}'.format(i), 'float')
+                    for i in range(extra_log_variables)]
+        self.log_toc = [(group, name, _LOG_TYPES[ctype])
+                        for group, name, ctype in log_toc]
+        self._log_elements = [_toc_element(*v) for v in self.log_toc]
+        self._log_crc = _toc_crc(self._log_elements)
+
+        if param_toc is None:
+            param_toc = list(DEFAULT_PARAM_TOC)
+        param_toc += [('sim', 'p{}'.format(i), 'float', False, 0.0)
+                      for i in range(extra_params)]
+        self.param_toc = []
+        self.param_values = []
+        for group, name, ctype, read_only, value in param_toc:
+            type_id = _PARAM_TYPES[ctype] | (0x40 if read_only else 0)
+            self.param_toc.append((group, name, type_id))
+            self.param_values.append(struct.pack(_FORMATS[ctype], value))
+        self._param_elements = [_toc_element(*p) for p in self.param_toc]
+        self._param_crc = _toc_crc(self._param_elements)
+
+        self.memory = bytearray(i & 0xFF for i in range(memory_size))
+
+        # Overrides of the generated log values, by complete name
+        self.log_values = {}
+        self.log_blocks = {}
+
+    def _use_v2(self):
+        return self.protocol_version >= 4
+
+    def timestamp(self, now):
+        """ Milliseconds since boot, on 24 bits like in the log packets """
+        return int((now - self._boot_time) * 1000) & 0xFFFFFF
+
+    def handle_packet(self, pk):
+        """ Return the list of packets answering pk """
+        handlers = {CRTPPort.LINKCTRL: self._handle_linkctrl,
+                    CRTPPort.PLATFORM: self._handle_platform,
+                    CRTPPort.LOGGING: self._handle_log,
+                    CRTPPort.PARAM: self._handle_param,
+                    CRTPPort.MEM: self._handle_mem}
+        handler = handlers.get(pk.port)
+        if handler is None or (len(pk.data) == 0 and
+                               pk.port != CRTPPort.LINKCTRL):
+            return []
+        return handler(pk)
+
+    def _handle_linkctrl(self, pk):
+        if pk.channel == LINKCTRL_ECHO:
+            return [_packet(pk.port, pk.channel, pk.data)]
+        if pk.channel == LINKCTRL_SOURCE:
+            return [_packet(pk.port, pk.channel, b'Bitcraze Crazyflie')]
+        return []
+
+    def _handle_platform(self, pk):
+        if pk.channel != PLATFORM_VERSION:
+            return []
+        if pk.data[0] == VERSION_GET_PROTOCOL:
+            data = (VERSION_GET_PROTOCOL, self.protocol_version)
+        elif pk.data[0] == VERSION_GET_FIRMWARE:
+            data = bytearray((VERSION_GET_FIRMWARE,)) + b'simulator'
+        else:
+            return []
+        return [_packet(pk.port, pk.channel, data)]
+
+    def _handle_toc(self, pk, elements, crc):
+        cmd = pk.data[0]
+        if cmd == CMD_TOC_INFO:
+            data = struct.pack('<BBI', cmd, len(elements), crc)
+        elif cmd == CMD_TOC_INFO_V2:
+            data = struct.pack('<BHI', cmd, len(elements), crc)
+        elif cmd == CMD_TOC_ELEMENT and len(pk.data) >= 2:
+            ident = pk.data[1]
+            if ident >= len(elements):
+                return []
+            data = bytearray((cmd, ident)) + elements[ident]
+        elif cmd == CMD_TOC_ITEM_V2 and len(pk.data) >= 3:
+            ident = struct.unpack('<H', pk.data[1:3])[0]
+            if ident >= len(elements):
+                return []
+            data = bytearray(pk.data[:3]) + elements[ident]
+        else:
+            return []
+        return [_packet(pk.port, TOC_CHANNEL, data)]
+
+    def _handle_log(self, pk):
+        if pk.channel == TOC_CHANNEL:
+            return self._handle_toc(pk, self._log_elements, self._log_crc)
+        if pk.channel != LOG_SETTINGS:
+            return []
+
+        cmd = pk.data[0]
+        block_id = pk.data[1] if len(pk.data) > 1 else 0
+        status = 0
+        if cmd == CMD_RESET_LOGGING:
+            self.log_blocks = {}
+        elif cmd in (CMD_CREATE_BLOCK, CMD_CREATE_BLOCK_V2):
+            status = self._create_block(block_id, pk.data[2:],
+                                        cmd == CMD_CREATE_BLOCK_V2)
+        elif cmd == CMD_DELETE_BLOCK:
+            if self.log_blocks.pop(block_id, None) is None:
+                status = errno.ENOENT
+        elif cmd == CMD_START_LOGGING:
+            block = self.log_blocks.get(block_id)
+            if block is None:
+                status = errno.ENOENT
+            else:
+                block.period = pk.data[2] * 0.01
+                block.next_time = time.time()
+        elif cmd == CMD_STOP_LOGGING:
+            block = self.log_blocks.get(block_id)
+            if block is None:
+                status = errno.ENOENT
+            else:
+                block.next_time = None
+        else:
+            status = errno.ENOEXEC
+        return [_packet(pk.port, pk.channel, (cmd, block_id, status))]
+
+    def _create_block(self, block_id, data, use_v2):
+        if block_id in self.log_blocks:
+            return errno.EEXIST
+        if len(self.log_blocks) >= MAX_LOG_BLOCKS:
+            return errno.ENOMEM
+
+        variables = []
+        step = 3 if use_v2 else 2
+        for i in range(0, len(data) - step + 1, step):
+            fetch_as = data[i] & 0x0F
+            if use_v2:
+                ident = data[i + 1] | data[i + 2] << 8
+            else:
+                ident = data[i + 1]
+            if ident >= len(self.log_toc) or \
+                    fetch_as not in LogTocElement.types:
+                return errno.ENOENT
+            variables.append((ident, fetch_as))
+
+        block = _LogBlock(variables)
+        if block.size() > MAX_LOG_BLOCK_SIZE:
+            return errno.E2BIG
+        self.log_blocks[block_id] = block
+        return 0
+
+    def log_value(self, ident, now):
+        """ The value of a log variable at time now """
+        group, name, _ = self.log_toc[ident]
+        complete_name = '{}.{}'.format(group, name)
+        if complete_name in self.log_values:
+            return self.log_values[complete_name]
+        return math.sin(now - self._boot_time + ident) * 100
+
+    def _pack_value(self, fetch_as, value):
+        ctype = LogTocElement.get_cstring_from_id(fetch_as)
+        if ctype in ('float', 'FP16'):
+            return struct.pack(_FORMATS[ctype], value)
+        if ctype.startswith('u'):
+            value = abs(value)
+        size = LogTocElement.get_size_from_id(fetch_as)
+        value = int(value) & ((1 << (8 * size)) - 1)
+        return struct.pack(_FORMATS[ctype].upper(), value)
+
+    def poll_log_blocks(self, now):
+        """ Return the log data packets due at time now """
+        packets = []
+        for block_id, block in self.log_blocks.items():
+            if block.next_time is None or block.next_time > now:
+                continue
+            data = bytearray((block_id,))
+            data += struct.pack('<I', self.timestamp(now))[:3]
+            for ident, fetch_as in block.variables:
+                data += self._pack_value(fetch_as,
+                                         self.log_value(ident, now))
+            packets.append(_packet(CRTPPort.LOGGING, LOG_DATA, data))
+            block.next_time += block.period
+            if block.next_time < now:
+                # Do not try to catch up after a stall
+                block.next_time = now + block.period
+        return packets
+
+    def next_log_time(self):
+        """ The time the next log data packet is due, None if logging is
+        stopped """
+        times = [block.next_time for block in self.log_blocks.values()
+                 if block.next_time is not None]
+        return min(times) if times else None
+
+    def _handle_param(self, pk):
+        if pk.channel == TOC_CHANNEL:
+            return self._handle_toc(pk, self._param_elements,
+                                    self._param_crc)
+
+        id_size = 2 if self._use_v2() else 1
+        if len(pk.data) < id_size:
+            return []
+        ident_data = bytearray(pk.data[:id_size])
+        ident = ident_data[0]
+        if self._use_v2():
+            ident |= ident_data[1] << 8
+        if ident >= len(self.param_toc):
+            return []
+
+        if pk.channel == PARAM_READ:
+            if self._use_v2():
+                # The status byte
+                data = ident_data + b'\x00' + self.param_values[ident]
+            else:
+                data = ident_data + self.param_values[ident]
+        elif pk.channel == PARAM_WRITE:
+            value = bytes(pk.data[id_size:])
+            if not self.param_toc[ident][2] & 0x40 and \
+                    len(value) == len(self.param_values[ident]):
+                self.param_values[ident] = value
+            data = ident_data + self.param_values[ident]
+        else:
+            return []
+        return [_packet(pk.port, pk.channel, data)]
+
+    def _handle_mem(self, pk):
+        if pk.channel == MEM_INFO:
+            if pk.data[0] == CMD_INFO_NBR:
+                return [_packet(pk.port, pk.channel, (CMD_INFO_NBR, 1))]
+            if pk.data[0] == CMD_INFO_DETAILS and len(pk.data) >= 2 and \
+                    pk.data[1] == 0:
+                data = struct.pack('<BBBI8s', CMD_INFO_DETAILS, 0,
+                                   MEMORY_TYPE_TESTER, len(self.memory),
+                                   b'\x00' * 8)
+                return [_packet(pk.port, pk.channel, data)]
+            return []
+
+        if len(pk.data) < 5 or pk.data[0] != 0:
+            return []
+        addr = struct.unpack('<I', pk.data[1:5])[0]
+        if pk.channel == MEM_READ and len(pk.data) >= 6:
+            length = min(pk.data[5], MAX_MEM_READ_SIZE)
+            if addr + length > len(self.memory):
+                data = bytearray(pk.data[:5]) + bytearray((errno.EIO,))
+            else:
+                data = bytearray(pk.data[:5]) + b'\x00' + \
+                    self.memory[addr:addr + length]
+        elif pk.channel == MEM_WRITE:
+            content = pk.data[5:]
+            if addr + len(content) > len(self.memory):
+                status = errno.EIO
+            else:
+                self.memory[addr:addr + len(content)] = content
+                status = 0
+            data = bytearray(pk.data[:5]) + bytearray((status,))
+        else:
+            return []
+        return [_packet(pk.port, pk.channel, data)]
+
+
+class _SimulatedLink:
+    """ The UDP socket of one simulated Crazyflie """
+
+    def __init__(self, host, port, firmware, reliable, latency=0, loss=0):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.port = self.socket.getsockname()[1]
+        self.firmware = firmware
+        self._reliable_supported = reliable
+        self._reliable = None
+        self._latency = latency
+        self._loss = loss
+        self._random = random.Random(port)
+        # (time to send, datagram) of the datagrams delayed by the latency
+        self._delayed = deque()
+        # Like the ESP-drone, talk to the last host that sent a hello
+        self.client = None
+
+    def datagram_received(self, data, addr):
+        if len(data) < 2 or _checksum(data[:-1]) != data[-1]:
+            return
+        data = data[:-1]
+
+        if data == _HELLO[:-1]:
+            # Sent when connecting and closing, drop the link state
+            self.client = addr
+            self._reliable = None
+            return
+        self.client = addr
+
+        if data == udpreliable.ENABLE_REQUEST:
+            if self._reliable_supported:
+                self._reliable = udpreliable.ReliableEndpoint(
+                    self._send_datagram)
+                self._send_datagram(data)
+        elif self._reliable is not None and udpreliable.is_frame(data):
+            for payload in self._reliable.receive(data):
+                self._handle(CRTPPacket(payload[0], payload[1:]))
+        else:
+            self._handle(CRTPPacket(data[0], data[1:]))
+
+    def _handle(self, pk):
+        for answer in self.firmware.handle_packet(pk):
+            self.send_packet(answer)
+
+    def send_packet(self, pk):
+        raw = bytearray((pk.header,)) + pk.data
+        if self._reliable is not None:
+            # The packets that do not fit in the window are dropped, like
+            # when the queues of the firmware are full
+            self._reliable.send(raw, 0)
+        else:
+            self._send_datagram(raw)
+
+    def _send_datagram(self, data):
+        if self.client is None:
+            return
+        if self._loss and self._random.random() < self._loss:
+            return
+        raw = bytearray(data)
+        raw.append(_checksum(raw))
+        if self._latency:
+            self._delayed.append((time.time() + self._latency, raw))
+        else:
+            self._sendto(raw)
+
+    def _sendto(self, raw):
+        try:
+            self.socket.sendto(raw, self.client)
+        except socket.error as e:
+            logger.debug('Could not send to %s: %s', self.client, e)
+
+    def poll(self, now):
+        while self._delayed and self._delayed[0][0] <= now:
+            self._sendto(self._delayed.popleft()[1])
+        if self.client is not None:
+            for pk in self.firmware.poll_log_blocks(now):
+                self.send_packet(pk)
+        if self._reliable is not None and not self._reliable.tick(now):
+            logger.info('Reliable link to %s lost', self.client)
+            self._reliable = None
+
+    def next_time(self):
+        """ The time poll() has to be called next, None if not needed """
+        times = []
+        log_time = self.firmware.next_log_time()
+        if log_time is not None:
+            times.append(log_time)
+        if self._reliable is not None:
+            times.append(time.time() + _reliable_tick)
+        if self._delayed:
+            times.append(self._delayed[0][0])
+        return min(times) if times else None
+
+
+class UdpSimulator:
+    """
+    Simulated Crazyflies listening on consecutive UDP ports from port, or
+    on free ports if port is 0. All of them are served by one thread.
+    """
+
+    def __init__(self, count=1, port=DEFAULT_PORT, host='127.0.0.1',
+                 reliable=True, latency=0, loss=0, **firmware_options):
+        """
+        reliable -- Accept to switch to the reliable mode of the UdpDriver
+        latency -- Time in seconds the sent datagrams are delayed
+        loss -- Part of the sent datagrams that are dropped, from 0 to 1
+        firmware_options -- Passed to SimulatedCrazyflie
+        """
+        self.host = host
+        self.links = []
+        try:
+            for i in range(count):
+                self.links.append(_SimulatedLink(
+                    host, port + i if port else 0,
+                    SimulatedCrazyflie(**firmware_options), reliable,
+                    latency, loss))
+        except socket.error:
+            self._close_sockets()
+            raise
+        self._wakeup = _Wakeup()
+        self._thread = None
+        self._is_running = False
+
+    @property
+    def uris(self):
+        """ The URIs to connect to the simulated Crazyflies """
+        return ['udp://{}:{}'.format(self.host, link.port)
+                for link in self.links]
+
+    @property
+    def firmwares(self):
+        return [link.firmware for link in self.links]
+
+    def start(self):
+        self._is_running = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+    def stop(self):
+        self._is_running = False
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._close_sockets()
+        self._wakeup.close()
+
+    def _close_sockets(self):
+        for link in self.links:
+            link.socket.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _run(self):
+        sockets = dict((link.socket, link) for link in self.links)
+        while self._is_running:
+            times = [t for t in (link.next_time() for link in self.links)
+                     if t is not None]
+            timeout = None
+            if times:
+                timeout = max(0, min(times) - time.time())
+
+            readable, _, _ = select.select(
+                list(sockets) + [self._wakeup], [], [], timeout)
+            for sock in readable:
+                if sock in sockets:
+                    try:
+                        data, addr = sock.recvfrom(1024)
+                    except socket.error:
+                        continue
+                    sockets[sock].datagram_received(bytearray(data), addr)
+
+            now = time.time()
+            for link in self.links:
+                link.poll(now)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Simulate ESP-drones on the local UDP ports')
+    parser.add_argument('--count', type=int, default=1,
+                        help='number of Crazyflies to simulate')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help='port of the first Crazyflie, the next ones '
+                             'use the following ports')
+    parser.add_argument('--protocol-version', type=int,
+                        default=PROTOCOL_VERSION)
+    parser.add_argument('--log-variables', type=int, default=0,
+                        help='number of variables added to the log TOC')
+    parser.add_argument('--params', type=int, default=0,
+                        help='number of params added to the param TOC')
+    parser.add_argument('--no-reliable', action='store_true',
+                        help='refuse the reliable mode')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='delay of the sent datagrams in seconds')
+    parser.add_argument('--loss', type=float, default=0,
+                        help='part of the sent datagrams to drop (0 to 1)')
+    args = parser.parse_args()
+
+    simulator = UdpSimulator(args.count, args.port, args.host,
+                             reliable=not args.no_reliable,
+                             latency=args.latency, loss=args.loss,
+                             protocol_version=args.protocol_version,
+                             extra_log_variables=args.log_variables,
+                             extra_params=args.params)
+    for uri in simulator.uris:
+        print(uri)
+    simulator.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    simulator.stop()
+
+
+if __name__ == '__main__':
+    main()
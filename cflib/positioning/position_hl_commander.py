@@ -48,6 +48,9 @@ class PositionHlCommander:
 
     DEFAULT = None
 
+    # Time in seconds to wait for the initial position to be acknowledged
+    PARAM_TIMEOUT = 2.0
+
     def __init__(self, crazyflie,
                  x=0.0, y=0.0, z=0.0,
                  default_velocity=0.5,
@@ -96,8 +99,8 @@ class PositionHlCommander:
         if not self._cf.is_connected():
             raise Exception('Crazyflie is not connected')
 
-        self._is_flying = True
         self._reset_position_estimator()
+        self._is_flying = True
         self._activate_controller()
         self._activate_high_level_commander()
         self._hl_commander = self._cf.high_level_commander
@@ -271,9 +274,15 @@ class PositionHlCommander:
         return self._x, self._y, self._z
 
     def _reset_position_estimator(self):
-        self._cf.param.set_value('kalman.initialX', '{:.2f}'.format(self._x))
-        self._cf.param.set_value('kalman.initialY', '{:.2f}'.format(self._y))
-        self._cf.param.set_value('kalman.initialZ', '{:.2f}'.format(self._z))
+        # Wait for the initial position to be set before resetting
+        failed = self._cf.param.set_values({
+            'kalman.initialX': self._x,
+            'kalman.initialY': self._y,
+            'kalman.initialZ': self._z,
+        }, timeout=self.PARAM_TIMEOUT)
+        if failed:
+            raise Exception('Could not set the initial position, {} not '
+                            'acknowledged'.format(', '.join(sorted(failed))))
 
         self._cf.param.set_value('kalman.resetEstimation', '1')
         time.sleep(0.1)
@@ -1,6 +1,26 @@
 #!/usr/bin/env python3
+import sys
+
 from setuptools import find_packages
 from setuptools import setup
+from setuptools.command.build_py import build_py
+
+# Modules using the async syntax, they are not valid before Python 3.5
+ASYNC_MODULES = [
+    ('cflib.crazyflie', 'asyncCrazyflie'),
+    ('cflib.crtp', 'aioudpdriver'),
+]
+
+
+class BuildPy(build_py):
+    """Leave out the asyncio modules on the Pythons that can not parse them"""
+
+    def find_package_modules(self, package, package_dir):
+        modules = build_py.find_package_modules(self, package, package_dir)
+        if sys.version_info < (3, 5):
+            modules = [m for m in modules if m[:2] not in ASYNC_MODULES]
+        return modules
+
 
 setup(
     name='cflib',
@@ -24,5 +44,8 @@ setup(
 
     keywords='driver crazyflie quadcopter',
 
-    install_requires='pyusb>=1.0.0b2',
+    install_requires=['pyusb>=1.0.0b2',
+                      'futures; python_version < "3"'],
+
+    cmdclass={'build_py': BuildPy},
 )
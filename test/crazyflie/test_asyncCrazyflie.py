@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import sys
+import unittest
+from concurrent.futures import Future
+from threading import Timer
+from test.support.asyncCallbackCaller import AsyncCallbackCaller
+
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie.log import LogConfig
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.utils.callbacks import Caller
+
+if sys.version_info < (3, 3):
+    from mock import MagicMock
+else:
+    from unittest.mock import MagicMock
+
+if sys.version_info >= (3, 5):
+    import asyncio
+    from cflib.crazyflie.asyncCrazyflie import AsyncCrazyflie
+    from cflib.crtp.aioudpdriver import AioUdpDriver
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'Requires Python 3.5')
+class AsyncCrazyflieTest(unittest.TestCase):
+
+    def setUp(self):
+        self.uri = 'udp://127.0.0.1:2390'
+        self.loop = asyncio.new_event_loop()
+
+        self.cf_mock = MagicMock(spec=Crazyflie)
+        self.cf_mock.connected = Caller()
+        self.cf_mock.connection_failed = Caller()
+        self.cf_mock.disconnected = Caller()
+        self.cf_mock.packet_received = Caller()
+        self.cf_mock.incoming = MagicMock()
+        self.cf_mock.param = MagicMock()
+        self.cf_mock.log = MagicMock()
+
+        self.cf_mock.open_link = MagicMock(
+            side_effect=AsyncCallbackCaller(cb=self.cf_mock.connected,
+                                            args=[self.uri]).trigger)
+
+        self.endpoint = MagicMock()
+        self.sut = AsyncCrazyflie(self.uri, self.endpoint, self.cf_mock,
+                                  self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _run(self, coroutine):
+        return self.loop.run_until_complete(
+            asyncio.wait_for(coroutine, 1))
+
+    def test_open_link(self):
+        # Fixture
+
+        # Test
+        self._run(self.sut.open_link())
+
+        # Assert
+        self.assertTrue(self.sut.is_link_open())
+        uri, link = self.cf_mock.open_link.call_args[0]
+        self.assertEqual(self.uri, uri)
+        self.assertIsInstance(link, AioUdpDriver)
+
+    def test_failed_open_link_raises_exception(self):
+        # Fixture
+        expected = 'Some error message'
+        self.cf_mock.open_link.side_effect = AsyncCallbackCaller(
+            cb=self.cf_mock.connection_failed,
+            args=[self.uri, expected]).trigger
+
+        # Test
+        with self.assertRaises(Exception) as context:
+            self._run(self.sut.open_link())
+
+        # Assert
+        self.assertEqual(expected, context.exception.args[0])
+        self.assertFalse(self.sut.is_link_open())
+        self.assertEqual([], self.cf_mock.connected.callbacks)
+        self.assertEqual([], self.cf_mock.connection_failed.callbacks)
+
+    def test_close_link(self):
+        # Fixture
+        self._run(self.sut.open_link())
+
+        # Test
+        self._run(self.sut.close_link())
+
+        # Assert
+        self.cf_mock.close_link.assert_called_once_with()
+        self.assertFalse(self.sut.is_link_open())
+        self.assertEqual([], self.cf_mock.disconnected.callbacks)
+
+    def test_get_param(self):
+        # Fixture
+        callbacks = Caller()
+        self.cf_mock.param.add_update_callback.side_effect = \
+            lambda group, name, cb: callbacks.add_callback(cb)
+        self.cf_mock.param.request_param_update.side_effect = \
+            lambda name: AsyncCallbackCaller(
+                cb=callbacks, args=[name, '2']).trigger()
+
+        # Test
+        actual = self._run(self.sut.get_param('stabilizer.estimator'))
+
+        # Assert
+        self.assertEqual('2', actual)
+        self.cf_mock.param.request_param_update.assert_called_once_with(
+            'stabilizer.estimator')
+        self.cf_mock.param.remove_update_callback.assert_called_once_with(
+            group='stabilizer', name='estimator',
+            cb=callbacks.callbacks[0])
+
+    def test_set_param(self):
+        # Fixture
+        callbacks = Caller()
+        self.cf_mock.param.add_update_callback.side_effect = \
+            lambda group, name, cb: callbacks.add_callback(cb)
+        self.cf_mock.param.set_value.side_effect = \
+            lambda name, value: AsyncCallbackCaller(
+                cb=callbacks, args=[name, value]).trigger()
+
+        # Test
+        actual = self._run(self.sut.set_param('stabilizer.estimator', 2))
+
+        # Assert
+        self.assertEqual('2', actual)
+        self.cf_mock.param.set_value.assert_called_once_with(
+            'stabilizer.estimator', '2')
+
+    def test_log_stream_yields_data_until_disconnected(self):
+        # Fixture
+        log_config = LogConfig('test', 10)
+        log_config.start = MagicMock()
+        log_config.stop = MagicMock()
+        log_config.delete = MagicMock()
+        stream = self.sut.log_stream(log_config)
+
+        def started():
+            log_config.data_received_cb.call(1, {'a': 1}, log_config)
+            log_config.data_received_cb.call(2, {'a': 2}, log_config)
+            self.cf_mock.disconnected.call(self.uri)
+        log_config.start.side_effect = started
+
+        # Test
+        actual = [self._run(stream.__anext__()),
+                  self._run(stream.__anext__())]
+        with self.assertRaises(StopAsyncIteration):
+            self._run(stream.__anext__())
+
+        # Assert
+        self.assertEqual([(1, {'a': 1}, log_config),
+                          (2, {'a': 2}, log_config)], actual)
+        self.cf_mock.log.add_config.assert_called_once_with(log_config)
+        log_config.stop.assert_called_once_with()
+        log_config.delete.assert_called_once_with()
+        self.assertEqual([], log_config.data_received_cb.callbacks)
+
+    def test_send_packet_returns_reply(self):
+        # Fixture
+        pk = CRTPPacket(0x30, (1, 2))
+        reply = CRTPPacket(0x30, (1, 2, 3))
+        future = Future()
+        self.cf_mock.send_request.return_value = future
+        Timer(0.05, future.set_result, [reply]).start()
+
+        # Test
+        actual = self._run(self.sut.send_packet(pk, expected_reply=(1, 2)))
+
+        # Assert
+        self.assertIs(reply, actual)
+        self.cf_mock.send_request.assert_called_once_with(pk, (1, 2))
+
+    def test_send_packet_raises_when_request_fails(self):
+        # Fixture
+        pk = CRTPPacket(0x30, (1, 2))
+        future = Future()
+        future.set_exception(IOError('Link closed'))
+        self.cf_mock.send_request.return_value = future
+
+        # Test
+        # Assert
+        with self.assertRaises(IOError):
+            self._run(self.sut.send_packet(pk, expected_reply=(1, 2)))
@@ -0,0 +1,609 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import sys
+import time
+import unittest
+from concurrent.futures import TimeoutError
+from threading import Event
+from threading import Thread
+
+from cflib.crazyflie import _AnswerPatterns
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie import _IncomingPacketHandler
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.crtp.crtpstack import CRTPPort
+from cflib.utils.callbacks import Caller
+
+if sys.version_info < (3, 3):
+    from mock import MagicMock
+else:
+    from unittest.mock import MagicMock
+
+
+def _link_mock():
+    """A link that never receives anything"""
+    link = MagicMock()
+    link.pushes_packets = False
+    link.receive_packet.side_effect = lambda timeout: time.sleep(timeout)
+    return link
+
+
+def _packet(port, channel, data=(0,)):
+    pk = CRTPPacket()
+    pk.set_header(port, channel)
+    pk.data = data
+    return pk
+
+
+class IncomingPacketHandlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cf_mock = MagicMock()
+        self.cf_mock.packet_received = Caller()
+        self.sut = _IncomingPacketHandler(self.cf_mock)
+        self.received = []
+
+    def _callback(self, name):
+        return lambda pk: self.received.append((name, pk.port, pk.channel))
+
+    def test_that_port_callback_gets_all_channels(self):
+        # Fixture
+        self.sut.add_port_callback(CRTPPort.PARAM, self._callback('param'))
+        self.sut.add_port_callback(CRTPPort.LOGGING, self._callback('log'))
+
+        # Test
+        self.sut.dispatch(_packet(CRTPPort.PARAM, 0))
+        self.sut.dispatch(_packet(CRTPPort.PARAM, 3))
+        self.sut.dispatch(_packet(CRTPPort.MEM, 0))
+
+        # Assert
+        self.assertEqual([('param', CRTPPort.PARAM, 0),
+                          ('param', CRTPPort.PARAM, 3)], self.received)
+
+    def test_that_header_callback_gets_its_channel_only(self):
+        # Fixture
+        self.sut.add_header_callback(self._callback('echo'),
+                                     CRTPPort.LINKCTRL, 0)
+
+        # Test
+        self.sut.dispatch(_packet(CRTPPort.LINKCTRL, 1))
+        self.sut.dispatch(_packet(CRTPPort.LINKCTRL, 0))
+
+        # Assert
+        self.assertEqual([('echo', CRTPPort.LINKCTRL, 0)], self.received)
+
+    def test_that_masked_callback_gets_all_ports(self):
+        # Fixture
+        self.sut.add_header_callback(self._callback('all'), 0, 0,
+                                     port_mask=0, channel_mask=0)
+
+        # Test
+        self.sut.dispatch(_packet(CRTPPort.CONSOLE, 0))
+        self.sut.dispatch(_packet(CRTPPort.LINKCTRL, 3))
+
+        # Assert
+        self.assertEqual(2, len(self.received))
+
+    def test_that_callbacks_are_called_in_registration_order(self):
+        # Fixture
+        self.sut.add_port_callback(CRTPPort.PARAM, self._callback('first'))
+        self.sut.add_header_callback(self._callback('second'),
+                                     CRTPPort.PARAM, 1)
+
+        # Test
+        self.sut.dispatch(_packet(CRTPPort.PARAM, 1))
+
+        # Assert
+        self.assertEqual(['first', 'second'],
+                         [name for name, _, _ in self.received])
+
+    def test_that_removed_callback_is_not_called(self):
+        # Fixture
+        callback = self._callback('removed')
+        self.sut.add_port_callback(CRTPPort.PARAM, callback)
+        self.sut.add_port_callback(CRTPPort.PARAM, self._callback('kept'))
+
+        # Test
+        self.sut.remove_port_callback(CRTPPort.PARAM, callback)
+        self.sut.dispatch(_packet(CRTPPort.PARAM, 0))
+
+        # Assert
+        self.assertEqual([('kept', CRTPPort.PARAM, 0)], self.received)
+
+    def test_that_removed_header_callback_is_not_called(self):
+        # Fixture
+        callback = self._callback('removed')
+        self.sut.add_header_callback(callback, CRTPPort.LOGGING, 2)
+        self.sut.add_header_callback(self._callback('kept'),
+                                     CRTPPort.LOGGING, 2)
+
+        # Test
+        self.sut.remove_header_callback(callback, CRTPPort.LOGGING, 2)
+        self.sut.dispatch(_packet(CRTPPort.LOGGING, 2))
+
+        # Assert
+        self.assertEqual([('kept', CRTPPort.LOGGING, 2)], self.received)
+
+    def test_that_callback_can_be_removed_while_dispatching(self):
+        # Fixture
+        def remove_itself(pk):
+            self.received.append('first')
+            self.sut.remove_port_callback(CRTPPort.PARAM, remove_itself)
+
+        self.sut.add_port_callback(CRTPPort.PARAM, remove_itself)
+        self.sut.add_port_callback(CRTPPort.PARAM,
+                                   lambda pk: self.received.append('second'))
+
+        # Test
+        self.sut.dispatch(_packet(CRTPPort.PARAM, 0))
+        self.sut.dispatch(_packet(CRTPPort.PARAM, 0))
+
+        # Assert
+        self.assertEqual(['first', 'second', 'second'], self.received)
+
+    def test_that_reading_is_started_once(self):
+        # Fixture
+        self.cf_mock.link = None
+        self.sut.setDaemon(True)
+        errors = []
+
+        def open_link():
+            try:
+                self.sut.link_opened()
+            except RuntimeError as e:
+                errors.append(e)
+
+        openers = [Thread(target=open_link) for _ in range(8)]
+
+        # Test
+        for opener in openers:
+            opener.start()
+        for opener in openers:
+            opener.join(1)
+
+        # Assert
+        self.assertEqual([], errors)
+        self.assertTrue(self.sut.is_alive())
+
+    def test_that_exception_in_callback_does_not_stop_dispatching(self):
+        # Fixture
+        def fail(pk):
+            raise Exception('Failing callback')
+
+        self.sut.add_port_callback(CRTPPort.PARAM, fail)
+        self.sut.add_port_callback(CRTPPort.PARAM, self._callback('next'))
+
+        # Test
+        self.sut.dispatch(_packet(CRTPPort.PARAM, 0))
+
+        # Assert
+        self.assertEqual([('next', CRTPPort.PARAM, 0)], self.received)
+
+
+class AnswerPatternsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = _AnswerPatterns()
+
+    def test_that_nothing_matches_when_no_pattern_is_pending(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2))
+
+        # Test
+        actual = self.sut.pop_match(pk)
+
+        # Assert
+        self.assertIsNone(actual)
+
+    def test_that_the_longest_pattern_is_matched(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2, 3))
+        self.sut[(pk.header, 1)] = 'short'
+        self.sut[(pk.header, 1, 2)] = 'long'
+        self.sut[(pk.header, 1, 2, 4)] = 'other'
+
+        # Test
+        actual = self.sut.pop_match(pk)
+
+        # Assert
+        self.assertEqual('long', actual)
+        self.assertEqual(2, len(self.sut))
+        self.assertFalse((pk.header, 1, 2) in self.sut)
+
+    def test_that_pattern_with_only_header_matches(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2))
+        self.sut[(pk.header,)] = 'header'
+
+        # Test
+        actual = self.sut.pop_match(pk)
+
+        # Assert
+        self.assertEqual('header', actual)
+        self.assertEqual(0, len(self.sut))
+
+    def test_that_patterns_are_separated_by_header(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2))
+        other = _packet(CRTPPort.PARAM, 2, (1, 2))
+        self.sut[(other.header, 1)] = 'other'
+
+        # Test
+        actual = self.sut.pop_match(pk)
+
+        # Assert
+        self.assertIsNone(actual)
+        self.assertEqual('other', self.sut[(other.header, 1)])
+
+    def test_that_pattern_longer_than_packet_does_not_match(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1,))
+        self.sut[(pk.header, 1, 2)] = 'long'
+
+        # Test
+        actual = self.sut.pop_match(pk)
+
+        # Assert
+        self.assertIsNone(actual)
+
+    def test_that_matched_pattern_is_removed_from_the_trie(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2, 3))
+        self.sut[(pk.header, 1, 2)] = 'first'
+        self.sut.pop_match(pk)
+        self.sut[(pk.header, 1)] = 'second'
+
+        # Test
+        actual = self.sut.pop_match(pk)
+
+        # Assert
+        self.assertEqual('second', actual)
+        self.assertEqual({}, self.sut._tries)
+
+    def test_that_clear_removes_all_patterns(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1,))
+        self.sut[(pk.header, 1)] = 'value'
+
+        # Test
+        self.sut.clear()
+
+        # Assert
+        self.assertEqual(0, len(self.sut))
+        self.assertIsNone(self.sut.pop_match(pk))
+
+
+class CrazyflieLinkTest(unittest.TestCase):
+
+    def test_that_link_passed_to_constructor_is_read(self):
+        # Fixture
+        packets = [_packet(CRTPPort.CONSOLE, 0)]
+        ready = Event()
+        received = Event()
+
+        def receive_packet(timeout):
+            if ready.wait(timeout) and packets:
+                return packets.pop()
+            time.sleep(timeout)
+
+        link = _link_mock()
+        link.receive_packet.side_effect = receive_packet
+
+        # Test
+        sut = Crazyflie(link=link)
+        sut.add_port_callback(CRTPPort.CONSOLE, lambda pk: received.set())
+        ready.set()
+
+        # Assert
+        self.assertTrue(received.wait(1))
+        self.assertTrue(sut.incoming.is_alive())
+
+    def test_that_link_pushing_packets_is_not_read(self):
+        # Fixture
+        sut = Crazyflie(link=_link_mock())
+        link = _link_mock()
+        link.pushes_packets = True
+        link.receive_packet.side_effect = Exception('Not supported')
+
+        # Test
+        sut.close_link()
+        sut.open_link('udp://127.0.0.1', link)
+        # The thread polls for a new link every second
+        time.sleep(1.2)
+
+        # Assert
+        link.receive_packet.assert_not_called()
+        self.assertTrue(sut.incoming.is_alive())
+
+
+class CrazyflieResendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.link_mock = _link_mock()
+        self.link_mock.needs_resending = True
+        self.sut = Crazyflie(link=self.link_mock)
+
+    def tearDown(self):
+        self.sut._fail_pending_answers('Test done')
+
+    def test_that_unanswered_packet_is_resent(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2))
+
+        # Test
+        self.sut.send_packet(pk, expected_reply=(1,), timeout=0.01)
+        time.sleep(0.1)
+
+        # Assert
+        self.assertGreater(self.link_mock.send_packet.call_count, 1)
+
+    def test_that_answered_packet_is_not_resent(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2))
+
+        # Test
+        self.sut.send_packet(pk, expected_reply=(1,), timeout=0.05)
+        self.sut._check_for_answers(_packet(CRTPPort.PARAM, 1, (1, 5)))
+        time.sleep(0.1)
+
+        # Assert
+        self.link_mock.send_packet.assert_called_once_with(pk)
+        self.assertEqual(0, len(self.sut._answer_patterns))
+
+    def test_that_answer_updates_round_trip_time(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2))
+
+        # Test
+        self.sut.send_packet(pk, expected_reply=(1,))
+        self.sut._check_for_answers(_packet(CRTPPort.PARAM, 1, (1, 5)))
+
+        # Assert
+        self.assertIsNotNone(self.sut._rtt_estimator.srtt)
+        self.assertLess(self.sut._rtt_estimator.rto, 0.2)
+
+    def test_that_answer_to_resent_packet_is_not_sampled(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2))
+        self.sut.send_packet(pk, expected_reply=(1,), timeout=0.01)
+        time.sleep(0.05)
+
+        # Test
+        self.sut._check_for_answers(_packet(CRTPPort.PARAM, 1, (1, 5)))
+
+        # Assert
+        self.assertIsNone(self.sut._rtt_estimator.srtt)
+        self.assertGreater(self.sut._rtt_estimator.rto, 0.2)
+
+
+class CrazyflieSendRequestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.link_mock = _link_mock()
+        self.link_mock.needs_resending = False
+        self.sut = Crazyflie(link=self.link_mock)
+
+    def tearDown(self):
+        self.sut._fail_pending_answers('Test done')
+
+    def test_that_future_is_resolved_with_the_answer(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2))
+        answer = _packet(CRTPPort.PARAM, 1, (1, 5))
+
+        # Test
+        future = self.sut.send_request(pk, (1,))
+        self.sut._check_for_answers(answer)
+
+        # Assert
+        self.link_mock.send_packet.assert_called_once_with(pk)
+        self.assertIs(answer, future.result(0))
+
+    def test_that_other_packets_do_not_resolve_the_future(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2))
+
+        # Test
+        future = self.sut.send_request(pk, (1,))
+        self.sut._check_for_answers(_packet(CRTPPort.PARAM, 1, (2, 5)))
+        self.sut._check_for_answers(_packet(CRTPPort.PARAM, 2, (1, 5)))
+
+        # Assert
+        self.assertFalse(future.done())
+
+    def test_that_requests_for_the_same_answer_are_all_resolved(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2))
+        answer = _packet(CRTPPort.PARAM, 1, (1, 5))
+
+        # Test
+        futures = [self.sut.send_request(pk, (1,)) for _ in range(3)]
+        self.sut._check_for_answers(answer)
+
+        # Assert
+        for future in futures:
+            self.assertIs(answer, future.result(0))
+
+    def test_that_many_requests_can_be_in_flight(self):
+        # Fixture
+        futures = [self.sut.send_request(_packet(CRTPPort.PARAM, 1, (i,)),
+                                         (i,)) for i in range(10)]
+
+        # Test
+        for i in reversed(range(10)):
+            self.sut._check_for_answers(_packet(CRTPPort.PARAM, 1, (i, 0)))
+
+        # Assert
+        for i, future in enumerate(futures):
+            self.assertEqual(i, future.result(0).data[0])
+
+    def test_that_future_fails_on_timeout(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2))
+
+        # Test
+        future = self.sut.send_request(pk, (1,), timeout=0.01)
+
+        # Assert
+        self.assertIsInstance(future.exception(1), TimeoutError)
+        self.assertEqual(0, len(self.sut._answer_patterns))
+
+    def test_that_future_fails_when_link_is_closed(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2))
+        future = self.sut.send_request(pk, (1,))
+
+        # Test
+        self.sut.close_link()
+
+        # Assert
+        self.assertIsInstance(future.exception(0), IOError)
+
+    def test_that_future_fails_when_link_is_lost(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2))
+        future = self.sut.send_request(pk, (1,))
+
+        # Test
+        self.sut._link_error_cb('Lost')
+
+        # Assert
+        self.assertIsInstance(future.exception(0), IOError)
+
+    def test_that_future_fails_without_link(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2))
+        self.sut.link = None
+
+        # Test
+        future = self.sut.send_request(pk, (1,))
+
+        # Assert
+        self.assertIsInstance(future.exception(0), IOError)
+        self.assertEqual(0, len(self.sut._answer_patterns))
+
+    def test_that_unanswered_request_is_resent(self):
+        # Fixture
+        pk = _packet(CRTPPort.PARAM, 1, (1, 2))
+        answer = _packet(CRTPPort.PARAM, 1, (1, 5))
+        self.link_mock.needs_resending = True
+        self.sut._rtt_estimator.rto = 0.01
+
+        # Test
+        future = self.sut.send_request(pk, (1,))
+        time.sleep(0.1)
+        self.sut._check_for_answers(answer)
+
+        # Assert
+        self.assertGreater(self.link_mock.send_packet.call_count, 1)
+        self.assertIs(answer, future.result(0))
+
+
+class CrazyflieConnectionSetupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = Crazyflie(link=_link_mock())
+        self.sut.platform = MagicMock()
+        self.sut.log = MagicMock()
+        self.sut.mem = MagicMock()
+        self.sut.param = MagicMock()
+        self.sut.param.lazy = False
+        self.connected = MagicMock()
+        self.sut.connected.add_callback(self.connected)
+
+    def _start_platform_stage(self):
+        self.sut._start_connection_setup()
+        self.sut.platform.fetch_platform_informations.call_args[0][0]()
+
+    def test_that_stages_start_together_after_platform_info(self):
+        # Fixture
+        # Test
+        self._start_platform_stage()
+
+        # Assert
+        self.sut.log.refresh_toc.assert_called_once_with(
+            self.sut._log_toc_updated_cb, self.sut._toc_cache)
+        self.sut.mem.refresh.assert_called_once_with(
+            self.sut._mems_updated_cb)
+        self.sut.param.refresh_toc.assert_called_once_with(
+            self.sut._param_toc_updated_cb, self.sut._toc_cache)
+        self.connected.assert_not_called()
+
+    def test_that_connected_is_called_when_all_stages_are_finished(self):
+        # Fixture
+        self._start_platform_stage()
+
+        # Test
+        self.sut._param_toc_updated_cb()
+        self.sut._log_toc_updated_cb()
+        self.connected.assert_not_called()
+        self.sut._mems_updated_cb()
+
+        # Assert
+        self.connected.assert_called_once_with(self.sut.link_uri)
+        self.sut.param.request_update_of_all_params.assert_called_once_with()
+        self.assertTrue(self.sut.is_connected())
+
+    def test_that_lazy_params_are_not_updated_after_connecting(self):
+        # Fixture
+        self.sut.param.lazy = True
+        self._start_platform_stage()
+
+        # Test
+        self.sut._param_toc_updated_cb()
+        self.sut._log_toc_updated_cb()
+        self.sut._mems_updated_cb()
+
+        # Assert
+        self.connected.assert_called_once_with(self.sut.link_uri)
+        self.sut.param.request_update_of_all_params.assert_not_called()
+
+    def test_that_stage_times_are_recorded(self):
+        # Fixture
+        self._start_platform_stage()
+
+        # Test
+        self.sut._param_toc_updated_cb()
+        self.sut._log_toc_updated_cb()
+        self.sut._mems_updated_cb()
+
+        # Assert
+        times = self.sut.connection_setup_times
+        self.assertEqual(set(['platform', 'log_toc', 'memories', 'param_toc',
+                              'total']), set(times))
+        self.assertEqual(max(times.values()), times['total'])
+
+    def test_that_finished_stage_is_only_counted_once(self):
+        # Fixture
+        self._start_platform_stage()
+
+        # Test
+        self.sut._param_toc_updated_cb()
+        self.sut._param_toc_updated_cb()
+        self.sut._log_toc_updated_cb()
+
+        # Assert
+        self.connected.assert_not_called()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import struct
+import sys
+import unittest
+
+from cflib.crazyflie.log import LogConfig
+from cflib.crazyflie.log import LogTocElement
+
+if sys.version_info < (3, 3):
+    from mock import MagicMock
+else:
+    from unittest.mock import MagicMock
+
+
+class LogConfigTest(unittest.TestCase):
+
+    def _config(self, data_format=LogConfig.DICT):
+        config = LogConfig('test', 10, data_format)
+        config.add_variable('stabilizer.roll', 'float')
+        config.add_variable('pm.state', 'int8_t')
+        config.add_variable('motor.m1', 'uint16_t')
+        self.received = MagicMock()
+        config.data_received_cb.add_callback(self.received)
+        return config
+
+    def _data(self):
+        return bytearray(struct.pack('<fbH', 1.5, -2, 40000))
+
+    def test_that_data_is_unpacked_to_dict(self):
+        # Fixture
+        sut = self._config()
+
+        # Test
+        sut.unpack_log_data(self._data(), 1234)
+
+        # Assert
+        self.received.assert_called_once_with(
+            1234, {'stabilizer.roll': 1.5, 'pm.state': -2,
+                   'motor.m1': 40000}, sut)
+
+    def test_that_data_is_unpacked_to_tuple(self):
+        # Fixture
+        sut = self._config(LogConfig.TUPLE)
+
+        # Test
+        sut.unpack_log_data(self._data(), 1234)
+
+        # Assert
+        self.received.assert_called_once_with(1234, (1.5, -2, 40000), sut)
+
+    def test_that_data_is_unpacked_to_namedtuple(self):
+        # Fixture
+        sut = self._config(LogConfig.NAMEDTUPLE)
+
+        # Test
+        sut.unpack_log_data(self._data(), 1234)
+
+        # Assert
+        data = self.received.call_args[0][1]
+        self.assertEqual(1.5, data.stabilizer_roll)
+        self.assertEqual(-2, data.pm_state)
+        self.assertEqual(40000, data.motor_m1)
+
+    def test_that_variable_added_after_unpacking_is_unpacked(self):
+        # Fixture
+        sut = self._config(LogConfig.TUPLE)
+        sut.unpack_log_data(self._data(), 1234)
+
+        # Test
+        sut.add_variable('pm.vbat', 'float')
+        sut.unpack_log_data(self._data() + struct.pack('<f', 3.5), 1244)
+
+        # Assert
+        self.received.assert_called_with(1244, (1.5, -2, 40000, 3.5), sut)
+
+    def test_that_unknown_data_format_raises(self):
+        # Fixture
+        # Test
+        # Assert
+        with self.assertRaises(ValueError):
+            LogConfig('test', 10, 'list')
+
+
+class LogTocElementTest(unittest.TestCase):
+
+    def test_that_every_type_has_a_dtype_of_its_size(self):
+        # Fixture
+        # Test
+        actual = dict((ident, int(LogTocElement.get_dtype_from_id(ident)[2:]))
+                      for ident in LogTocElement.types)
+
+        # Assert
+        expected = dict((ident, LogTocElement.get_size_from_id(ident))
+                        for ident in LogTocElement.types)
+        self.assertEqual(expected, actual)
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+
+from cflib.crazyflie.log import LogConfig
+from cflib.crazyflie.logCapture import LogCaptureReader
+from cflib.crazyflie.logCapture import LogCaptureWriter
+from cflib.crazyflie.logCapture import np
+from cflib.crazyflie.logCapture import RECORD_SIZE
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.utils.callbacks import Caller
+
+if sys.version_info < (3, 3):
+    from mock import MagicMock
+else:
+    from unittest.mock import MagicMock
+
+
+@unittest.skipIf(np is None, 'Requires NumPy')
+class LogCaptureTest(unittest.TestCase):
+
+    def setUp(self):
+        dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dir)
+        self.filename = os.path.join(dir, 'capture.cflc')
+
+        self.cf_mock = MagicMock()
+        self.cf_mock.log.log_blocks = []
+        self.cf_mock.log.block_added_cb = Caller()
+        self.cf_mock.incoming.add_header_callback.side_effect = \
+            self._add_header_callback
+        self.cf_mock.incoming.remove_header_callback.side_effect = \
+            self._remove_header_callback
+        self.packet_callbacks = []
+
+        self.config = self._config(1, 'stab', [('stabilizer.roll', 'float'),
+                                               ('pm.state', 'int8_t')])
+
+    def _add_header_callback(self, cb, port, channel):
+        self.packet_callbacks.append(cb)
+
+    def _remove_header_callback(self, cb, port, channel):
+        self.packet_callbacks.remove(cb)
+
+    def _config(self, id, name, variables):
+        config = LogConfig(name, 10)
+        for variable, fetch_as in variables:
+            config.add_variable(variable, fetch_as)
+        config.id = id
+        return config
+
+    def _receive(self, id, timestamp, values):
+        data = bytearray(struct.pack('<BHB', id, timestamp & 0xffff,
+                                     timestamp >> 16)) + values
+        for cb in self.packet_callbacks:
+            cb(CRTPPacket(0x52, data))
+
+    def test_that_captured_block_is_read(self):
+        # Fixture
+        self.cf_mock.log.log_blocks = [self.config]
+
+        # Test
+        with LogCaptureWriter(self.cf_mock, self.filename):
+            for i in range(5):
+                self._receive(1, 0x10000 + i, struct.pack('<fb', i, -i))
+        actual = LogCaptureReader(self.filename).read('stab')
+
+        # Assert
+        self.assertEqual([0x10000 + i for i in range(5)],
+                         actual['timestamp'].tolist())
+        self.assertEqual([0.0, 1.0, 2.0, 3.0, 4.0],
+                         actual['stabilizer.roll'].tolist())
+        self.assertEqual([0, -1, -2, -3, -4], actual['pm.state'].tolist())
+        self.assertTrue((np.diff(actual['host_time']) >= 0).all())
+
+    def test_that_packets_are_not_captured_after_stop(self):
+        # Fixture
+        self.cf_mock.log.log_blocks = [self.config]
+        sut = LogCaptureWriter(self.cf_mock, self.filename)
+
+        # Test
+        with sut:
+            self._receive(1, 1, struct.pack('<fb', 1, 1))
+        self._receive(1, 2, struct.pack('<fb', 2, 2))
+        actual = LogCaptureReader(self.filename).read('stab')
+
+        # Assert
+        self.assertEqual([], self.packet_callbacks)
+        self.assertEqual([1], actual['timestamp'].tolist())
+
+    def test_that_capture_can_not_be_started_twice(self):
+        # Fixture
+        sut = LogCaptureWriter(self.cf_mock, self.filename)
+        sut.start()
+        self.addCleanup(sut.stop)
+
+        # Test
+        # Assert
+        with self.assertRaises(Exception):
+            sut.start()
+        self.assertEqual(1, len(self.packet_callbacks))
+
+    def test_that_block_added_during_capture_is_read(self):
+        # Fixture
+        other = self._config(2, 'motors', [('motor.m1', 'uint16_t')])
+
+        # Test
+        with LogCaptureWriter(self.cf_mock, self.filename):
+            self.cf_mock.log.block_added_cb.call(self.config)
+            self._receive(1, 10, struct.pack('<fb', 1.5, 3))
+            self.cf_mock.log.block_added_cb.call(other)
+            self._receive(2, 20, struct.pack('<H', 40000))
+            self._receive(1, 30, struct.pack('<fb', 2.5, 4))
+        sut = LogCaptureReader(self.filename)
+
+        # Assert
+        self.assertEqual(['stab', 'motors'], sut.names)
+        self.assertEqual([(10, 1.5, 3), (30, 2.5, 4)],
+                         [(t, r, s) for t, h, r, s in sut.read('stab')])
+        self.assertEqual([40000], sut.read('motors')['motor.m1'].tolist())
+
+    def test_that_reused_block_id_gets_new_layout(self):
+        # Fixture
+        other = self._config(1, 'motors', [('motor.m1', 'uint16_t')])
+
+        # Test
+        with LogCaptureWriter(self.cf_mock, self.filename):
+            self.cf_mock.log.block_added_cb.call(self.config)
+            self._receive(1, 10, struct.pack('<fb', 1.5, 3))
+            self.cf_mock.log.block_added_cb.call(other)
+            self._receive(1, 20, struct.pack('<H', 40000))
+        sut = LogCaptureReader(self.filename)
+
+        # Assert
+        self.assertEqual([10], sut.read('stab')['timestamp'].tolist())
+        self.assertEqual([20], sut.read('motors')['timestamp'].tolist())
+
+    def test_that_long_layout_is_read(self):
+        # Fixture
+        names = ['group{}.a_long_variable_name'.format(i) for i in range(6)]
+        config = self._config(3, 'long', [(name, 'uint8_t')
+                                          for name in names])
+        self.cf_mock.log.log_blocks = [config]
+
+        # Test
+        with LogCaptureWriter(self.cf_mock, self.filename):
+            self._receive(3, 10, bytearray(range(6)))
+        actual = LogCaptureReader(self.filename).read('long')
+
+        # Assert
+        self.assertEqual(list(range(6)), [actual[name][0] for name in names])
+
+    def test_that_partly_written_record_is_ignored(self):
+        # Fixture
+        self.cf_mock.log.log_blocks = [self.config]
+        with LogCaptureWriter(self.cf_mock, self.filename):
+            self._receive(1, 10, struct.pack('<fb', 1.5, 3))
+            self._receive(1, 20, struct.pack('<fb', 2.5, 4))
+        with open(self.filename, 'r+b') as f:
+            f.truncate(os.path.getsize(self.filename) - RECORD_SIZE // 2)
+
+        # Test
+        actual = LogCaptureReader(self.filename).read('stab')
+
+        # Assert
+        self.assertEqual([10], actual['timestamp'].tolist())
+
+    def test_that_unknown_block_raises_key_error(self):
+        # Fixture
+        with LogCaptureWriter(self.cf_mock, self.filename):
+            pass
+        sut = LogCaptureReader(self.filename)
+
+        # Test
+        # Assert
+        with self.assertRaises(KeyError):
+            sut.read('stab')
+
+    def test_that_other_file_is_not_read(self):
+        # Fixture
+        with open(self.filename, 'wb') as f:
+            f.write(b'\0' * 64)
+
+        # Test
+        # Assert
+        with self.assertRaises(ValueError):
+            LogCaptureReader(self.filename)
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import struct
+import sys
+import unittest
+
+from cflib.crazyflie.log import LogTocElement
+from cflib.crazyflie.logPlanner import fp16_to_float
+from cflib.crazyflie.logPlanner import LogStream
+from cflib.crazyflie.logPlanner import plan_blocks
+from cflib.crazyflie.toc import Toc
+
+if sys.version_info < (3, 3):
+    from mock import MagicMock
+else:
+    from unittest.mock import MagicMock
+
+FLOAT = 0x07
+UINT8 = 0x01
+
+
+class PlanBlocksTest(unittest.TestCase):
+
+    def test_that_variables_are_packed_in_fewest_blocks(self):
+        # Fixture
+        sizes = {'a': 4, 'b': 4, 'c': 4, 'd': 4, 'e': 4, 'f': 4,
+                 'g': 2, 'h': 1, 'i': 1}
+
+        # Test
+        actual = plan_blocks(sizes, block_size=10, max_variables=9)
+
+        # Assert
+        self.assertEqual(3, len(actual))
+        for block in actual:
+            self.assertLessEqual(sum(sizes[name] for name in block), 10)
+        self.assertEqual(sorted(sizes),
+                         sorted(name for block in actual for name in block))
+
+    def test_that_number_of_variables_is_limited(self):
+        # Fixture
+        sizes = dict(('v{}'.format(i), 1) for i in range(10))
+
+        # Test
+        actual = plan_blocks(sizes, block_size=26, max_variables=9)
+
+        # Assert
+        self.assertEqual([9, 1], [len(block) for block in actual])
+
+    def test_that_existing_blocks_are_filled_first(self):
+        # Fixture
+        sizes = {'a': 4, 'b': 2, 'c': 2}
+
+        # Test
+        actual = plan_blocks(sizes, block_size=6, blocks=[['a']])
+
+        # Assert
+        self.assertEqual([['a', 'b'], ['c']], actual)
+
+    def test_that_too_large_variable_raises(self):
+        # Fixture
+        # Test
+        # Assert
+        with self.assertRaises(ValueError):
+            plan_blocks({'a': 4}, block_size=2)
+
+
+class LogStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.toc = Toc()
+        names = ['g.f{}'.format(i) for i in range(10)] + \
+            ['g.u{}'.format(i) for i in range(4)]
+        for ident, name in enumerate(names):
+            metadata = FLOAT if '.f' in name else UINT8
+            data = bytearray([metadata]) + name.replace('.', '\0').encode()
+            self.toc.add_element(LogTocElement(ident, data + b'\0'))
+        self.sut = LogStream('test')
+        self.received = MagicMock()
+        self.sut.data_received_cb.add_callback(self.received)
+
+    def _layout(self):
+        return [(config.period_in_ms,
+                 sorted(var.name for var in config.variables))
+                for config in self.sut.configs]
+
+    def _receive(self, config, timestamp, values):
+        data = bytearray()
+        for var in config.variables:
+            data += struct.pack(LogTocElement.get_unpack_string_from_id(
+                var.fetch_as), values[var.name])
+        config.unpack_log_data(data, timestamp)
+
+    def test_that_variables_are_split_over_blocks(self):
+        # Fixture
+        for i in range(10):
+            self.sut.add_variable('g.f{}'.format(i), 10)
+
+        # Test
+        actual = self.sut.plan(self.toc)
+
+        # Assert
+        self.assertEqual(2, len(actual))
+        self.assertEqual([6, 4], [len(c.variables) for c in actual])
+
+    def test_that_more_variables_fit_a_block_before_protocol_v4(self):
+        # Fixture
+        for i in range(4):
+            self.sut.add_variable('g.u{}'.format(i), 10)
+            self.sut.add_variable('g.f{}'.format(i), 10, fetch_as='int16_t')
+            self.sut.add_variable('g.f{}'.format(i + 4), 10,
+                                  fetch_as='uint8_t')
+
+        # Test
+        v1 = [len(c.variables) for c in self.sut.plan(self.toc, False)]
+        v2 = [len(c.variables) for c in self.sut.plan(self.toc)]
+
+        # Assert
+        self.assertEqual([12], v1)
+        self.assertEqual(2, len(v2))
+
+    def test_that_blocks_are_planned_for_the_protocol_of_the_crazyflie(self):
+        # Fixture
+        for i in range(10):
+            self.sut.add_variable('g.f{}'.format(i), 10, fetch_as='uint8_t')
+        log = MagicMock()
+        log.toc = self.toc
+        log.cf.platform.get_protocol_version.return_value = 3
+
+        # Test
+        self.sut.add(log)
+
+        # Assert
+        self.assertEqual(1, log.add_config.call_count)
+
+    def test_that_variables_with_different_periods_are_in_own_blocks(self):
+        # Fixture
+        for i in range(6):
+            self.sut.add_variable('g.f{}'.format(i), 10)
+        for i in range(6, 10):
+            self.sut.add_variable('g.f{}'.format(i), 100)
+
+        # Test
+        self.sut.plan(self.toc)
+
+        # Assert
+        self.assertEqual([(10, ['g.f{}'.format(i) for i in range(6)]),
+                          (100, ['g.f{}'.format(i) for i in range(6, 10)])],
+                         self._layout())
+
+    def test_that_slower_variables_are_moved_if_it_saves_a_block(self):
+        # Fixture
+        for i in range(5):
+            self.sut.add_variable('g.f{}'.format(i), 10)
+        self.sut.add_variable('g.u0', 100)
+        self.sut.add_variable('g.u1', 100)
+
+        # Test
+        self.sut.plan(self.toc)
+
+        # Assert
+        self.assertEqual([(10, ['g.f0', 'g.f1', 'g.f2', 'g.f3', 'g.f4',
+                                'g.u0', 'g.u1'])], self._layout())
+
+    def test_that_floats_are_narrowed_if_it_saves_a_block(self):
+        # Fixture
+        for i in range(8):
+            self.sut.add_variable('g.f{}'.format(i), 10, allow_fp16=True)
+
+        # Test
+        actual = self.sut.plan(self.toc)
+
+        # Assert
+        self.assertEqual(1, len(actual))
+        self.assertEqual(['FP16'] * 8, [LogTocElement.get_cstring_from_id(
+            var.fetch_as) for var in actual[0].variables])
+
+    def test_that_floats_are_not_narrowed_without_saving_a_block(self):
+        # Fixture
+        for i in range(4):
+            self.sut.add_variable('g.f{}'.format(i), 10, allow_fp16=True)
+
+        # Test
+        actual = self.sut.plan(self.toc)
+
+        # Assert
+        self.assertEqual(['float'] * 4, [LogTocElement.get_cstring_from_id(
+            var.fetch_as) for var in actual[0].variables])
+
+    def test_that_unknown_variable_raises_key_error(self):
+        # Fixture
+        self.sut.add_variable('g.x', 10)
+
+        # Test
+        # Assert
+        with self.assertRaises(KeyError):
+            self.sut.plan(self.toc)
+
+    def test_that_blocks_are_merged_into_one_stream(self):
+        # Fixture
+        values = dict(('g.f{}'.format(i), float(i)) for i in range(10))
+        for name in values:
+            self.sut.add_variable(name, 10)
+        configs = self.sut.plan(self.toc)
+
+        # Test
+        self._receive(configs[0], 100, values)
+        self.received.assert_not_called()
+        self._receive(configs[1], 101, values)
+
+        # Assert
+        self.received.assert_called_once_with(101, values, self.sut)
+
+    def test_that_narrowed_floats_are_converted(self):
+        # Fixture
+        for i in range(8):
+            self.sut.add_variable('g.f{}'.format(i), 10, allow_fp16=True)
+        config = self.sut.plan(self.toc)[0]
+        raw = struct.unpack('<h', struct.pack('<H', 0x3e00))[0]
+
+        # Test
+        self._receive(config, 100, dict(('g.f{}'.format(i), raw)
+                                        for i in range(8)))
+
+        # Assert
+        self.assertEqual(1.5, self.received.call_args[0][1]['g.f7'])
+
+
+class Fp16Test(unittest.TestCase):
+
+    def test_that_half_floats_are_converted(self):
+        # Fixture
+        # Test
+        # Assert
+        self.assertEqual(1.0, fp16_to_float(0x3c00))
+        self.assertEqual(-2.5, fp16_to_float(0xc100))
+        self.assertEqual(-2.5, fp16_to_float(-0x3f00))
+        self.assertEqual(65504.0, fp16_to_float(0x7bff))
+        self.assertEqual(2.0 ** -24, fp16_to_float(0x0001))
+        self.assertEqual(float('inf'), fp16_to_float(0x7c00))
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import struct
+import unittest
+
+from cflib.crazyflie.log import LogConfig
+from cflib.crazyflie.logRecorder import LogRecorder
+from cflib.crazyflie.logRecorder import np
+
+
+@unittest.skipIf(np is None, 'Requires NumPy')
+class LogRecorderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.config = LogConfig('test', 10)
+        self.config.add_variable('stabilizer.roll', 'float')
+        self.config.add_variable('pm.state', 'int8_t')
+
+    def _receive(self, count, start=0):
+        for i in range(start, start + count):
+            self.config.unpack_log_data(
+                bytearray(struct.pack('<fb', i / 2.0, -(i % 100))), 10 * i)
+
+    def test_that_samples_are_recorded_in_columns(self):
+        # Fixture
+        sut = LogRecorder(self.config, 10)
+
+        # Test
+        with sut:
+            self._receive(3)
+
+        # Assert
+        self.assertEqual(3, len(sut))
+        self.assertEqual([0, 10, 20], sut.column('timestamp').tolist())
+        self.assertEqual([0.0, 0.5, 1.0],
+                         sut.column('stabilizer.roll').tolist())
+        self.assertEqual([0, -1, -2], sut.column('pm.state').tolist())
+
+    def test_that_samples_are_not_recorded_when_stopped(self):
+        # Fixture
+        sut = LogRecorder(self.config, 10)
+        with sut:
+            self._receive(2)
+
+        # Test
+        self._receive(2, start=2)
+
+        # Assert
+        self.assertEqual(2, sut.nr_of_samples)
+
+    def test_that_oldest_samples_are_overwritten(self):
+        # Fixture
+        sut = LogRecorder(self.config, 4)
+
+        # Test
+        with sut:
+            self._receive(11)
+
+        # Assert
+        self.assertEqual(4, len(sut))
+        self.assertEqual(7, sut.dropped)
+        self.assertEqual([70, 80, 90, 100], sut.column('timestamp').tolist())
+
+    def test_that_window_has_last_samples(self):
+        # Fixture
+        sut = LogRecorder(self.config, 4)
+
+        # Test
+        with sut:
+            self._receive(6)
+
+        # Assert
+        self.assertEqual([40, 50], sut.column('timestamp', 2).tolist())
+        self.assertEqual([2.0, 2.5], sut.window(2)['stabilizer.roll'].tolist())
+        self.assertEqual(4, len(sut.window(10)))
+
+    def test_that_window_is_a_view(self):
+        # Fixture
+        sut = LogRecorder(self.config, 4)
+        with sut:
+            self._receive(5)
+
+        # Test
+        actual = sut.window()
+
+        # Assert
+        self.assertFalse(actual.flags.owndata)
+        self.assertTrue(np.shares_memory(actual, sut.window(2)))
+
+    def test_that_memory_use_does_not_grow(self):
+        # Fixture
+        sut = LogRecorder(self.config, 100)
+        nbytes = sut.nbytes
+
+        # Test
+        with sut:
+            self._receive(1000)
+
+        # Assert
+        self.assertEqual(nbytes, sut.nbytes)
+        self.assertEqual(2 * 100 * (4 + 4 + 1), nbytes)
+
+    def test_that_tuple_data_is_recorded(self):
+        # Fixture
+        config = LogConfig('test', 10, LogConfig.TUPLE)
+        config.add_variable('motor.m1', 'uint16_t')
+        sut = LogRecorder(config, 10)
+
+        # Test
+        with sut:
+            config.unpack_log_data(bytearray(struct.pack('<H', 40000)), 5)
+
+        # Assert
+        self.assertEqual([(5, 40000)], sut.window().tolist())
+
+    def test_that_clear_removes_samples(self):
+        # Fixture
+        sut = LogRecorder(self.config, 10)
+        with sut:
+            self._receive(3)
+
+        # Test
+        sut.clear()
+
+        # Assert
+        self.assertEqual(0, len(sut))
+        self.assertEqual(0, len(sut.window()))
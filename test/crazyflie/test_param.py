@@ -0,0 +1,492 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import struct
+import sys
+import threading
+import unittest
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError
+
+from cflib.crazyflie import param
+from cflib.crazyflie.param import _ParamUpdater
+from cflib.crazyflie.param import Param
+from cflib.crazyflie.param import ParamTocElement
+from cflib.crazyflie.toc import get_fetch_window
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.crtp.crtpstack import CRTPPort
+
+if sys.version_info < (3, 3):
+    from mock import MagicMock
+else:
+    from unittest.mock import MagicMock
+
+READ_CHANNEL = 1
+WRITE_CHANNEL = 2
+
+
+class ParamUpdaterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cf_mock = MagicMock()
+        self.cf_mock.platform.get_protocol_version.return_value = 4
+        self.cf_mock.rto = 0.05
+        self.requests = []
+        self.timeouts = []
+        self.cf_mock.send_request.side_effect = self._send_request
+        self.updated = []
+        self.sut = _ParamUpdater(self.cf_mock, True, self.updated.append)
+        self.addCleanup(param.set_fetch_window, get_fetch_window())
+        param.set_fetch_window(4)
+
+    def _send_request(self, pk, expected_reply, timeout=None):
+        future = Future()
+        self.requests.append((pk, future))
+        self.timeouts.append(timeout)
+        return future
+
+    def _outstanding(self):
+        return [(pk.channel, struct.unpack('<H', pk.data[:2])[0])
+                for pk, future in self.requests if not future.done()]
+
+    def _answer(self, channel, var_id, value=0):
+        for pk, future in self.requests:
+            if not future.done() and pk.channel == channel and \
+                    struct.unpack('<H', pk.data[:2])[0] == var_id:
+                data = struct.pack('<H', var_id)
+                if channel == READ_CHANNEL:
+                    # Status byte
+                    data += b'\0'
+                data += struct.pack('<B', value)
+                header = CRTPPacket()
+                header.set_header(CRTPPort.PARAM, channel)
+                future.set_result(CRTPPacket(header.header, data))
+                return
+        self.fail('No request for {} on channel {}'.format(var_id, channel))
+
+    def _write(self, var_id, value):
+        pk = CRTPPacket()
+        pk.set_header(CRTPPort.PARAM, WRITE_CHANNEL)
+        pk.data = struct.pack('<HB', var_id, value)
+        self.sut.request_param_setvalue(pk)
+
+    def test_that_window_limits_the_outstanding_requests(self):
+        # Fixture
+        # Test
+        for var_id in range(10):
+            self.sut.request_param_update(var_id)
+
+        # Assert
+        self.assertEqual([(READ_CHANNEL, i) for i in range(4)],
+                         self._outstanding())
+
+    def test_that_request_timeout_follows_round_trip_time(self):
+        # Fixture
+        self.cf_mock.rto = 0.1
+
+        # Test
+        self.sut.request_param_update(1)
+
+        # Assert
+        self.assertEqual([0.4], self.timeouts)
+
+    def test_that_answer_sends_next_request(self):
+        # Fixture
+        for var_id in range(10):
+            self.sut.request_param_update(var_id)
+
+        # Test
+        self._answer(READ_CHANNEL, 2)
+
+        # Assert
+        self.assertEqual([(READ_CHANNEL, i) for i in (0, 1, 3, 4)],
+                         self._outstanding())
+
+    def test_that_status_byte_is_removed_from_read_answer(self):
+        # Fixture
+        self.sut.request_param_update(3)
+
+        # Test
+        self._answer(READ_CHANNEL, 3, value=42)
+
+        # Assert
+        self.assertEqual(1, len(self.updated))
+        self.assertEqual(bytearray(struct.pack('<HB', 3, 42)),
+                         self.updated[0].data)
+
+    def test_that_requests_with_same_answer_are_not_outstanding_together(
+            self):
+        # Fixture
+        # Test
+        self._write(5, 1)
+        self._write(5, 2)
+
+        # Assert
+        self.assertEqual([(WRITE_CHANNEL, 5)], self._outstanding())
+        self._answer(WRITE_CHANNEL, 5, value=1)
+        self.assertEqual([(WRITE_CHANNEL, 5)], self._outstanding())
+        self.assertEqual(2, self.requests[-1][0].data[2])
+
+    def test_that_read_and_write_of_same_param_are_outstanding_together(
+            self):
+        # Fixture
+        # Test
+        self._write(5, 1)
+        self.sut.request_param_update(5)
+
+        # Assert
+        self.assertEqual([(WRITE_CHANNEL, 5), (READ_CHANNEL, 5)],
+                         self._outstanding())
+
+    def test_that_unanswered_request_is_sent_again(self):
+        # Fixture
+        self.sut.request_param_update(3)
+
+        # Test
+        self.requests[0][1].set_exception(TimeoutError())
+
+        # Assert
+        self.assertEqual([(READ_CHANNEL, 3)], self._outstanding())
+        self.assertIs(self.requests[0][0], self.requests[1][0])
+
+    def test_that_queue_is_dropped_when_link_is_closed(self):
+        # Fixture
+        for var_id in range(10):
+            self.sut.request_param_update(var_id)
+
+        # Test
+        self.requests[0][1].set_exception(IOError('Link closed'))
+
+        # Assert
+        self.assertEqual(4, len(self.requests))
+        self.assertEqual(0, len(self.sut._request_queue))
+
+    def test_that_all_requests_are_answered(self):
+        # Fixture
+        for var_id in range(20):
+            self.sut.request_param_update(var_id)
+
+        # Test
+        while self._outstanding():
+            self._answer(*self._outstanding()[-1])
+
+        # Assert
+        self.assertEqual(set(range(20)),
+                         set(pk.data[0] for pk in self.updated))
+
+
+class ParamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cf_mock = MagicMock()
+        self.cf_mock.platform.get_protocol_version.return_value = 4
+        self.requests = []
+        # Values to acknowledge writes with right away, by param id
+        self.acks = {}
+        self.cf_mock.send_request.side_effect = self._send_request
+        self.sut = Param(self.cf_mock, lazy=True)
+        self.sut._useV2 = True
+        for ident, (name, metadata) in enumerate((('pid.kp', 0x08),
+                                                  ('pid.ki', 0x08),
+                                                  ('att.rate', 0x06))):
+            data = bytearray([metadata]) + name.replace('.', '\0').encode()
+            self.sut.toc.add_element(ParamTocElement(ident, data + b'\0'))
+
+    def _send_request(self, pk, expected_reply, timeout=None):
+        future = Future()
+        self.requests.append((pk, future))
+        var_id = struct.unpack('<H', pk.data[:2])[0]
+        if pk.channel == WRITE_CHANNEL and var_id in self.acks:
+            self._answer(len(self.requests) - 1, self.acks[var_id])
+        return future
+
+    def _answer(self, index, value):
+        pk, future = self.requests[index]
+        data = pk.data[:2]
+        if pk.channel == READ_CHANNEL:
+            # Status byte
+            data += b'\0'
+        var_id = struct.unpack('<H', pk.data[:2])[0]
+        data += self.sut.toc.get_element_by_id(var_id).codec.pack(value)
+        future.set_result(CRTPPacket(pk.header, data))
+
+    def test_that_value_is_fetched_on_first_access(self):
+        # Fixture
+        future = self.sut.get_value_async('pid.ki')
+
+        # Test
+        self._answer(0, 7)
+
+        # Assert
+        self.assertEqual(1, len(self.requests))
+        self.assertEqual(READ_CHANNEL, self.requests[0][0].channel)
+        self.assertEqual(7, future.result(0))
+
+    def test_that_waiting_for_value_in_callback_raises(self):
+        # Fixture
+        self.cf_mock.incoming = threading.current_thread()
+
+        # Test
+        # Assert
+        with self.assertRaises(RuntimeError):
+            self.sut.get_value('pid.kp', timeout=1)
+
+    def test_that_cached_value_is_read_in_callback(self):
+        # Fixture
+        self.sut.get_value_async('pid.kp')
+        self._answer(0, 3)
+        self.cf_mock.incoming = threading.current_thread()
+
+        # Test
+        actual = self.sut.get_value('pid.kp')
+
+        # Assert
+        self.assertEqual(3, actual)
+
+    def test_that_waiting_for_writes_in_callback_raises(self):
+        # Fixture
+        self.cf_mock.incoming = threading.current_thread()
+
+        # Test
+        # Assert
+        with self.assertRaises(RuntimeError):
+            self.sut.set_values({'pid.kp': 2}, timeout=1)
+        self.assertEqual([], self.requests)
+
+    def test_that_cached_value_is_not_fetched_again(self):
+        # Fixture
+        self.sut.get_value_async('pid.kp')
+        self._answer(0, 3)
+
+        # Test
+        actual = self.sut.get_value('pid.kp', timeout=0)
+
+        # Assert
+        self.assertEqual(3, actual)
+        self.assertEqual(1, len(self.requests))
+
+    def test_that_concurrent_accesses_share_one_request(self):
+        # Fixture
+        first = self.sut.get_value_async('pid.kp')
+        second = self.sut.get_value_async('pid.kp')
+
+        # Test
+        self._answer(0, 5)
+
+        # Assert
+        self.assertEqual(1, len(self.requests))
+        self.assertEqual(5, first.result(0))
+        self.assertEqual(5, second.result(0))
+
+    def test_that_write_ack_updates_cached_value(self):
+        # Fixture
+        self.sut.set_value('pid.ki', '9')
+
+        # Test
+        self._answer(0, 9)
+
+        # Assert
+        self.assertEqual(WRITE_CHANNEL, self.requests[0][0].channel)
+        self.assertEqual(9, self.sut.get_value('pid.ki', timeout=0))
+        self.assertEqual(1, len(self.requests))
+
+    def test_that_waiting_access_fails_on_disconnect(self):
+        # Fixture
+        future = self.sut.get_value_async('pid.kp')
+
+        # Test
+        self.sut._disconnected('udp://127.0.0.1')
+
+        # Assert
+        self.assertIsInstance(future.exception(0), IOError)
+
+    def test_that_unknown_param_raises_key_error(self):
+        # Fixture
+        # Test
+        # Assert
+        with self.assertRaises(KeyError):
+            self.sut.get_value_async('pid.kd')
+
+    def test_that_float_value_is_native(self):
+        # Fixture
+        future = self.sut.get_value_async('att.rate')
+
+        # Test
+        self._answer(0, 1.5)
+
+        # Assert
+        self.assertEqual(1.5, future.result(0))
+        self.assertEqual({'att': {'rate': '1.5'}}, self.sut.values)
+
+    def test_that_native_value_is_written(self):
+        # Fixture
+        # Test
+        self.sut.set_value('att.rate', 0.25)
+
+        # Assert
+        self.assertEqual(struct.pack('<Hf', 2, 0.25),
+                         self.requests[0][0].data)
+
+    def test_that_string_value_is_parsed(self):
+        # Fixture
+        # Test
+        self.sut.set_value('pid.kp', '0x10')
+        self.sut.set_value('att.rate', '2.5')
+
+        # Assert
+        self.assertEqual(struct.pack('<HB', 0, 16), self.requests[0][0].data)
+        self.assertEqual(struct.pack('<Hf', 2, 2.5),
+                         self.requests[1][0].data)
+
+    def test_that_boolean_string_is_parsed(self):
+        # Fixture
+        # Test
+        self.sut.set_value('pid.kp', 'True')
+        self.sut.set_value('att.rate', 'False')
+
+        # Assert
+        self.assertEqual(struct.pack('<HB', 0, 1), self.requests[0][0].data)
+        self.assertEqual(struct.pack('<Hf', 2, 0.0),
+                         self.requests[1][0].data)
+
+    def test_that_unicode_string_is_parsed(self):
+        # Fixture
+        # Test
+        self.sut.set_value('pid.kp', u'0x10')
+
+        # Assert
+        self.assertEqual(struct.pack('<HB', 0, 16), self.requests[0][0].data)
+
+    def test_that_string_value_is_not_evaluated(self):
+        # Fixture
+        # Test
+        # Assert
+        with self.assertRaises(ValueError):
+            self.sut.set_value('pid.kp', '2 + 3')
+        self.assertEqual([], self.requests)
+
+    def test_that_all_updated_is_called_when_all_values_are_fetched(self):
+        # Fixture
+        all_updated = MagicMock()
+        self.sut.all_updated.add_callback(all_updated)
+        self.sut.request_update_of_all_params()
+
+        # Test
+        self._answer(0, 1)
+        self._answer(1, 2)
+        self.sut.request_param_update('pid.ki')
+        self._answer(3, 2)
+        all_updated.assert_not_called()
+        self._answer(2, 0.5)
+
+        # Assert
+        all_updated.assert_called_once_with()
+
+    def test_that_write_future_gets_acknowledged_value(self):
+        # Fixture
+        future = self.sut.set_value_async('pid.kp', 4)
+
+        # Test
+        self._answer(0, 4)
+
+        # Assert
+        self.assertEqual(4, future.result(0))
+
+    def test_that_batch_writes_are_sent_together(self):
+        # Fixture
+        values = {'pid.kp': 1, 'pid.ki': 2, 'att.rate': 0.5}
+
+        # Test
+        failed = self.sut.set_values(values, timeout=0)
+
+        # Assert
+        self.assertEqual(3, len(self.requests))
+        self.assertEqual(sorted(values), sorted(failed))
+
+    def test_that_acknowledged_batch_has_no_failures(self):
+        # Fixture
+        self.acks = {0: 1, 1: 2, 2: 0.1}
+
+        # Test
+        failed = self.sut.set_values(
+            {'pid.kp': 1, 'pid.ki': '2', 'att.rate': 0.1}, timeout=1)
+
+        # Assert
+        self.assertEqual([], failed)
+        self.assertEqual(2, self.sut.get_value('pid.ki', timeout=0))
+
+    def test_that_unchanged_values_are_not_written(self):
+        # Fixture
+        self.acks = {0: 1, 1: 2}
+        self.sut.set_values({'pid.kp': 1, 'pid.ki': 2})
+
+        # Test
+        failed = self.sut.set_values({'pid.kp': 1, 'pid.ki': 3}, timeout=0)
+
+        # Assert
+        self.assertEqual(['pid.ki'], failed)
+        self.assertEqual(3, len(self.requests))
+        self.assertEqual(struct.pack('<HB', 1, 3), self.requests[2][0].data)
+
+    def test_that_unchanged_values_are_written_if_not_skipped(self):
+        # Fixture
+        self.acks = {0: 1}
+        self.sut.set_values({'pid.kp': 1})
+
+        # Test
+        failed = self.sut.set_values({'pid.kp': 1}, skip_unchanged=False)
+
+        # Assert
+        self.assertEqual([], failed)
+        self.assertEqual(2, len(self.requests))
+
+    def test_that_different_acknowledged_value_is_reported(self):
+        # Fixture
+        self.acks = {0: 1, 1: 5}
+
+        # Test
+        failed = self.sut.set_values({'pid.kp': 1, 'pid.ki': 2})
+
+        # Assert
+        self.assertEqual(['pid.ki'], failed)
+
+    def test_that_batch_is_checked_before_writing(self):
+        # Fixture
+        # Test
+        with self.assertRaises(KeyError):
+            self.sut.set_values({'pid.kp': 1, 'pid.kd': 2})
+
+        # Assert
+        self.assertEqual([], self.requests)
+
+    def test_that_waiting_write_fails_on_disconnect(self):
+        # Fixture
+        future = self.sut.set_value_async('pid.kp', 1)
+
+        # Test
+        self.sut._disconnected('udp://127.0.0.1')
+
+        # Assert
+        self.assertIsInstance(future.exception(0), IOError)
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import time
+import unittest
+from threading import Event
+from threading import Thread
+
+from cflib.crazyflie.retransmission import get_scheduler
+from cflib.crazyflie.retransmission import RetransmissionScheduler
+from cflib.crazyflie.retransmission import RttEstimator
+
+
+class RetransmissionSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = RetransmissionScheduler()
+        self.sut.start()
+
+    def test_that_callback_is_called_after_timeout(self):
+        # Fixture
+        called = Event()
+        start = time.time()
+
+        # Test
+        self.sut.schedule(0.05, called.set)
+
+        # Assert
+        self.assertTrue(called.wait(1))
+        self.assertGreaterEqual(time.time() - start, 0.04)
+        self.assertEqual(1, self.sut.nr_of_timeouts)
+        self.assertEqual(0, self.sut.nr_of_resends)
+
+    def test_that_callbacks_are_called_in_deadline_order(self):
+        # Fixture
+        order = []
+        done = Event()
+
+        # Test
+        self.sut.schedule(0.1, lambda: order.append(2) or done.set())
+        self.sut.schedule(0.02, order.append, 1)
+
+        # Assert
+        self.assertTrue(done.wait(1))
+        self.assertEqual([1, 2], order)
+
+    def test_that_cancelled_callback_is_not_called(self):
+        # Fixture
+        called = Event()
+        done = Event()
+        entry = self.sut.schedule(0.02, called.set)
+
+        # Test
+        entry.cancel()
+
+        # Assert
+        self.sut.schedule(0.05, done.set)
+        self.assertTrue(done.wait(1))
+        self.assertFalse(called.is_set())
+        self.assertEqual(0, len(self.sut))
+
+    def test_that_resends_are_counted(self):
+        # Fixture
+        done = Event()
+
+        # Test
+        self.sut.schedule(0.01, lambda: True)
+        self.sut.schedule(0.02, lambda: done.set() or True)
+
+        # Assert
+        self.assertTrue(done.wait(1))
+        self.assertEqual(2, self.sut.nr_of_resends)
+        self.assertEqual(2, self.sut.nr_of_timeouts)
+
+    def test_that_many_cancelled_entries_are_removed(self):
+        # Fixture
+        entries = [self.sut.schedule(10, lambda: None) for _ in range(200)]
+
+        # Test
+        for entry in entries[:150]:
+            entry.cancel()
+
+        # Assert
+        self.assertEqual(50, len(self.sut))
+        self.assertLess(len(self.sut._heap), 200)
+
+    def test_that_cancel_waits_for_expiring_entry(self):
+        # Fixture
+        sut = RetransmissionScheduler()
+        entry = sut.schedule(0, lambda: None)
+        canceller = Thread(target=entry.cancel)
+
+        # Test
+        with sut._condition:
+            canceller.start()
+            canceller.join(0.05)
+            self.assertTrue(canceller.is_alive())
+            _, callback, args = sut._pop_expired()
+        canceller.join(1)
+
+        # Assert
+        self.assertIsNotNone(callback)
+        self.assertEqual(0, len(sut))
+        self.assertEqual(0, sut._nr_of_cancelled)
+
+    def test_that_periodic_callback_is_called_until_cancelled(self):
+        # Fixture
+        calls = []
+        done = Event()
+
+        def callback():
+            calls.append(time.time())
+            if len(calls) == 3:
+                done.set()
+
+        # Test
+        entry = self.sut.schedule_periodic(0.02, callback)
+        self.assertTrue(done.wait(1))
+        entry.cancel()
+        nr_of_calls = len(calls)
+        time.sleep(0.06)
+
+        # Assert
+        self.assertEqual(nr_of_calls, len(calls))
+        self.assertEqual(0, len(self.sut))
+        self.assertEqual(0, self.sut.nr_of_timeouts)
+
+    def test_that_periodic_callback_returning_false_is_stopped(self):
+        # Fixture
+        calls = []
+        done = Event()
+
+        # Test
+        self.sut.schedule_periodic(0.01, lambda: calls.append(1) or False)
+        self.sut.schedule(0.1, done.set)
+
+        # Assert
+        self.assertTrue(done.wait(1))
+        self.assertEqual([1], calls)
+        self.assertEqual(0, len(self.sut))
+
+    def test_that_exception_in_callback_does_not_stop_scheduler(self):
+        # Fixture
+        done = Event()
+
+        def fail():
+            raise Exception('Test')
+
+        # Test
+        self.sut.schedule(0.01, fail)
+        self.sut.schedule(0.02, done.set)
+
+        # Assert
+        self.assertTrue(done.wait(1))
+
+    def test_that_the_scheduler_is_shared(self):
+        # Fixture
+        # Test
+        actual = get_scheduler()
+
+        # Assert
+        self.assertIs(actual, get_scheduler())
+        self.assertTrue(actual.is_alive())
+
+
+class RttEstimatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = RttEstimator(initial_rto=0.2, min_rto=0.01, max_rto=1.0)
+
+    def test_that_initial_timeout_is_used_without_samples(self):
+        # Fixture
+        # Test
+        actual = self.sut.rto
+
+        # Assert
+        self.assertEqual(0.2, actual)
+
+    def test_that_first_sample_sets_the_timeout(self):
+        # Fixture
+        # Test
+        self.sut.add_sample(0.01)
+
+        # Assert
+        self.assertAlmostEqual(0.01, self.sut.srtt)
+        self.assertAlmostEqual(0.005, self.sut.rttvar)
+        self.assertAlmostEqual(0.03, self.sut.rto)
+
+    def test_that_stable_round_trip_time_gives_short_timeout(self):
+        # Fixture
+        # Test
+        for _ in range(50):
+            self.sut.add_sample(0.004)
+
+        # Assert
+        self.assertAlmostEqual(0.004, self.sut.srtt, places=4)
+        self.assertAlmostEqual(0.01, self.sut.rto)
+
+    def test_that_varying_round_trip_time_gives_longer_timeout(self):
+        # Fixture
+        # Test
+        for i in range(50):
+            self.sut.add_sample(0.01 if i % 2 else 0.05)
+
+        # Assert
+        self.assertGreater(self.sut.rto, 0.1)
+
+    def test_that_timeout_is_limited(self):
+        # Fixture
+        # Test
+        self.sut.add_sample(5)
+
+        # Assert
+        self.assertEqual(1.0, self.sut.rto)
+
+    def test_that_backoff_doubles_the_timeout(self):
+        # Fixture
+        self.sut.add_sample(0.01)
+
+        # Test
+        self.sut.backoff(0)
+
+        # Assert
+        self.assertAlmostEqual(0.06, self.sut.rto)
+
+    def test_that_burst_of_timeouts_backs_off_once(self):
+        # Fixture
+        sent_time = 0
+
+        # Test
+        self.sut.backoff(sent_time)
+        self.sut.backoff(sent_time)
+        self.sut.backoff(sent_time)
+
+        # Assert
+        self.assertAlmostEqual(0.4, self.sut.rto)
+
+    def test_that_backoff_uses_the_clock_of_the_caller(self):
+        # Fixture
+        self.sut.backoff(10.0, 10.0)
+
+        # Test
+        self.sut.backoff(9.0, 11.0)
+        self.sut.backoff(10.5, 12.0)
+
+        # Assert
+        self.assertAlmostEqual(0.8, self.sut.rto)
+
+    def test_that_sample_resets_the_backoff(self):
+        # Fixture
+        self.sut.backoff(0)
+        self.sut.backoff(0)
+
+        # Test
+        self.sut.add_sample(0.01)
+
+        # Assert
+        self.assertAlmostEqual(0.03, self.sut.rto)
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import struct
+import sys
+import unittest
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError
+
+from cflib.crazyflie.log import LogTocElement
+from cflib.crazyflie.toc import Toc
+from cflib.crazyflie.toc import TocFetcher
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.crtp.crtpstack import CRTPPort
+
+if sys.version_info < (3, 3):
+    from mock import MagicMock
+else:
+    from unittest.mock import MagicMock
+
+CMD_TOC_ITEM_V2 = 2
+CMD_TOC_INFO_V2 = 3
+
+
+def _element(ident, complete_name):
+    data = bytearray([0x07]) + complete_name.replace('.', '\0').encode()
+    return LogTocElement(ident, data + b'\0')
+
+
+class TocTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = Toc()
+        for ident, name in enumerate(['pm.vbat', 'stabilizer.roll',
+                                      'stabilizer.pitch', 'stateEstimate.x',
+                                      'pid_rate.roll_kp']):
+            self.sut.add_element(_element(ident, name))
+
+    def _names(self, elements):
+        return ['%s.%s' % (e.group, e.name) for e in elements]
+
+    def test_that_element_is_found_by_id(self):
+        # Fixture
+        # Test
+        actual = self.sut.get_element_by_id(2)
+
+        # Assert
+        self.assertEqual(('stabilizer', 'pitch'), (actual.group, actual.name))
+        self.assertIsNone(self.sut.get_element_by_id(5))
+
+    def test_that_element_is_found_by_complete_name(self):
+        # Fixture
+        # Test
+        actual = self.sut.get_element_by_complete_name('stateEstimate.x')
+
+        # Assert
+        self.assertEqual(3, actual.ident)
+        self.assertEqual(1, self.sut.get_element_id('stabilizer.roll'))
+        self.assertIsNone(self.sut.get_element_by_complete_name('pm.x'))
+        self.assertIsNone(self.sut.get_element_id('pm.x'))
+
+    def test_that_assigned_toc_is_indexed(self):
+        # Fixture
+        sut = Toc()
+
+        # Test
+        sut.toc = self.sut.toc
+
+        # Assert
+        self.assertEqual(5, len(sut))
+        self.assertEqual(4, sut.get_element_id('pid_rate.roll_kp'))
+        self.assertEqual('vbat', sut.get_element_by_id(0).name)
+
+    def test_that_elements_are_iterated_in_ident_order(self):
+        # Fixture
+        sut = Toc()
+        for ident in (2, 0, 1):
+            sut.add_element(_element(ident, 'g.v{}'.format(ident)))
+
+        # Test
+        actual = [element.ident for element in sut]
+
+        # Assert
+        self.assertEqual([0, 1, 2], actual)
+
+    def test_that_clear_removes_index(self):
+        # Fixture
+        # Test
+        self.sut.clear()
+
+        # Assert
+        self.assertEqual(0, len(self.sut))
+        self.assertIsNone(self.sut.get_element_by_id(0))
+
+    def test_that_elements_are_found_by_prefix(self):
+        # Fixture
+        # Test
+        actual = self.sut.get_elements_by_prefix('stab')
+
+        # Assert
+        self.assertEqual(['stabilizer.pitch', 'stabilizer.roll'],
+                         self._names(actual))
+
+    def test_that_elements_are_found_by_glob(self):
+        # Fixture
+        # Test
+        actual = self.sut.find_elements('*.roll*')
+
+        # Assert
+        self.assertEqual(['pid_rate.roll_kp', 'stabilizer.roll'],
+                         self._names(actual))
+        self.assertEqual(['stateEstimate.x'],
+                         self._names(self.sut.find_elements('state?st*.?')))
+
+    def test_that_added_element_is_found_by_prefix(self):
+        # Fixture
+        self.sut.get_elements_by_prefix('pm.')
+
+        # Test
+        self.sut.add_element(_element(5, 'pm.state'))
+
+        # Assert
+        self.assertEqual(['pm.state', 'pm.vbat'],
+                         self._names(self.sut.get_elements_by_prefix('pm.')))
+
+
+class TocFetcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cf_mock = MagicMock()
+        self.cf_mock.platform.get_protocol_version.return_value = 4
+        self.cf_mock.rto = 0.05
+        self.requests = []
+        self.timeouts = []
+        self.cf_mock.send_request.side_effect = self._send_request
+        self.toc_cache_mock = MagicMock()
+        self.toc_cache_mock.fetch.return_value = None
+        self.finished = MagicMock()
+        self.toc = Toc()
+
+    def _send_request(self, pk, expected_reply, timeout=None):
+        future = Future()
+        self.requests.append((tuple(pk.data), future))
+        self.timeouts.append(timeout)
+        return future
+
+    def _fetcher(self, window):
+        return TocFetcher(self.cf_mock, LogTocElement, CRTPPort.LOGGING,
+                          self.toc, self.finished, self.toc_cache_mock,
+                          window=window)
+
+    def _answer_info(self, nbr_of_items):
+        data, future = self.requests.pop(0)
+        self.assertEqual((CMD_TOC_INFO_V2,), data)
+        future.set_result(CRTPPacket(
+            0x50, struct.pack('<BHI', CMD_TOC_INFO_V2, nbr_of_items, 0x1234)))
+
+    def _requested_indexes(self):
+        return [struct.unpack('<H', bytearray(data[1:3]))[0]
+                for data, future in self.requests if not future.done()]
+
+    def _answer(self, index):
+        for data, future in self.requests:
+            if not future.done() and data[1:3] == (index & 0xff, index >> 8):
+                payload = struct.pack('<BHB', CMD_TOC_ITEM_V2, index, 0x07)
+                payload += 'g\0v{}\0'.format(index).encode()
+                future.set_result(CRTPPacket(0x50, payload))
+                return
+        self.fail('Index {} not requested'.format(index))
+
+    def test_that_element_timeout_follows_round_trip_time(self):
+        # Fixture
+        sut = self._fetcher(window=4)
+
+        # Test
+        sut.start()
+        self._answer_info(10)
+
+        # Assert
+        self.assertEqual([0.2] * 4, self.timeouts[1:])
+
+    def test_that_window_limits_the_outstanding_requests(self):
+        # Fixture
+        sut = self._fetcher(window=4)
+
+        # Test
+        sut.start()
+        self._answer_info(10)
+
+        # Assert
+        self.assertEqual([0, 1, 2, 3], self._requested_indexes())
+
+    def test_that_answer_requests_next_element(self):
+        # Fixture
+        sut = self._fetcher(window=4)
+        sut.start()
+        self._answer_info(10)
+
+        # Test
+        self._answer(0)
+
+        # Assert
+        self.assertEqual([1, 2, 3, 4], self._requested_indexes())
+
+    def test_that_elements_are_added_in_ident_order(self):
+        # Fixture
+        sut = self._fetcher(window=3)
+        sut.start()
+        self._answer_info(3)
+        added = []
+        self.toc.add_element = lambda element: added.append(element.ident)
+
+        # Test
+        self._answer(2)
+        self._answer(0)
+        self._answer(1)
+
+        # Assert
+        self.assertEqual([0, 1, 2], added)
+        self.finished.assert_called_once_with()
+        self.toc_cache_mock.insert.assert_called_once_with(0x1234,
+                                                           self.toc.toc)
+
+    def test_that_lost_answers_are_requested_again(self):
+        # Fixture
+        sut = self._fetcher(window=3)
+        sut.start()
+        self._answer_info(3)
+
+        # Test
+        self._answer(1)
+
+        # Assert
+        self.assertEqual([0, 2, 0], self._requested_indexes())
+
+    def test_that_timed_out_element_is_requested_again(self):
+        # Fixture
+        sut = self._fetcher(window=2)
+        sut.start()
+        self._answer_info(2)
+        self._answer(0)
+
+        # Test
+        self.requests[1][1].set_exception(TimeoutError())
+
+        # Assert
+        self.assertEqual([1], self._requested_indexes())
+        self._answer(1)
+        self.finished.assert_called_once_with()
+
+    def test_that_element_requested_again_is_not_sent_on_old_timeout(self):
+        # Fixture
+        sut = self._fetcher(window=3)
+        sut.start()
+        self._answer_info(3)
+        self._answer(1)
+
+        # Test
+        self.requests[0][1].set_exception(TimeoutError())
+
+        # Assert
+        self.assertEqual([2, 0], self._requested_indexes())
+
+    def test_that_all_elements_are_fetched(self):
+        # Fixture
+        sut = self._fetcher(window=8)
+        sut.start()
+        self._answer_info(20)
+
+        # Test
+        while self._requested_indexes():
+            self._answer(self._requested_indexes()[-1])
+
+        # Assert
+        self.finished.assert_called_once_with()
+        self.assertEqual(20, len(self.toc.toc['g']))
+        self.assertEqual(19, self.toc.get_element_id('g.v19'))
+
+    def test_that_empty_toc_is_finished(self):
+        # Fixture
+        sut = self._fetcher(window=8)
+        sut.start()
+
+        # Test
+        self._answer_info(0)
+
+        # Assert
+        self.finished.assert_called_once_with()
+        self.assertEqual([], self._requested_indexes())
+
+    def test_that_fetch_stops_when_link_is_closed(self):
+        # Fixture
+        sut = self._fetcher(window=2)
+        sut.start()
+        self._answer_info(4)
+
+        # Test
+        for data, future in self.requests:
+            future.set_exception(IOError('Link closed'))
+
+        # Assert
+        self.finished.assert_not_called()
+        self.assertEqual(2, len(self.requests))
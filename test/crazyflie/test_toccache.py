@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from cflib.crazyflie.log import LogTocElement
+from cflib.crazyflie.param import ParamTocElement
+from cflib.crazyflie.toc import Toc
+from cflib.crazyflie.toccache import TocCache
+
+
+class TocCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def _toc(self, element_class, metadata):
+        toc = Toc()
+        for ident, name in enumerate(['pid.kp', 'pid.ki', 'pm.vbat']):
+            data = bytearray([metadata]) + name.replace('.', '\0').encode()
+            toc.add_element(element_class(ident, data + b'\0'))
+        return toc.toc
+
+    def _assert_same(self, expected, actual):
+        self.assertEqual(sorted(expected), sorted(actual))
+        for group in expected:
+            self.assertEqual(sorted(expected[group]), sorted(actual[group]))
+            for name, element in expected[group].items():
+                other = actual[group][name]
+                self.assertIs(type(element), type(other))
+                for attr in ('ident', 'group', 'name', 'ctype', 'pytype',
+                             'access'):
+                    self.assertEqual(getattr(element, attr),
+                                     getattr(other, attr))
+
+    def test_that_inserted_toc_is_fetched(self):
+        # Fixture
+        log_toc = self._toc(LogTocElement, 0x07)
+        param_toc = self._toc(ParamTocElement, 0x46)
+        TocCache(rw_cache=self.dir).insert(0x1234, log_toc)
+        TocCache(rw_cache=self.dir).insert(0xABCD, param_toc)
+
+        # Test
+        sut = TocCache(rw_cache=self.dir)
+
+        # Assert
+        self._assert_same(log_toc, sut.fetch(0x1234))
+        self._assert_same(param_toc, sut.fetch(0xABCD))
+        self.assertIsNone(sut.fetch(0x5678))
+
+    def test_that_toc_is_saved_in_one_file(self):
+        # Fixture
+        sut = TocCache(rw_cache=self.dir)
+
+        # Test
+        sut.insert(0x1234, self._toc(LogTocElement, 0x07))
+
+        # Assert
+        self.assertEqual(['00001234.toc'], os.listdir(self.dir))
+
+    def test_that_toc_saved_by_other_cache_is_fetched(self):
+        # Fixture
+        sut = TocCache(rw_cache=self.dir)
+        toc = self._toc(ParamTocElement, 0x08)
+
+        # Test
+        TocCache(rw_cache=self.dir).insert(0x1234, toc)
+
+        # Assert
+        self._assert_same(toc, sut.fetch(0x1234))
+
+    def test_that_json_cache_is_fetched(self):
+        # Fixture
+        element = {'__class__': 'ParamTocElement', 'ident': 3,
+                   'group': 'pid', 'name': 'kd', 'ctype': 'float',
+                   'pytype': '<f', 'access': 0}
+        with open(os.path.join(self.dir, '00001234.json'), 'w') as f:
+            json.dump({'pid': {'kd': element}}, f)
+
+        # Test
+        actual = TocCache(ro_cache=self.dir).fetch(0x1234)
+
+        # Assert
+        self.assertIsInstance(actual['pid']['kd'], ParamTocElement)
+        self.assertEqual(3, actual['pid']['kd'].ident)
+        self.assertEqual('<f', actual['pid']['kd'].pytype)
+
+    def test_that_binary_cache_is_preferred_over_json(self):
+        # Fixture
+        with open(os.path.join(self.dir, '00001234.json'), 'w') as f:
+            f.write('{}')
+        toc = self._toc(LogTocElement, 0x07)
+        TocCache(rw_cache=self.dir).insert(0x1234, toc)
+
+        # Test
+        actual = TocCache(rw_cache=self.dir).fetch(0x1234)
+
+        # Assert
+        self._assert_same(toc, actual)
+
+    def test_that_broken_cache_file_is_not_fetched(self):
+        # Fixture
+        with open(os.path.join(self.dir, '00001234.toc'), 'wb') as f:
+            f.write(b'CFTC\x01')
+
+        # Test
+        actual = TocCache(rw_cache=self.dir).fetch(0x1234)
+
+        # Assert
+        self.assertIsNone(actual)
+
+    def test_that_nothing_is_saved_without_rw_cache(self):
+        # Fixture
+        sut = TocCache(ro_cache=self.dir)
+
+        # Test
+        sut.insert(0x1234, self._toc(LogTocElement, 0x07))
+
+        # Assert
+        self.assertEqual([], os.listdir(self.dir))
+
+    def test_that_empty_toc_is_fetched(self):
+        # Fixture
+        TocCache(rw_cache=self.dir).insert(0x1234, {})
+
+        # Test
+        actual = TocCache(rw_cache=self.dir).fetch(0x1234)
+
+        # Assert
+        self.assertEqual({}, actual)
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import socket
+import sys
+import time
+import unittest
+
+from cflib.crtp.crtpstack import CRTPPacket
+
+if sys.version_info >= (3, 5):
+    import asyncio
+    from cflib.crtp.aioudpdriver import AioUdpDriver
+    from cflib.crtp.aioudpdriver import open_endpoint
+
+
+def _datagram(header, data):
+    raw = bytearray((header,)) + bytearray(data)
+    return bytes(raw + bytearray((sum(raw) % 256,)))
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'Requires Python 3.5')
+class AioUdpDriverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.endpoint = self.loop.run_until_complete(
+            open_endpoint(loop=self.loop))
+        self.local_addr = ('127.0.0.1',
+                           self.endpoint.transport.get_extra_info(
+                               'sockname')[1])
+
+        self.drones = []
+        for _ in range(2):
+            drone = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            drone.bind(('127.0.0.1', 0))
+            drone.settimeout(1)
+            self.drones.append(drone)
+
+        self.received = []
+        self.links = []
+
+    def tearDown(self):
+        for link in self.links:
+            link.close()
+        self.endpoint.close()
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.loop.close()
+        for drone in self.drones:
+            drone.close()
+
+    def _connect(self, drone):
+        link = AioUdpDriver(self.endpoint, self.received.append)
+        link.connect('udp://127.0.0.1:{}'.format(drone.getsockname()[1]),
+                     None, None)
+        self.links.append(link)
+        return link
+
+    def _run_until(self, condition):
+        deadline = time.time() + 1
+        while not condition() and time.time() < deadline:
+            self.loop.run_until_complete(asyncio.sleep(0.01))
+
+    def test_that_hello_is_sent_on_connect(self):
+        # Fixture
+        drone = self.drones[0]
+
+        # Test
+        self._connect(drone)
+        self.loop.run_until_complete(asyncio.sleep(0))
+
+        # Assert
+        data, addr = drone.recvfrom(1024)
+        self.assertEqual(b'\xFF\x01\x01\x01', data)
+        self.assertEqual(self.local_addr[1], addr[1])
+
+    def test_that_receive_packet_returns_none(self):
+        # Fixture
+        link = self._connect(self.drones[0])
+
+        # Test
+        actual = link.receive_packet(0.01)
+
+        # Assert
+        self.assertTrue(link.pushes_packets)
+        self.assertIsNone(actual)
+
+    def test_that_packet_is_sent_with_checksum(self):
+        # Fixture
+        drone = self.drones[0]
+        link = self._connect(drone)
+
+        # Test
+        link.send_packet(CRTPPacket(0x30, (1, 2, 3)))
+        self.loop.run_until_complete(asyncio.sleep(0))
+
+        # Assert
+        drone.recvfrom(1024)
+        data, addr = drone.recvfrom(1024)
+        self.assertEqual(_datagram(0x3C, (1, 2, 3)), data)
+
+    def test_that_links_share_the_socket_and_are_routed_by_source(self):
+        # Fixture
+        received = []
+        for i, drone in enumerate(self.drones):
+            link = AioUdpDriver(
+                self.endpoint, lambda pk, i=i: received.append((i, pk)))
+            link.connect(
+                'udp://127.0.0.1:{}'.format(drone.getsockname()[1]),
+                None, None)
+            self.links.append(link)
+
+        # Test
+        self.drones[1].sendto(_datagram(0x3C, (1,)), self.local_addr)
+        self.drones[0].sendto(_datagram(0x3C, (0,)), self.local_addr)
+
+        self._run_until(lambda: len(received) == 2)
+
+        # Assert
+        actual = sorted((i, pk.data[0]) for i, pk in received)
+        self.assertEqual([(0, 0), (1, 1)], actual)
+
+    def test_that_datagram_with_bad_checksum_is_dropped(self):
+        # Fixture
+        drone = self.drones[0]
+        self._connect(drone)
+
+        # Test
+        bad = bytearray(_datagram(0x3C, (1,)))
+        bad[-1] ^= 0xFF
+        drone.sendto(bytes(bad), self.local_addr)
+        drone.sendto(_datagram(0x3C, (2,)), self.local_addr)
+        self._run_until(lambda: len(self.received) == 1)
+
+        # Assert
+        self.assertEqual(1, len(self.received))
+        self.assertEqual(bytearray((2,)), self.received[0].data)
+
+    def test_that_closed_link_stops_receiving(self):
+        # Fixture
+        drone = self.drones[0]
+        link = self._connect(drone)
+
+        # Test
+        link.close()
+        drone.sendto(_datagram(0x3C, (1,)), self.local_addr)
+        self.loop.run_until_complete(asyncio.sleep(0.1))
+
+        # Assert
+        self.assertEqual([], self.received)
@@ -102,3 +102,14 @@ class CRTPPacketTest(unittest.TestCase):
         self.assertEqual(0x2d, actual)
         self.assertEqual(2, sut.port)
         self.assertEqual(1, sut.channel)
+
+    def test_that_data_can_be_set_from_memoryview(self):
+        # Fixture
+        buffer = bytearray((1, 2, 3, 4))
+
+        # Test
+        self.sut.data = memoryview(buffer)[1:3]
+        buffer[1] = 0
+
+        # Assert
+        self.assertEqual((2, 3), self.sut.datat)
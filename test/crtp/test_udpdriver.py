@@ -0,0 +1,507 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import random
+import socket
+import threading
+import time
+import unittest
+from threading import Thread
+
+import cflib.crtp.udpdriver as udpdriver
+from cflib.crazyflie.retransmission import get_scheduler
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.crtp.crtpstack import CRTPPort
+from cflib.crtp.exceptions import WrongUriType
+from cflib.crtp.udpdriver import UdpDriver
+from cflib.crtp.udpreliable import ENABLE_REQUEST
+from cflib.crtp.udpreliable import ReliableEndpoint
+
+
+def _free_port():
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def _datagram(header, data):
+    raw = bytearray((header,)) + bytearray(data)
+    return bytes(raw + bytearray((sum(raw) % 256,)))
+
+
+class _FakeDrone:
+
+    def __init__(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(('127.0.0.1', 0))
+        self.socket.settimeout(1)
+        self.port = self.socket.getsockname()[1]
+        self.uri = 'udp://127.0.0.1:{}'.format(self.port)
+
+    def receive(self):
+        return self.socket.recvfrom(1024)
+
+    def start_echo(self):
+        """Send back every datagram but the hello, like the LINKCTRL echo"""
+        self._echo = Thread(target=self._run_echo)
+        self._echo.daemon = True
+        self._echo.start()
+
+    def _run_echo(self):
+        while True:
+            try:
+                data, addr = self.socket.recvfrom(1024)
+            except socket.error:
+                return
+            if data != b'\xFF\x01\x01\x01':
+                self.socket.sendto(data, addr)
+
+    def close(self):
+        self.socket.close()
+
+
+class _FakeReliableDrone(_FakeDrone):
+    """Echo the packets in reliable mode, dropping a fifth of the datagrams
+    in both directions"""
+
+    def __init__(self):
+        _FakeDrone.__init__(self)
+        self.random = random.Random(42)
+        self.addr = None
+        self.endpoint = ReliableEndpoint(self._send_frame, rto=0.02)
+        self._running = True
+
+    def start_echo(self):
+        _FakeDrone.start_echo(self)
+        self._ticker = Thread(target=self._run_ticker)
+        self._ticker.daemon = True
+        self._ticker.start()
+
+    def _lossy(self):
+        return self.random.random() < 0.2
+
+    def _send_frame(self, frame):
+        if not self._lossy() and self.addr is not None:
+            raw = bytearray(frame)
+            self.socket.sendto(bytes(raw + bytearray((sum(raw) % 256,))),
+                               self.addr)
+
+    def _run_ticker(self):
+        while self._running:
+            self.endpoint.tick(time.time())
+            time.sleep(0.005)
+
+    def _run_echo(self):
+        while True:
+            try:
+                data, self.addr = self.socket.recvfrom(1024)
+            except socket.error:
+                return
+            data = data[:-1]
+            if data == ENABLE_REQUEST:
+                self.socket.sendto(_datagram(data[0], data[1:]), self.addr)
+            elif data != b'\xFF\x01\x01' and not self._lossy():
+                for payload in self.endpoint.receive(data):
+                    self.endpoint.send(payload)
+
+    def close(self):
+        self._running = False
+        _FakeDrone.close(self)
+
+
+class UdpDriverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.addCleanup(udpdriver.set_reliable_mode, False)
+        self.drones = [_FakeDrone(), _FakeDrone()]
+        self.sut = UdpDriver()
+        self.links = []
+
+    def tearDown(self):
+        for link in self.links:
+            link.close()
+        for drone in self.drones:
+            drone.close()
+
+    def _connect(self, uri, link_quality_callback=None):
+        link = UdpDriver()
+        link.connect(uri, link_quality_callback, None)
+        self.links.append(link)
+        return link
+
+    def test_that_uri_with_host_only_uses_default_port(self):
+        # Fixture
+
+        # Test
+        actual = self.sut.parse_uri('udp://192.168.43.42')
+
+        # Assert
+        self.assertEqual(('192.168.43.42', 2390, None), actual)
+
+    def test_that_port_and_local_port_are_parsed(self):
+        # Fixture
+
+        # Test
+        actual = self.sut.parse_uri('udp://10.0.0.12:2391/2399')
+
+        # Assert
+        self.assertEqual(('10.0.0.12', 2391, 2399), actual)
+
+    def test_that_other_uri_types_are_rejected(self):
+        # Fixture
+
+        # Test
+        # Assert
+        with self.assertRaises(WrongUriType):
+            self.sut.parse_uri('radio://0/80/2M')
+
+    def test_that_malformed_uri_is_rejected(self):
+        # Fixture
+
+        # Test
+        # Assert
+        with self.assertRaises(WrongUriType):
+            self.sut.parse_uri('udp://10.0.0.12:port')
+
+    def test_that_hello_is_sent_on_connect(self):
+        # Fixture
+        drone = self.drones[0]
+
+        # Test
+        self._connect(drone.uri)
+
+        # Assert
+        data, addr = drone.receive()
+        self.assertEqual(b'\xFF\x01\x01\x01', data)
+
+    def test_that_packet_is_sent_with_checksum(self):
+        # Fixture
+        drone = self.drones[0]
+        link = self._connect(drone.uri)
+        drone.receive()
+
+        # Test
+        link.send_packet(CRTPPacket(0x30, (1, 2, 3)))
+
+        # Assert
+        data, addr = drone.receive()
+        self.assertEqual(_datagram(0x3C, (1, 2, 3)), data)
+
+    def test_that_received_packet_is_decoded(self):
+        # Fixture
+        drone = self.drones[0]
+        link = self._connect(drone.uri)
+        _, addr = drone.receive()
+
+        # Test
+        drone.socket.sendto(_datagram(0x5C, (4, 5)), addr)
+        actual = link.receive_packet(1)
+
+        # Assert
+        self.assertEqual(5, actual.port)
+        self.assertEqual((4, 5), actual.datat)
+
+    def test_that_packet_with_bad_checksum_is_dropped(self):
+        # Fixture
+        drone = self.drones[0]
+        link = self._connect(drone.uri)
+        _, addr = drone.receive()
+
+        # Test
+        drone.socket.sendto(b'\x5C\x04\x05\x00', addr)
+        actual = link.receive_packet(1)
+
+        # Assert
+        self.assertIsNone(actual)
+
+    def test_that_too_short_datagram_is_dropped(self):
+        # Fixture
+        drone = self.drones[0]
+        link = self._connect(drone.uri)
+        _, addr = drone.receive()
+
+        # Test
+        drone.socket.sendto(b'\x5C', addr)
+        actual = link.receive_packet(1)
+
+        # Assert
+        self.assertIsNone(actual)
+
+    def test_that_consecutive_datagrams_do_not_share_data(self):
+        # Fixture
+        drone = self.drones[0]
+        link = self._connect(drone.uri)
+        _, addr = drone.receive()
+        drone.socket.sendto(_datagram(0x5C, (1, 2, 3)), addr)
+        drone.socket.sendto(_datagram(0x5C, (4,)), addr)
+
+        # Test
+        first = link.receive_packet(1)
+        second = link.receive_packet(1)
+
+        # Assert
+        self.assertEqual((1, 2, 3), first.datat)
+        self.assertEqual((4,), second.datat)
+
+    def test_that_links_with_same_local_port_share_one_socket(self):
+        # Fixture
+        local_port = _free_port()
+
+        # Test
+        link1 = self._connect('{}/{}'.format(self.drones[0].uri, local_port))
+        link2 = self._connect('{}/{}'.format(self.drones[1].uri, local_port))
+
+        # Assert
+        _, addr1 = self.drones[0].receive()
+        _, addr2 = self.drones[1].receive()
+        self.assertEqual(local_port, addr1[1])
+        self.assertEqual(local_port, addr2[1])
+        self.assertIs(link1._socket, link2._socket)
+
+    def test_that_shared_socket_routes_datagrams_on_source_address(self):
+        # Fixture
+        local_port = _free_port()
+        link1 = self._connect('{}/{}'.format(self.drones[0].uri, local_port))
+        link2 = self._connect('{}/{}'.format(self.drones[1].uri, local_port))
+        _, addr = self.drones[0].receive()
+
+        # Test
+        self.drones[1].socket.sendto(_datagram(0x5C, (2,)), addr)
+        self.drones[0].socket.sendto(_datagram(0x5C, (1,)), addr)
+
+        # Assert
+        self.assertEqual((1,), link1.receive_packet(1).datat)
+        self.assertEqual((2,), link2.receive_packet(1).datat)
+        self.assertIsNone(link1.receive_packet(0))
+
+    def test_that_same_address_cannot_be_opened_twice_on_shared_socket(self):
+        # Fixture
+        uri = '{}/{}'.format(self.drones[0].uri, _free_port())
+        self._connect(uri)
+
+        # Test
+        # Assert
+        with self.assertRaises(Exception):
+            self._connect(uri)
+
+    def test_that_receive_with_zero_time_does_not_block(self):
+        # Fixture
+        link = self._connect(self.drones[0].uri)
+
+        # Test
+        start = time.time()
+        actual = link.receive_packet(0)
+
+        # Assert
+        self.assertIsNone(actual)
+        self.assertLess(time.time() - start, 0.1)
+
+    def test_that_receive_times_out(self):
+        # Fixture
+        link = self._connect(self.drones[0].uri)
+
+        # Test
+        start = time.time()
+        actual = link.receive_packet(0.2)
+
+        # Assert
+        self.assertIsNone(actual)
+        self.assertGreaterEqual(time.time() - start, 0.19)
+
+    def test_that_close_wakes_up_receiver_waiting_forever(self):
+        # Fixture
+        for uri in (self.drones[0].uri,
+                    '{}/{}'.format(self.drones[1].uri, _free_port())):
+            link = UdpDriver()
+            link.connect(uri, None, None)
+            receiver = Thread(target=link.receive_packet, args=(-1,))
+            receiver.start()
+            time.sleep(0.05)
+
+            # Test
+            start = time.time()
+            link.close()
+            receiver.join(1)
+
+            # Assert
+            self.assertFalse(receiver.is_alive())
+            self.assertLess(time.time() - start, 0.5)
+            self.assertIsNone(link.receive_packet(-1))
+
+    def test_that_link_quality_is_reported_from_answered_probes(self):
+        # Fixture
+        drone = self.drones[0]
+        drone.start_echo()
+        reports = []
+
+        # Test
+        link = self._connect(drone.uri, reports.append)
+        # The probe answers are not passed on
+        self.assertIsNone(link.receive_packet(0.35))
+
+        # Assert
+        self.assertEqual(100.0, reports[-1])
+        stats = link.get_link_statistics()
+        self.assertEqual(0.0, stats['loss'])
+        self.assertLess(stats['rtt_p50'], 0.1)
+        self.assertLessEqual(stats['rtt_p50'], stats['rtt_p99'])
+
+    def test_that_probes_are_sent_without_a_thread_per_link(self):
+        # Fixture
+        drone = self.drones[0]
+        drone.start_echo()
+        get_scheduler()
+        nr_of_threads = threading.active_count()
+        reports = []
+
+        # Test
+        link = self._connect(drone.uri, reports.append)
+        link.receive_packet(0.25)
+
+        # Assert
+        self.assertEqual(nr_of_threads, threading.active_count())
+        self.assertEqual(100.0, reports[-1])
+
+    def test_that_unanswered_probes_are_counted_as_lost(self):
+        # Fixture
+        udpdriver.set_probe_timeout(0.05)
+        self.addCleanup(udpdriver.set_probe_timeout, 1.0)
+        reports = []
+
+        # Test
+        link = self._connect(self.drones[0].uri, reports.append)
+        time.sleep(0.35)
+
+        # Assert
+        self.assertEqual(0.0, reports[-1])
+        self.assertEqual(1.0, link.get_link_statistics()['loss'])
+
+    def test_that_application_echo_is_passed_on(self):
+        # Fixture
+        drone = self.drones[0]
+        drone.start_echo()
+        link = self._connect(drone.uri, lambda quality: None)
+        pk = CRTPPacket()
+        pk.set_header(CRTPPort.LINKCTRL, 0)
+        pk.data = (47,)
+
+        # Test
+        link.send_packet(pk)
+        actual = link.receive_packet(1)
+
+        # Assert
+        self.assertEqual((47,), actual.datat)
+
+    def test_that_reliable_mode_is_not_negotiated_by_default(self):
+        # Fixture
+        drone = self.drones[0]
+
+        # Test
+        link = self._connect(drone.uri)
+
+        # Assert
+        self.assertEqual(b'\xFF\x01\x01\x01', drone.receive()[0])
+        drone.socket.settimeout(0.1)
+        with self.assertRaises(socket.timeout):
+            drone.receive()
+        self.assertTrue(link.needs_resending)
+
+    def test_that_legacy_drone_needs_resending(self):
+        # Fixture
+        udpdriver.set_reliable_mode(True)
+        drone = self.drones[0]
+
+        # Test
+        link = self._connect(drone.uri)
+
+        # Assert
+        self.assertTrue(link.needs_resending)
+
+    def test_that_reliable_mode_delivers_packets_in_order(self):
+        # Fixture
+        udpdriver.set_reliable_mode(True)
+        drone = _FakeReliableDrone()
+        self.drones.append(drone)
+        drone.start_echo()
+        link = self._connect(drone.uri)
+        expected = [(i,) for i in range(40)]
+
+        # Test
+        # Acks are handled while receiving, send bursts that fit the window
+        actual = []
+        for i in range(0, len(expected), 8):
+            for data in expected[i:i + 8]:
+                link.send_packet(CRTPPacket(0x30, data))
+            for _ in expected[i:i + 8]:
+                pk = link.receive_packet(2)
+                actual.append(tuple(pk.data))
+
+        # Assert
+        self.assertFalse(link.needs_resending)
+        self.assertEqual(expected, actual)
+        self.assertIsNone(link.receive_packet(0.1))
+
+    def test_that_network_is_expanded_to_hosts(self):
+        # Fixture
+
+        # Test
+        actual = udpdriver._expand_scan_target('192.168.43.0/29')
+
+        # Assert
+        expected = ['192.168.43.{}'.format(i) for i in range(1, 7)]
+        self.assertEqual(expected, actual)
+
+    def test_that_invalid_network_is_rejected(self):
+        # Fixture
+
+        # Test
+        # Assert
+        with self.assertRaises(ValueError):
+            udpdriver._expand_scan_target('192.168.43.0/33')
+
+    def test_that_scan_returns_answering_hosts(self):
+        # Fixture
+        drone = self.drones[0]
+        drone.start_echo()
+
+        # Test
+        actual = udpdriver.scan(['127.0.0.0/29'], drone.port, 0.2)
+
+        # Assert
+        self.assertEqual([[drone.uri, '']], actual)
+
+    def test_that_scan_ignores_silent_hosts(self):
+        # Fixture
+        drone = self.drones[0]
+        start = time.time()
+
+        # Test
+        actual = udpdriver.scan(['127.0.0.1'], drone.port, 0.2)
+
+        # Assert
+        self.assertEqual([], actual)
+        self.assertLess(time.time() - start, 0.5)
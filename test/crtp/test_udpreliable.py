@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import time
+import unittest
+
+from cflib.crtp.udpreliable import FRAME_ACK
+from cflib.crtp.udpreliable import FRAME_DATA
+from cflib.crtp.udpreliable import FRAME_MARKER
+from cflib.crtp.udpreliable import is_frame
+from cflib.crtp.udpreliable import ReliableEndpoint
+
+
+class ReliableEndpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.frames = []
+        self.sut = ReliableEndpoint(self.frames.append, rto=0.5)
+
+    def _ack(self, ack, answered):
+        return bytearray((FRAME_MARKER, FRAME_ACK, ack, answered))
+
+    def test_that_crtp_packets_are_not_frames(self):
+        # Fixture
+        # Headers of the firmware have the link bits cleared
+        packets = [bytearray((header, 0x01, 0x02, 0x03))
+                   for header in (0x00, 0x30, 0x50, 0xF3)]
+
+        # Test
+        actual = [is_frame(packet) for packet in packets]
+
+        # Assert
+        self.assertEqual([False] * len(packets), actual)
+
+    def test_that_sent_frames_are_frames(self):
+        # Fixture
+
+        # Test
+        self.sut.send(bytearray((0x30, 0x01)))
+
+        # Assert
+        self.assertTrue(is_frame(self.frames[0]))
+        self.assertEqual(FRAME_DATA, self.frames[0][1])
+
+    def test_that_frames_are_delivered_in_order(self):
+        # Fixture
+        peer_frames = []
+        peer = ReliableEndpoint(peer_frames.append)
+        for i in range(3):
+            peer.send(bytearray((0x30, i)))
+
+        # Test
+        actual = self.sut.receive(peer_frames[1])
+        actual += self.sut.receive(peer_frames[2])
+        actual += self.sut.receive(peer_frames[0])
+
+        # Assert
+        expected = [bytearray((0x30, i)) for i in range(3)]
+        self.assertEqual(expected, actual)
+
+    def test_that_a_frame_received_out_of_order_is_acked_at_once(self):
+        # Fixture
+        peer_frames = []
+        peer = ReliableEndpoint(peer_frames.append)
+        peer.send(bytearray((0x30, 0x00)))
+        peer.send(bytearray((0x30, 0x01)))
+
+        # Test
+        self.sut.receive(peer_frames[1])
+
+        # Assert
+        self.assertEqual([self._ack(0, 1)], self.frames)
+
+    def test_that_timeout_is_measured_from_answered_frames(self):
+        # Fixture
+        self.sut.send(bytearray((0x30, 0x00)))
+
+        # Test
+        self.sut.receive(self._ack(1, 0))
+
+        # Assert
+        self.assertLess(self.sut.rto, 0.1)
+
+    def test_that_retransmitted_frames_are_not_measured(self):
+        # Fixture
+        self.sut.send(bytearray((0x30, 0x00)))
+        self.sut.tick(time.time() + 1)
+
+        # Test
+        self.sut.receive(self._ack(1, 0))
+
+        # Assert
+        self.assertEqual(1.0, self.sut.rto)
+
+    def test_that_only_the_oldest_frame_is_retransmitted_on_timeout(self):
+        # Fixture
+        for i in range(3):
+            self.sut.send(bytearray((0x30, i)))
+        del self.frames[:]
+
+        # Test
+        self.sut.tick(time.time() + 1)
+
+        # Assert
+        self.assertEqual(1, len(self.frames))
+        self.assertEqual(0, self.frames[0][2])
+
+    def test_that_oldest_frame_is_retransmitted_when_acks_stop_advancing(
+            self):
+        # Fixture
+        for i in range(4):
+            self.sut.send(bytearray((0x30, i)))
+        self.sut.receive(self._ack(1, 0))
+        del self.frames[:]
+
+        # Test
+        self.sut.receive(self._ack(1, 2))
+        self.sut.receive(self._ack(1, 3))
+
+        # Assert
+        self.assertEqual(1, len(self.frames))
+        self.assertEqual(1, self.frames[0][2])
+        self.assertEqual(1, self.sut.retransmissions)
+
+    def test_that_link_fails_after_max_retries(self):
+        # Fixture
+        sut = ReliableEndpoint(self.frames.append, max_retries=2)
+        sut.send(bytearray((0x30, 0x00)))
+        now = time.time()
+
+        # Test
+        actual = [sut.tick(now + i * 10) for i in range(1, 4)]
+
+        # Assert
+        self.assertEqual([True, True, False], actual)
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+import errno
+import struct
+import sys
+import time
+import unittest
+
+import cflib.crtp
+import cflib.crtp.udpdriver as udpdriver
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie.log import LogConfig
+from cflib.crazyflie.logPlanner import LogStream
+from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
+from cflib.crazyflie.syncLogger import SyncLogger
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.crtp.crtpstack import CRTPPort
+from cflib.crtp.udpsimulator import SimulatedCrazyflie
+from cflib.crtp.udpsimulator import UdpSimulator
+
+if sys.version_info < (3,):
+    import Queue as queue
+else:
+    import queue
+
+
+def _packet(port, channel, data):
+    pk = CRTPPacket()
+    pk.set_header(port, channel)
+    pk.data = data
+    return pk
+
+
+class SimulatedCrazyflieTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = SimulatedCrazyflie()
+
+    def _handle(self, port, channel, data):
+        answers = self.sut.handle_packet(_packet(port, channel, data))
+        self.assertEqual(1, len(answers))
+        return answers[0]
+
+    def test_that_echo_is_answered(self):
+        # Fixture
+
+        # Test
+        actual = self._handle(CRTPPort.LINKCTRL, 0, (1, 2, 3))
+
+        # Assert
+        self.assertEqual(bytearray((1, 2, 3)), actual.data)
+
+    def test_that_protocol_version_is_answered(self):
+        # Fixture
+
+        # Test
+        actual = self._handle(CRTPPort.PLATFORM, 1, (0,))
+
+        # Assert
+        self.assertEqual(bytearray((0, 4)), actual.data)
+
+    def test_that_toc_info_matches_toc(self):
+        # Fixture
+        sut = SimulatedCrazyflie(extra_log_variables=300)
+        expected = len(sut.log_toc)
+
+        # Test
+        actual = sut.handle_packet(_packet(CRTPPort.LOGGING, 0, (3,)))[0]
+
+        # Assert
+        nbr_of_items, crc = struct.unpack('<HI', actual.data[1:7])
+        self.assertEqual(expected, nbr_of_items)
+        self.assertGreater(nbr_of_items, 255)
+
+    def test_that_toc_element_is_answered(self):
+        # Fixture
+
+        # Test
+        actual = self._handle(CRTPPort.PARAM, 0, (2, 1, 0))
+
+        # Assert
+        self.assertEqual(bytearray((2, 1, 0, 0x08)) +
+                         b'stabilizer\x00controller\x00', actual.data)
+
+    def test_that_param_is_written_and_read(self):
+        # Fixture
+        self._handle(CRTPPort.PARAM, 2, (1, 0, 3))
+
+        # Test
+        actual = self._handle(CRTPPort.PARAM, 1, (1, 0))
+
+        # Assert
+        self.assertEqual(bytearray((1, 0, 0, 3)), actual.data)
+
+    def test_that_read_only_param_is_not_written(self):
+        # Fixture
+        ident = [p[1] for p in self.sut.param_toc].index('selftestPassed')
+
+        # Test
+        actual = self._handle(CRTPPort.PARAM, 2, (ident, 0, 0))
+
+        # Assert
+        self.assertEqual(bytearray((ident, 0, 1)), actual.data)
+
+    def test_that_too_large_log_block_is_refused(self):
+        # Fixture
+        variables = bytearray()
+        for ident in range(7):
+            variables += bytearray((0x77, ident, 0))
+
+        # Test
+        actual = self._handle(CRTPPort.LOGGING, 1,
+                              bytearray((6, 1)) + variables)
+
+        # Assert
+        self.assertEqual(bytearray((6, 1, errno.E2BIG)), actual.data)
+
+    def test_that_started_log_block_sends_data(self):
+        # Fixture
+        self.sut.log_values['acc.x'] = 1.5
+        self._handle(CRTPPort.LOGGING, 1, (6, 1, 0x77, 0, 0))
+
+        # Test
+        self._handle(CRTPPort.LOGGING, 1, (3, 1, 10))
+        actual = self.sut.poll_log_blocks(time.time() + 0.01)
+
+        # Assert
+        self.assertEqual(1, len(actual))
+        self.assertEqual(1, actual[0].data[0])
+        self.assertEqual(1.5, struct.unpack('<f', actual[0].data[4:])[0])
+        self.assertEqual([], self.sut.poll_log_blocks(time.time()))
+
+    def test_that_memory_is_written_and_read(self):
+        # Fixture
+        self._handle(CRTPPort.MEM, 2,
+                     struct.pack('<BI', 0, 0x100) + b'\x01\x02')
+
+        # Test
+        actual = self._handle(CRTPPort.MEM, 1,
+                              struct.pack('<BIB', 0, 0xFF, 4))
+
+        # Assert
+        self.assertEqual(struct.pack('<BIB', 0, 0xFF, 0) +
+                         bytearray((0xFF, 1, 2, 0x02)), actual.data)
+
+
+class UdpSimulatorTest(unittest.TestCase):
+
+    def setUp(self):
+        cflib.crtp.init_drivers()
+        self.simulator = UdpSimulator(2, port=0)
+        self.simulator.start()
+        udpdriver.set_reliable_mode(True)
+
+    def tearDown(self):
+        self.simulator.stop()
+        udpdriver.set_reliable_mode(False)
+
+    def _connect_and_log(self, uri):
+        config = LogConfig('test', 10)
+        config.add_variable('pm.vbat', 'float')
+
+        with SyncCrazyflie(uri, cf=Crazyflie()) as scf:
+            with SyncLogger(scf, config) as logger:
+                for timestamp, data, logconf in logger:
+                    return scf.cf.param.values, data
+
+    def test_that_crazyflies_connect_and_log(self):
+        # Fixture
+        for firmware in self.simulator.firmwares:
+            firmware.log_values['pm.vbat'] = 3.75
+
+        # Test
+        actual = [self._connect_and_log(uri) for uri in self.simulator.uris]
+
+        # Assert
+        for values, data in actual:
+            self.assertEqual('2', values['stabilizer']['estimator'])
+            self.assertEqual({'pm.vbat': 3.75}, data)
+
+    def test_that_lazy_param_value_is_fetched_on_access(self):
+        # Fixture
+        uri = self.simulator.uris[0]
+
+        # Test
+        with SyncCrazyflie(uri, cf=Crazyflie(lazy_params=True)) as scf:
+            actual = scf.cf.param.get_value('stabilizer.estimator', 5)
+            values = scf.cf.param.values
+
+        # Assert
+        self.assertEqual(2, actual)
+        self.assertEqual({'stabilizer': {'estimator': '2'}}, values)
+
+    def test_that_log_stream_merges_blocks(self):
+        # Fixture
+        names = ['stateEstimate.' + axis for axis in
+                 ('x', 'y', 'z', 'vx', 'vy', 'vz')] + ['pm.vbat']
+        firmware = self.simulator.firmwares[0]
+        for i, name in enumerate(names):
+            firmware.log_values[name] = float(i)
+        stream = LogStream('test')
+        for name in names:
+            stream.add_variable(name, 10)
+        received = queue.Queue()
+        stream.data_received_cb.add_callback(
+            lambda timestamp, data, stream: received.put(data))
+
+        # Test
+        with SyncCrazyflie(self.simulator.uris[0], cf=Crazyflie()) as scf:
+            stream.add(scf.cf.log)
+            stream.start()
+            actual = received.get(timeout=5)
+            stream.stop()
+
+        # Assert
+        self.assertEqual(2, len(stream.configs))
+        self.assertEqual(dict((name, float(i))
+                              for i, name in enumerate(names)), actual)
+
+    def test_that_crazyflie_connects_without_reliable_mode(self):
+        # Fixture
+        udpdriver.set_reliable_mode(False)
+        self.simulator.firmwares[0].log_values['pm.vbat'] = 4.0
+
+        # Test
+        values, data = self._connect_and_log(self.simulator.uris[0])
+
+        # Assert
+        self.assertEqual({'pm.vbat': 4.0}, data)
@@ -45,6 +45,7 @@ class TestPositionHlCommander(unittest.TestCase):
         self.cf_mock.high_level_commander = self.commander_mock
         self.cf_mock.param = self.param_mock
         self.cf_mock.is_connected.return_value = True
+        self.param_mock.set_values.return_value = []
 
         self.sut = PositionHlCommander(self.cf_mock)
 
@@ -57,15 +58,28 @@ class TestPositionHlCommander(unittest.TestCase):
         sut.take_off()
 
         # Assert
+        self.param_mock.set_values.assert_called_once_with({
+            'kalman.initialX': 1.0,
+            'kalman.initialY': 2.0,
+            'kalman.initialZ': 3.0,
+        }, timeout=PositionHlCommander.PARAM_TIMEOUT)
         self.param_mock.set_value.assert_has_calls([
-            call('kalman.initialX', '{:.2f}'.format(1.0)),
-            call('kalman.initialY', '{:.2f}'.format(2.0)),
-            call('kalman.initialZ', '{:.2f}'.format(3.0)),
-
             call('kalman.resetEstimation', '1'),
             call('kalman.resetEstimation', '0')
         ])
 
+    def test_that_failed_initial_position_stops_take_off(
+            self, sleep_mock):
+        # Fixture
+        self.param_mock.set_values.return_value = ['kalman.initialZ']
+
+        # Test
+        # Assert
+        with self.assertRaises(Exception):
+            self.sut.take_off()
+        self.param_mock.set_value.assert_not_called()
+        self.commander_mock.takeoff.assert_not_called()
+
     def test_that_the_hi_level_commander_is_activated_on_take_off(
             self, sleep_mock):
         # Fixture
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Benchmark of fetching the values of all the params from a simulated
+Crazyflie over UDP, see cflib.crtp.udpsimulator.
+
+For each round trip time and param fetch window, measures the time from
+connecting until all the param values have been updated, and the time to
+write a profile of param values one at a time and as a batch.
+
+Usage: python tools/benchmark/param_fetch.py [window ...]
+"""
+import logging
+import sys
+import threading
+import time
+
+import cflib.crtp
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie import param
+from cflib.crtp.udpsimulator import UdpSimulator
+
+PARAMS = 300
+PROFILE = 40
+LATENCIES = [0, 0.005, 0.02]
+
+
+def bench(latency, window):
+    param.set_fetch_window(window)
+    with UdpSimulator(port=0, latency=latency,
+                      extra_params=PARAMS) as simulator:
+        cf = Crazyflie()
+        updated = threading.Event()
+        cf.param.all_updated.add_callback(updated.set)
+
+        cf.open_link(simulator.uris[0])
+        if not updated.wait(120):
+            raise Exception('The params were not updated')
+        fetch_time = cf.param.all_updated_time
+        nr_of_params = sum(len(group) for group in cf.param.toc.toc.values())
+
+        start = time.time()
+        for i in range(PROFILE):
+            cf.param.set_value_async('sim.p{}'.format(i), 1.0).result(10)
+        single_time = time.time() - start
+
+        start = time.time()
+        failed = cf.param.set_values(
+            dict(('sim.p{}'.format(i), 2.0) for i in range(PROFILE)), 10)
+        batch_time = time.time() - start
+        cf.close_link()
+        if failed:
+            raise Exception('Could not write {}'.format(failed))
+
+    print('RTT {:4.0f} ms, window {:3}: {} params in {:6.3f} s, '
+          'writing {} one at a time {:6.3f} s, as a batch {:6.3f} s'.format(
+              latency * 1000, window, nr_of_params, fetch_time, PROFILE,
+              single_time, batch_time))
+
+
+def main():
+    windows = [1, 4, 8]
+    if len(sys.argv) > 1:
+        windows = [int(arg) for arg in sys.argv[1:]]
+
+    # Without a TOC cache the library warns about not saving it
+    logging.getLogger('cflib.crazyflie.toccache').setLevel(logging.ERROR)
+    cflib.crtp.init_drivers()
+    for latency in LATENCIES:
+        for window in windows:
+            bench(latency, window)
+
+
+if __name__ == '__main__':
+    main()
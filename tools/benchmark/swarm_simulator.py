@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Benchmark of connecting to and logging from a swarm of simulated
+Crazyflies over UDP, see cflib.crtp.udpsimulator.
+
+For each swarm size, measures the time to open all the links (TOC download
+included, without cache) and the log packets received per second with one
+100 Hz log block per Crazyflie.
+
+Usage: python tools/benchmark/swarm_simulator.py [swarm size ...]
+"""
+import sys
+import threading
+import time
+
+import cflib.crtp
+from cflib.crazyflie.log import LogConfig
+from cflib.crazyflie.swarm import Swarm
+from cflib.crtp.udpsimulator import UdpSimulator
+
+LOG_DURATION = 2.0
+LOG_PERIOD_IN_MS = 10
+
+
+def log_rate(swarm, duration):
+    received = [0]
+    lock = threading.Lock()
+
+    def log_data(timestamp, data, logconf):
+        with lock:
+            received[0] += 1
+
+    configs = []
+
+    def add_config(scf):
+        config = LogConfig('bench', LOG_PERIOD_IN_MS)
+        for name in ('stabilizer.roll', 'stabilizer.pitch',
+                     'stabilizer.yaw', 'stabilizer.thrust'):
+            config.add_variable(name)
+        scf.cf.log.add_config(config)
+        config.data_received_cb.add_callback(log_data)
+        configs.append(config)
+
+    swarm.sequential(add_config)
+
+    for config in configs:
+        config.start()
+    # Skip the start up
+    time.sleep(0.5)
+    start_count = received[0]
+    time.sleep(duration)
+    count = received[0] - start_count
+    for config in configs:
+        config.stop()
+    return count / duration
+
+
+def bench(size):
+    with UdpSimulator(size, port=0) as simulator:
+        swarm = Swarm(simulator.uris)
+        start = time.time()
+        swarm.open_links()
+        connect_time = time.time() - start
+
+        rate = log_rate(swarm, LOG_DURATION)
+        expected = size * 1000.0 / LOG_PERIOD_IN_MS
+        swarm.close_links()
+
+    print('{:>4} Crazyflies: connect {:6.3f} s, log {:8.0f} packets/s '
+          '({:.0%} of {:.0f})'.format(
+              size, connect_time, rate, rate / expected, expected))
+
+
+def main():
+    sizes = [1, 10, 30]
+    if len(sys.argv) > 1:
+        sizes = [int(arg) for arg in sys.argv[1:]]
+
+    cflib.crtp.init_drivers()
+    for size in sizes:
+        bench(size)
+
+
+if __name__ == '__main__':
+    main()
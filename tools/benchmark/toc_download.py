@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Benchmark of downloading the log and param TOCs from a simulated Crazyflie
+over UDP, see cflib.crtp.udpsimulator.
+
+For each round trip time and TOC fetch window, measures the time from opening
+the link until the Crazyflie is connected, which is spent downloading the
+TOCs since there is no TOC cache. The stages of the connection setup run at
+the same time, the time each of them finished is printed as well.
+
+Usage: python tools/benchmark/toc_download.py [window ...]
+"""
+import logging
+import sys
+import threading
+import time
+
+import cflib.crtp
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie import toc
+from cflib.crtp.udpsimulator import UdpSimulator
+
+LOG_VARIABLES = 300
+PARAMS = 300
+LATENCIES = [0, 0.005, 0.02]
+
+
+def bench(latency, window):
+    toc.set_fetch_window(window)
+    with UdpSimulator(port=0, latency=latency,
+                      extra_log_variables=LOG_VARIABLES,
+                      extra_params=PARAMS) as simulator:
+        cf = Crazyflie()
+        connected = threading.Event()
+        cf.connected.add_callback(lambda uri: connected.set())
+        params_updated = threading.Event()
+        cf.param.all_updated.add_callback(params_updated.set)
+
+        start = time.time()
+        cf.open_link(simulator.uris[0])
+        if not connected.wait(120):
+            raise Exception('Could not connect')
+        connect_time = time.time() - start
+        stages = cf.connection_setup_times
+        # The param values are fetched after connecting
+        params_updated.wait(120)
+        cf.close_link()
+
+    print('RTT {:4.0f} ms, window {:3}: connect {:6.3f} s ({})'.format(
+        latency * 1000, window, connect_time,
+        ', '.join('{} {:.3f}'.format(stage, stages[stage])
+                  for stage in sorted(stages, key=stages.get))))
+
+
+def main():
+    windows = [1, 2, 4, 8]
+    if len(sys.argv) > 1:
+        windows = [int(arg) for arg in sys.argv[1:]]
+
+    # Without a TOC cache the library warns about not saving it
+    logging.getLogger('cflib.crazyflie.toccache').setLevel(logging.ERROR)
+    cflib.crtp.init_drivers()
+    for latency in LATENCIES:
+        for window in windows:
+            bench(latency, window)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2019 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA  02110-1301, USA.
+"""
+Micro-benchmark of the UdpDriver receive path.
+
+Measures how many packets per second the driver can decode, compared with
+the per-byte implementation it replaced, and the end-to-end receive rate of
+datagrams sent over the loopback interface.
+
+Usage: python tools/benchmark/udp_receive.py [nr of packets]
+"""
+import socket
+import sys
+import time
+
+import cflib.crtp.udpdriver as udpdriver
+from cflib.crtp.crtpstack import CRTPPacket
+from cflib.crtp.udpdriver import UdpDriver
+
+# Number of datagrams sent in one go, small enough to fit in the socket buffer
+BURST = 200
+
+
+def legacy_decode(data):
+    """The receive path before the zero-copy rewrite"""
+    cksum_recv = data[len(data) - 1]
+    data = data[0:(len(data) - 1)]
+    cksum = 0
+    for i in data[0:]:
+        cksum += i
+    cksum %= 256
+    if cksum != cksum_recv:
+        return None
+    return CRTPPacket(data[0], list(data[1:]))
+
+
+def log_datagram():
+    """A full size log data packet, the most common packet at high rates"""
+    raw = bytearray((0x5E,)) + bytearray(range(30))
+    raw.append(sum(raw) & 0xFF)
+    return bytes(raw)
+
+
+def rate(nr_of_packets, duration):
+    return '{:>10.0f} packets/s'.format(nr_of_packets / duration)
+
+
+def bench_decode(nr_of_packets):
+    datagram = log_datagram()
+    driver = UdpDriver()
+
+    start = time.time()
+    for _ in range(nr_of_packets):
+        legacy_decode(datagram)
+    print('decode, before: ', rate(nr_of_packets, time.time() - start))
+
+    start = time.time()
+    for _ in range(nr_of_packets):
+        driver._unpack(datagram)
+    print('decode, after:  ', rate(nr_of_packets, time.time() - start))
+
+
+def bench_receive(nr_of_packets, local_port=None):
+    drone = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    drone.bind(('127.0.0.1', 0))
+    uri = 'udp://127.0.0.1:{}'.format(drone.getsockname()[1])
+    if local_port is not None:
+        uri += '/{}'.format(local_port)
+
+    # The fake drone only knows about the plain protocol
+    udpdriver.set_reliable_mode(False)
+    link = UdpDriver()
+    link.connect(uri, None, None)
+    _, addr = drone.recvfrom(1024)
+
+    datagram = log_datagram()
+    received = 0
+    duration = 0
+    while received < nr_of_packets:
+        for _ in range(BURST):
+            drone.sendto(datagram, addr)
+        start = time.time()
+        while link.receive_packet(0.1) is not None:
+            received += 1
+        # Do not count the final timeout
+        duration += time.time() - start - 0.1
+
+    link.close()
+    drone.close()
+    return rate(received, duration)
+
+
+def main():
+    nr_of_packets = 100000
+    if len(sys.argv) > 1:
+        nr_of_packets = int(sys.argv[1])
+
+    bench_decode(nr_of_packets)
+    print('receive, dedicated socket:', bench_receive(nr_of_packets))
+    print('receive, shared socket:   ', bench_receive(nr_of_packets, 0))
+
+
+if __name__ == '__main__':
+    main()